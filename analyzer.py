@@ -15,7 +15,7 @@ from src.analyzers.subproblem_instance_analyzer import analyze_subproblem_instan
 from src.analyzers.subproblem_result_analyzer import analyze_subproblem_result
 from src.analyzers.final_result_analyzer import analyze_final_result
 from src.analyzers.cores_analyzer import analyze_cores
-from src.analyzers.tools import analyze_log
+from src.analyzers.tools import analyze_log, analyze_component_logs
 
 
 # Questo script può essere chiamato solo direttamente dalla linea di comando
@@ -149,7 +149,7 @@ for result_directory in input_path.iterdir():
             
             # Eventuale lettura ed analisi dei file relativi ai core nella carella
             # dell'iterazione corrente
-            for core_type in ['generalist', 'basic', 'reduced', 'pruned', 'preemptive', 'expanded']:
+            for core_type in ['generalist', 'basic', 'reduced', 'pruned', 'minimal', 'preemptive', 'expanded']:
                 cores_path = iteration_path.joinpath(f'{core_type}_cores.json')
                 if not cores_path.exists():
                     continue
@@ -208,10 +208,15 @@ for result_directory in input_path.iterdir():
                             subproblem_result = decode_subproblem_result(json.load(file))
                         subproblem_result_analysys.update(analyze_subproblem_result(subproblem_instance, subproblem_result))
                 
-                # Leggi ed analizza i log di ogni sottoproblema
+                # Leggi ed analizza i log di ogni sottoproblema. I giorni
+                # suddivisi in componenti hanno un log per ogni componente
                 subproblem_log_path = iteration_path.joinpath(f'subproblem_day_{day_name}_log.log')
+                component_log_paths = sorted(iteration_path.glob(f'subproblem_day_{day_name}_component_*_log.log'),
+                    key=lambda path: int(path.name.split('_')[4]))
                 if subproblem_log_path.exists():
                     subproblem_result_analysys.update(analyze_log(subproblem_log_path))
+                elif len(component_log_paths) > 0:
+                    subproblem_result_analysys.update(analyze_component_logs(component_log_paths))
             
                 # Se almeno un risultato è stato letto ed analizzato
                 if len(subproblem_result_analysys) > 5:
@@ -0,0 +1,187 @@
+from argparse import ArgumentParser
+from pathlib import Path
+import logging
+import random
+import json
+import yaml
+import copy
+import time
+
+import pyomo.environ as pyo
+
+from src.common.custom_types import MasterInstance
+from src.common.file_load_and_dump import decode_master_instance
+from src.generators.master_generator import generate_master_instance
+from src.milp_models.master_model import get_slim_master_model, get_fat_master_model
+from src.milp_models.monolithic_model import get_monolithic_model
+
+
+# Questo script può essere chiamato solo direttamente dalla linea di comando
+if __name__ != '__main__':
+    exit(0)
+
+
+def get_reference_overlap_indices(instance: MasterInstance) -> tuple[set, set]:
+    '''Funzione che calcola gli indici di sovrapposizione del modello
+    monolitico confrontando ogni coppia di finestre dell'istanza. Le due
+    finestre di ogni coppia sono indicizzate senza ordine, dato che nel modello
+    il loro orientamento dipende dall'ordine di iterazione di un insieme.'''
+
+    window_index = []
+    for patient_name, patient in instance.patients.items():
+        for service_name, windows in patient.requests.items():
+            for window in windows:
+                window_index.append((patient_name, service_name, window.start, window.end))
+    window_index = list(set(window_index))
+
+    patient_overlap_index = set()
+    operator_overlap_index = set()
+
+    for i in range(len(window_index) - 1):
+
+        p, s, ws, we = window_index[i]
+        care_unit_name = instance.services[s].care_unit_name
+
+        for j in range(i + 1, len(window_index)):
+
+            pp, ss, wws, wwe = window_index[j]
+
+            if ws > wwe or wws > we:
+                continue
+
+            for d in range(max(ws, wws), min(we, wwe) + 1):
+
+                if p == pp:
+                    patient_overlap_index.add((p, frozenset([(s, ws, we), (ss, wws, wwe)]), d))
+
+                if care_unit_name == instance.services[ss].care_unit_name:
+                    for o in instance.days[d].care_units[care_unit_name].keys():
+                        operator_overlap_index.add((frozenset([(p, s, ws, we), (pp, ss, wws, wwe)]), o, d))
+
+    return patient_overlap_index, operator_overlap_index
+
+
+def check_monolithic_model(instance: MasterInstance, model: pyo.ConcreteModel) -> list[str]:
+    '''Funzione che confronta gli indici di sovrapposizione del modello
+    monolitico e il numero dei suoi vincoli con quelli di riferimento. Ritorna
+    la lista degli errori riscontrati.'''
+
+    errors: list[str] = []
+
+    reference_patient_overlap_index, reference_operator_overlap_index = get_reference_overlap_indices(instance)
+
+    patient_overlap_index = set(
+        (p, frozenset([(s, ws, we), (ss, wws, wwe)]), d)
+        for p, s, ws, we, ss, wws, wwe, d in model.patient_overlap_index) # type: ignore
+    operator_overlap_index = set(
+        (frozenset([(p, s, ws, we), (pp, ss, wws, wwe)]), o, d)
+        for p, s, ws, we, pp, ss, wws, wwe, o, d in model.operator_overlap_index) # type: ignore
+
+    # Ogni coppia deve comparire una sola volta e in un solo orientamento
+    if len(patient_overlap_index) != len(model.patient_overlap_index) or patient_overlap_index != reference_patient_overlap_index: # type: ignore
+        errors.append('patient overlap index differs from the reference')
+    if len(operator_overlap_index) != len(model.operator_overlap_index) or operator_overlap_index != reference_operator_overlap_index: # type: ignore
+        errors.append('operator overlap index differs from the reference')
+
+    expected_constraint_numbers = {
+        'respect_window': len(model.window_index), # type: ignore
+        'patient_not_overlap_1': len(reference_patient_overlap_index),
+        'patient_not_overlap_2': len(reference_patient_overlap_index),
+        'patient_overlap_auxiliary_constraint_1': len(reference_patient_overlap_index),
+        'patient_overlap_auxiliary_constraint_2': len(reference_patient_overlap_index),
+        'operator_not_overlap_1': len(reference_operator_overlap_index),
+        'operator_not_overlap_2': len(reference_operator_overlap_index),
+        'operator_overlap_auxiliary_constraint_1': len(reference_operator_overlap_index),
+        'operator_overlap_auxiliary_constraint_2': len(reference_operator_overlap_index),
+        'operator_overlap_auxiliary_constraint_3': len(reference_operator_overlap_index)
+    }
+    for constraint_name, expected_number in expected_constraint_numbers.items():
+        constraint_number = len(getattr(model, constraint_name))
+        if constraint_number != expected_number:
+            errors.append(f'constraint \'{constraint_name}\' has {constraint_number} rows instead of {expected_number}')
+
+    return errors
+
+
+# Definizione dei parametri a linea di comando
+parser = ArgumentParser(prog='Model building benchmark')
+parser.add_argument('-c', '--config', help='Location of the generator configuration, whose base template is used', type=Path, required=True)
+parser.add_argument('-m', '--models', help='Models to build', nargs='+', choices=['slim', 'fat', 'monolithic'], default=['slim', 'fat'])
+parser.add_argument('-p', '--patients', help='Patient numbers of the generated instances', type=int, nargs='+', default=[32, 64, 128, 256, 512, 1000])
+parser.add_argument('-d', '--days', help='Day number of the generated instances (default from the configuration)', type=int, default=None)
+parser.add_argument('--scale-capacity', help='Scale care units and services with the patient number, keeping the base template ratio', action='store_true')
+parser.add_argument('-r', '--repetitions', help='Number of builds of each model, the median time is reported', type=int, default=3)
+parser.add_argument('--check', help='Compare the monolithic model indices and constraint numbers with the reference', action='store_true')
+args = parser.parse_args()
+
+config_path = Path(args.config).resolve()
+
+# Soppressione dell'output a terminale degli avvertimenti di Pyomo
+logging.getLogger('pyomo.core').setLevel(logging.ERROR)
+
+# Lettura della configurazione
+with open(config_path, 'r') as file:
+    config = yaml.load(file, yaml.CLoader)
+
+total_error_number = 0
+
+for patient_number in args.patients:
+
+    # Generazione dell'istanza con il template di base, sovrascrivendo il numero
+    # di pazienti ed eventualmente quello di giorni
+    instance_config = copy.deepcopy(config['base'])
+    instance_config['patient_number'] = patient_number
+    if args.days is not None:
+        instance_config['day_number'] = args.days
+
+    # Le richieste sono generate in proporzione alla disponibilità degli
+    # operatori: senza scalare le unità di cura più pazienti si dividono le
+    # stesse richieste. Anche i servizi sono scalati, dato che ogni unità di
+    # cura deve averne almeno uno
+    if args.scale_capacity:
+        scale = patient_number / config['base']['patient_number']
+        instance_config['care_unit_number'] = max(1, round(config['base']['care_unit_number'] * scale))
+        instance_config['service_number'] = max(instance_config['care_unit_number'], round(config['base']['service_number'] * scale))
+
+    random.seed(instance_config['seed'])
+    instance = decode_master_instance(json.loads(json.dumps(generate_master_instance(instance_config))))
+
+    window_number = sum(len(windows) for patient in instance.patients.values() for windows in patient.requests.values())
+
+    for model_name in args.models:
+
+        if model_name == 'slim':
+            get_model = get_slim_master_model
+        elif model_name == 'fat':
+            get_model = get_fat_master_model
+        else:
+            get_model = get_monolithic_model
+
+        # Tempo mediano di costruzione del modello
+        times = []
+        for _ in range(args.repetitions):
+            start = time.perf_counter()
+            model = get_model(instance, [])
+            end = time.perf_counter()
+            times.append(end - start)
+        times.sort()
+
+        variable_number = sum(len(variable) for variable in model.component_objects(pyo.Var))
+        constraint_number = sum(len(constraint) for constraint in model.component_objects(pyo.Constraint))
+
+        print(f'[{model_name}] {patient_number} patients, {len(instance.days)} days, {window_number} windows: '
+              f'built in {times[len(times) // 2]:.03f}s ({variable_number} variables, {constraint_number} constraints)')
+
+        if args.check and model_name == 'monolithic':
+            errors = check_monolithic_model(instance, model)
+            for error in errors:
+                print(f'[{model_name}] ERROR: {error}')
+            if len(errors) == 0:
+                print(f'[{model_name}] Overlap indices and constraint numbers match the reference')
+            total_error_number += len(errors)
+
+        del model
+
+# Codice d'uscita non nullo se almeno un controllo è fallito
+if total_error_number > 0:
+    exit(1)
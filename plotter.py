@@ -164,7 +164,9 @@ if 'best_instance' in config['plots_to_do'] or 'best_instance_subproblems' in co
             iteration_path = result_directory.joinpath(f'iter_{iteration_index}')
             
             while iteration_path.exists():
-                cores_path = iteration_path.joinpath('pruned_cores.json')
+                cores_path = iteration_path.joinpath('minimal_cores.json')
+                if not cores_path.exists():
+                    cores_path = iteration_path.joinpath('pruned_cores.json')
                 if not cores_path.exists():
                     cores_path = iteration_path.joinpath('reduced_cores.json')
                     if not cores_path.exists():
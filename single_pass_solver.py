@@ -5,7 +5,6 @@ import logging
 import shutil
 import json
 import yaml
-import copy
 import time
 
 # Soppressione dell'output a terminale degli avvertimenti di Pyomo
@@ -16,7 +15,7 @@ from src.common.custom_types import FatSubproblemResult, SlimSubproblemResult, F
 from src.common.custom_types import FatMasterResult, FatSubproblemInstance, SlimSubproblemInstance
 from src.common.custom_types import CacheMatch, PatientServiceOperator, IterationName
 from src.common.tools import get_subproblem_instance_from_master_result, compose_final_result
-from src.common.tools import is_combination_to_do, get_slim_subproblem_instance_from_fat
+from src.common.tools import get_slim_subproblem_instance_from_fat
 from src.common.tools import get_all_possible_fat_master_requests, get_all_possible_slim_master_requests
 from src.common.tools import remove_requests_not_present
 from src.common.file_load_and_dump import decode_master_instance, encode_master_instance, encode_master_result
@@ -50,103 +49,14 @@ from src.cores.tools import aggregate_core_lists
 
 from src.analyzers.tools import get_result_value, get_day_number_used_by_patients
 
+from src.parallel.batch import get_batch_jobs, get_preliminary_solving_info, read_ledger, run_batch
+
 
 # Questo script può essere chiamato solo direttamente dalla linea di comando
 if __name__ != '__main__':
     exit(0)
 
 
-def get_preliminary_solving_info(
-        config,
-        input_path: Path,
-        can_overwrite: bool) -> dict[tuple[str, str], int]:
-    '''Funzione che stampa a video le informazioni delle istanza che saranno
-    effettivamente risolte, data la configurazione corrente. Ritorna un
-    dizionario contenente i numeri di istanze da risolvere, indicizzate per
-    nome della configurazione e nome del gruppo.'''
-
-    infos: dict[tuple[str, str], int] = {}
-
-    print('\n************************** [PRELIMINARY INFORMATIONS] **************************')
-
-    total_instances_to_solve = 0
-    total_groups_to_solve = 0
-
-    base_config = config['base']
-
-    # Calcolo di ogni configurazione
-    for config_name, config_diff_from_base in config['groups'].items():
-
-        # Creazione della configurazione del gruppo corrente, sovrascrivendo
-        # alcuni parametri
-        group_config = copy.deepcopy(base_config)
-        for key, value in config_diff_from_base.items():
-            group_config[key] = value
-
-        # Controllo se la configurazione deve essere esclusa dalla risoluzione
-        if not is_combination_to_do(config_name, None, None, group_config):
-            continue
-        
-        total_groups_to_solve += 1
-        instances_number_to_solve_by_config = 0
-        group_number_to_solve_by_config = 0
-        
-        # Iterazione dei gruppi di istanze
-        for input_group_path in input_path.iterdir():
-            if not input_group_path.is_dir():
-                continue
-
-            # Controllo se il gruppo deve essere escluso dalla risoluzione
-            group_name = input_group_path.name
-            if not is_combination_to_do(config_name, group_name, None, group_config):
-                continue
-
-            instance_number_of_group = 0
-            group_number_to_solve_by_config += 1
-
-            # Iterazione di ogni istanza del gruppo
-            for input_instance_path in input_group_path.iterdir():
-                if input_instance_path.suffix != '.json':
-                    continue
-
-                # Controllo se l'istanza deve essere esclusa dalla risoluzione
-                instance_name = input_instance_path.stem
-                if not is_combination_to_do(config_name, group_name, instance_name, group_config):
-                    continue
-                
-                # Controllo sulla precedente presenza della cartella dei
-                # risultati correnti
-                group_path = output_path.joinpath(f'{config_name}__{group_name}__{input_instance_path.stem}')
-                if not can_overwrite and group_path.exists():
-                    print(f'WARNING: directory {group_path.name} already exists, will not be considered.')
-                else:
-                    instance_number_of_group += 1
-            
-            # Stampa di un avvertiento se il gruppo non ha istanza valide
-            if instance_number_of_group == 0:
-                print(f'WARNING: instance group {input_group_path.name} has no valid instances to solve')
-            
-            total_instances_to_solve += instance_number_of_group
-            instances_number_to_solve_by_config += instance_number_of_group
-
-            infos[config_name, group_name] = instance_number_of_group
-        
-        # Stampa di un avvertiento se la configurazione non ha gruppi validi
-        if group_number_to_solve_by_config == 0:
-            print(f'WARNING: configuration {config_name} has no valid groups to solve')
-        else:
-            print(f'Configuration \'{config_name}\' will be solving {instances_number_to_solve_by_config} instances in {group_number_to_solve_by_config} groups')
-    
-    # Stampa di un avvertimento se non viene risolto nulla
-    if total_groups_to_solve == 0:
-        print(f'WARNING: no configuration found')
-    else:
-        print(f'{total_groups_to_solve} configurations will be solving {total_instances_to_solve} instances overall; some may be the same, repeated in different groups')
-
-    print('*********************** [END OF PRELIMINARY INFORMATIONS] **********************\n')
-
-    return infos
-
 def solve_instance(
         instance: MasterInstance | FatSubproblemInstance | SlimSubproblemInstance,
         config,
@@ -161,6 +71,8 @@ def solve_instance(
     opt = pyo.SolverFactory('gurobi')
     opt.options['TimeLimit'] = config['solver']['time_limit']
     opt.options['SoftMemLimit'] = config['solver']['memory_limit']
+    if config['thread_budget'] > 0:
+        opt.options['Threads'] = config['thread_budget']
 
     # Copia dell'istanza nella cartella dei risultati
     with open(output_path.joinpath('instance.json'), 'w') as file:
@@ -254,12 +166,25 @@ def solve_instance(
 
     return 0
 
+def read_instance(instance_path: Path, config) -> MasterInstance | FatSubproblemInstance | SlimSubproblemInstance:
+    '''Funzione che legge l'istanza di input, del tipo richiesto dalla
+    configurazione.'''
+
+    with open(instance_path, 'r') as file:
+        if config['problem_type'] == 'monolithic' or config['problem_type'] == 'fat-master' or config['problem_type'] == 'slim-master':
+            return decode_master_instance(json.load(file))
+        else:
+            return decode_subproblem_instance(json.load(file))
+
 # Definizione dei parametri a linea di comando
 parser = ArgumentParser(prog='Iterative instance solver')
 parser.add_argument('-c', '--config', help='Location of the solving configuration', type=Path, required=True)
 parser.add_argument('-i', '--input', help='Location of instance groups', type=Path, required=True)
 parser.add_argument('-o', '--output', help='Where the output will be written', type=Path, required=True)
 parser.add_argument('--overwrite', help='If output can overwrite previous files', action='store_true')
+parser.add_argument('-j', '--jobs', help='Number of instances solved at the same time', type=int, default=1)
+parser.add_argument('-t', '--threads', help='Total solver threads shared by the running instances (0 for no limit)', type=int, default=0)
+parser.add_argument('--resume', help='Skip the instances already solved according to the job ledger', action='store_true')
 args = parser.parse_args()
 
 config_path = Path(args.config).resolve()
@@ -273,81 +198,18 @@ output_path.mkdir(exist_ok=True)
 with open(config_path, 'r') as file:
     config = yaml.load(file, yaml.CLoader)
 
-infos = get_preliminary_solving_info(config, input_path, can_overwrite)
-total_instance_solved = 0
-total_instances_to_solve = sum(infos.values())
+# Espansione della configurazione in un elenco di lavori
+ledger = read_ledger(output_path) if args.resume else None
+jobs = get_batch_jobs(config, input_path, output_path, can_overwrite, ledger)
 
-base_config = config['base']
+get_preliminary_solving_info(jobs)
 
-# Iterazione di ogni configurazione
-for config_name, config_diff_from_base in config['groups'].items():
+# Risoluzione delle istanze
+total_instance_solved, total_instance_failed = run_batch(jobs, read_instance, solve_instance, output_path, args.jobs, args.threads)
 
-    # Creazione della configurazione del gruppo corrente, sovrascrivendo alcuni
-    # parametri
-    group_config = copy.deepcopy(base_config)
-    for key, value in config_diff_from_base.items():
-        group_config[key] = value
-    
-    # Controllo se la configurazione deve essere esclusa dall'analisi
-    if not is_combination_to_do(config_name, None, None, group_config):
-        continue
-    
-    instance_solved_of_this_config = 0
-
-    # Iterazione dei gruppi di istanze
-    for input_group_path in input_path.iterdir():
-        if not input_group_path.is_dir():
-            continue
+print(f'End of tests. Solved {total_instance_solved} instances.')
 
-        # Controllo se il gruppo deve essere escluso dall'analisi
-        group_name = input_group_path.name
-        if not is_combination_to_do(config_name, group_name, None, group_config):
-            continue
-    
-        instance_solved_of_this_group = 0
-
-        # Iterazione di ogni istanza del gruppo
-        for input_instance_path in input_group_path.iterdir():
-            if input_instance_path.suffix != '.json':
-                continue
-
-            # Controllo se l'istanza deve essere esclusa dall'analisi
-            instance_name = input_instance_path.stem
-            if not is_combination_to_do(config_name, group_name, instance_name, group_config):
-                continue
-
-            # Eventuale creazione della cartella dei risultati dell'istanza
-            # corrente
-            solving_path = output_path.joinpath(f'{config_name}__{group_name}__{instance_name}')
-            if not can_overwrite and solving_path.exists():
-                print(f'Directory {solving_path} already exists.')
-                continue
-            solving_path.mkdir(exist_ok=True)
-
-            # Lettura dell'istanza di input
-            with open(input_instance_path, 'r') as file:
-                if group_config['problem_type'] == 'monolithic' or group_config['problem_type'] == 'fat-master' or group_config['problem_type'] == 'slim-master':
-                    instance = decode_master_instance(json.load(file))
-                else:
-                    instance = decode_subproblem_instance(json.load(file))
-            
-            # Aggiornamento dei contatori
-            instance_solved_of_this_group += 1
-            instance_solved_of_this_config += 1
-            total_instance_solved += 1
-
-            summary_lines = [
-                f'Solving instance \'{instance_name}\' of group \'{group_name}\' with config \'{config_name}\'',
-                f'{instance_solved_of_this_group}/{infos[config_name, group_name]} instance of this group, {instance_solved_of_this_config}/{sum(n for cg, n in infos.items() if cg[0] == config_name)} instance of this config',
-                f'{total_instance_solved}/{total_instances_to_solve} instance solving in total'
-            ]
-
-            try:
-                # Risoluzione dell'istanza corrente
-                error_code = solve_instance(instance, group_config, solving_path, summary_lines)
-                if error_code != 0:
-                    print(f'Error code: {error_code}')
-            except Exception as e:
-                print(e)
-
-print(f'End of tests. Solved {total_instance_solved} instances.')
\ No newline at end of file
+# Codice d'uscita non nullo se almeno un'istanza è terminata con un errore
+if total_instance_failed > 0:
+    print(f'{total_instance_failed} instances ended with an error.')
+    exit(1)
\ No newline at end of file
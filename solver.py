@@ -5,6 +5,7 @@ import logging
 import shutil
 import json
 import yaml
+import traceback
 import copy
 import time
 
@@ -14,11 +15,11 @@ logging.getLogger('pyomo.core').setLevel(logging.ERROR)
 from src.common.custom_types import MasterInstance, Cache, FatCore, SlimCore, DayName
 from src.common.custom_types import FatSubproblemResult, SlimSubproblemResult, FinalResult
 from src.common.custom_types import FatMasterResult, FatSubproblemInstance, SlimSubproblemInstance
-from src.common.custom_types import CacheMatch, PatientServiceOperator, IterationName
+from src.common.custom_types import CacheMatch, PatientServiceOperator, IterationName, PatientService, IterationDay
 from src.common.tools import get_subproblem_instance_from_master_result, compose_final_result
-from src.common.tools import is_combination_to_do, get_slim_subproblem_instance_from_fat
 from src.common.tools import get_all_possible_fat_master_requests, get_all_possible_slim_master_requests
-from src.common.tools import remove_requests_not_present
+from src.common.tools import remove_requests_not_present, align_subproblem_result_operators
+from src.common.day_profiles import get_day_representatives
 from src.common.file_load_and_dump import decode_master_instance, encode_master_instance, encode_master_result
 from src.common.file_load_and_dump import encode_subproblem_instance, encode_subproblem_result
 from src.common.file_load_and_dump import encode_final_result, decode_subproblem_result, encode_cores, encode_cache_matching
@@ -33,139 +34,424 @@ from src.checkers.check_cores import check_cores
 from src.milp_models.master_model import get_fat_master_model, get_slim_master_model
 from src.milp_models.master_model import get_result_from_fat_master_model, get_result_from_slim_master_model
 from src.milp_models.master_model import add_core_constraints_to_fat_master_model, add_core_constraints_to_slim_master_model
-from src.milp_models.subproblem_model import get_fat_subproblem_model, get_slim_subproblem_model
-from src.milp_models.subproblem_model import get_result_from_fat_subproblem_model, get_result_from_slim_subproblem_model
+from src.milp_models.master_model import get_master_solution_pool_size, load_master_pool_solution, terminate_persistent_solver
+from src.milp_models.master_model import set_fat_master_model_start, set_slim_master_model_start
 from src.milp_models.cache_model import get_cache_model, get_result_from_cache_model
 
 from src.cache.cache import add_final_result_to_cache, fix_cache_final_result
 from src.cache.cache import get_previous_cache_day_iterations
 
 from src.cores.generalist_cores import get_generalist_cores
-from src.cores.basic_cores import get_basic_fat_cores, get_basic_slim_cores
-from src.cores.reduced_cores import get_reduced_fat_cores, get_reduced_slim_cores
-from src.cores.pruned_cores import get_pruned_fat_cores, get_pruned_slim_cores
-from src.cores.core_expansion import expand_cores, get_subsumptions
-from src.cores.tools import aggregate_core_lists
+from src.cores.satisfiability_oracle import SatisfiabilityOracle
+from src.cores.core_expansion import get_subsumptions
+from src.cores.tools import aggregate_core_lists, remove_dominated_cores
+from src.cores.core_generation import get_cores
 
 from src.analyzers.tools import get_result_value, get_day_number_used_by_patients
 
+from src.parallel.subproblem_pool import solve_day_subproblem, solve_day_subproblems_in_parallel, get_subproblem_threads
+from src.parallel.batch import get_batch_jobs, get_preliminary_solving_info, read_ledger, run_batch
+
 
 # Questo script può essere chiamato solo direttamente dalla linea di comando
 if __name__ != '__main__':
     exit(0)
 
 
-def get_preliminary_solving_info(
+def exhume_result_from_matching(
+        matching: CacheMatch,
+        output_path: Path) -> FinalResult:
+    '''Funzione che ritorna i risultati finali relativi al matching della cache,
+    leggendoli da file.'''
+
+    final_result = FinalResult()
+
+    # Ciclo per ogni giorno
+    for day_name, iteration_name in matching.items():
+        
+        # Lettura del sottoproblema specificato dal matching
+        subproblem_result_path = output_path.joinpath(f'iter_{iteration_name}').joinpath(f'subproblem_day_{day_name}_result.json')
+        with open(subproblem_result_path, 'r') as file:
+            subproblem_result = decode_subproblem_result(json.load(file))
+        
+        final_result.scheduled[day_name] = subproblem_result.scheduled
+    
+    return final_result
+
+
+def solve_instance_with_branch_and_check(
+        master_instance: MasterInstance,
         config,
-        input_path: Path,
-        can_overwrite: bool) -> dict[tuple[str, str], int]:
-    '''Funzione che stampa a video le informazioni delle istanza che saranno
-    effettivamente risolte, data la configurazione corrente. Ritorna un
-    dizionario contenente i numeri di istanze da risolvere, indicizzate per
-    nome della configurazione e nome del gruppo.'''
+        output_path: Path,
+        iteration_summary_lines: list[str]) -> int:
+    '''Variante 'branch-and-check' della risoluzione: il master viene risolto
+    una sola volta e ogni sua soluzione intera è controllata all'interno di
+    una callback del solutore risolvendo i sottoproblemi dei giorni. I core
+    trovati sono aggiunti come tagli lazy, per cui l'albero di branch-and-bound
+    del master non viene ricostruito ad ogni iterazione. Ogni soluzione
+    controllata corrisponde ad una cartella 'iter_' dei risultati.'''
+
+    # La libreria di Gurobi è necessaria solo per le costanti della callback
+    from gurobipy import GRB
+
+    # I core sono calcolati all'interno della callback di Gurobi, da cui non è
+    # sicuro avviare processi: la potatura viene svolta in sequenza
+    if config['core_pruning']['parallel_workers'] > 1:
+        print('[CORE] WARNING: core pruning is done sequentially in branch and check mode')
+        config = copy.deepcopy(config)
+        config['core_pruning']['parallel_workers'] = 1
 
-    infos: dict[tuple[str, str], int] = {}
+    # Copia dell'istanza master nella cartella dei risultati
+    with open(output_path.joinpath('master_instance.json'), 'w') as file:
+        json.dump(encode_master_instance(master_instance), file, indent=4)
+    
+    # Copia della configurazione nella cartella dei risultati
+    with open(output_path.joinpath('config.yaml'), 'w') as file:
+        yaml.dump(config, file, indent=4, sort_keys=False)
 
-    print('\n************************** [PRELIMINARY INFORMATIONS] **************************')
+    errors = check_master_instance(master_instance)
+    if len(errors) > 0:
+        for error in errors:
+            print(f'[MASTER] ERROR: {error}')
+        return 1
 
-    total_instances_to_solve = 0
-    total_groups_to_solve = 0
+    if config['structure_type'] in ['fat-slim', 'fat-fat']:
+        all_possible_master_requests = get_all_possible_fat_master_requests(master_instance)
+    else:
+        all_possible_master_requests = get_all_possible_slim_master_requests(master_instance)
+    worst_case_day_number = get_day_number_used_by_patients(all_possible_master_requests)
 
-    base_config = config['base']
+    # Creazione del modello MILP del master
+    print('[MASTER] Start master model creation...', end='')
+    start = time.perf_counter()
+    if config['structure_type'] in ['fat-slim', 'fat-fat']:
+        master_model = get_fat_master_model(master_instance, config['master']['additional_info'])
+    else:
+        master_model = get_slim_master_model(master_instance, config['master']['additional_info'])
+    end = time.perf_counter()
+    print(f'done ({end - start:.04}s)')
 
-    # Calcolo di ogni configurazione
-    for config_name, config_diff_from_base in config['groups'].items():
+    # Ottenimento delle relazioni di minore o uguale sui giorni, per espanderli
+    if config['core_day_expansion']:
+        print('[CORE] Start subsumption computation...', end='')
+        subsumptions = get_subsumptions(master_instance, config)
+        print('ended')
+    else:
+        subsumptions = None
 
-        # Creazione della configurazione del gruppo corrente, sovrascrivendo
-        # alcuni parametri
-        group_config = copy.deepcopy(base_config)
-        for key, value in config_diff_from_base.items():
-            group_config[key] = value
+    # Il master è caricato in un solutore persistente che accetta i tagli lazy.
+    # L'unica risoluzione dispone dell'intero tempo totale
+    master_opt = pyo.SolverFactory('gurobi_persistent')
+    master_opt.options['TimeLimit'] = config['total_time_limit']
+    master_opt.options['SoftMemLimit'] = config['master']['memory_limit']
+    if config['thread_budget'] > 0:
+        master_opt.options['Threads'] = config['thread_budget']
+    master_opt.set_instance(master_model)
+    master_opt.set_gurobi_param('LazyConstraints', 1)
 
-        # Controllo se la configurazione deve essere esclusa dalla risoluzione
-        if not is_combination_to_do(config_name, None, None, group_config):
-            continue
-        
-        total_groups_to_solve += 1
-        instances_number_to_solve_by_config = 0
-        group_number_to_solve_by_config = 0
+    # Variabili da leggere per ricostruire il risultato del master
+    master_variables = list(master_model.do.values()) + list(master_model.window.values()) # type: ignore
+
+    satisfiability_oracles: dict[DayName, SatisfiabilityOracle] = {}
+
+    # Stato condiviso con la callback
+    incumbent_index = 0
+    best_final_result_value_so_far = None
+    error_code = 0
+
+    def check_incumbent_solution(callback_model, callback_opt) -> int:
+        '''Controlla la nuova soluzione intera del master con i sottoproblemi e
+        la scarta aggiungendo i core come tagli lazy. Ritorna un eventuale
+        codice di errore.'''
         
-        # Iterazione dei gruppi di istanze
-        for input_group_path in input_path.iterdir():
-            if not input_group_path.is_dir():
-                continue
+        nonlocal incumbent_index, best_final_result_value_so_far
 
-            # Controllo se il gruppo deve essere escluso dalla risoluzione
-            group_name = input_group_path.name
-            if not is_combination_to_do(config_name, group_name, None, group_config):
-                continue
+        incumbent_index += 1
 
-            instance_number_of_group = 0
-            group_number_to_solve_by_config += 1
+        # Creazione della cartella con i risultati di questa soluzione
+        iteration_path = output_path.joinpath(f'iter_{incumbent_index}')
+        if iteration_path.exists():
+            shutil.rmtree(iteration_path)
+        iteration_path.mkdir()
 
-            # Iterazione di ogni istanza del gruppo
-            for input_instance_path in input_group_path.iterdir():
-                if input_instance_path.suffix != '.json':
-                    continue
+        callback_opt.cbGetSolution(vars=master_variables)
+        if config['structure_type'] in ['fat-slim', 'fat-fat']:
+            master_result = get_result_from_fat_master_model(callback_model)
+        else:
+            master_result = get_result_from_slim_master_model(callback_model)
 
-                # Controllo se l'istanza deve essere esclusa dalla risoluzione
-                instance_name = input_instance_path.stem
-                if not is_combination_to_do(config_name, group_name, instance_name, group_config):
-                    continue
-                
-                # Controllo sulla precedente presenza della cartella dei
-                # risultati correnti
-                group_path = output_path.joinpath(f'{config_name}__{group_name}__{input_instance_path.stem}')
-                if not can_overwrite and group_path.exists():
-                    print(f'WARNING: directory {group_path.name} already exists, will not be considered.')
-                else:
-                    instance_number_of_group += 1
-            
-            # Stampa di un avvertiento se il gruppo non ha istanza valide
-            if instance_number_of_group == 0:
-                print(f'WARNING: instance group {input_group_path.name} has no valid instances to solve')
-            
-            total_instances_to_solve += instance_number_of_group
-            instances_number_to_solve_by_config += instance_number_of_group
+        with open(iteration_path.joinpath('master_result.json'), 'w') as file:
+            json.dump(encode_master_result(master_result), file, indent=4)
 
-            infos[config_name, group_name] = instance_number_of_group
-        
-        # Stampa di un avvertiento se la configurazione non ha gruppi validi
-        if group_number_to_solve_by_config == 0:
-            print(f'WARNING: configuration {config_name} has no valid groups to solve')
+        master_result_value = get_result_value(
+            master_instance, master_result,
+            config['master']['additional_info'], worst_case_day_number)
+
+        # Risoluzione dei sottoproblemi, in sequenza dato che il processo
+        # principale è all'interno del solutore del master
+        all_subproblem_instances: dict[DayName, FatSubproblemInstance] | dict[DayName, SlimSubproblemInstance] = {}
+        all_subproblem_result: dict[DayName, SlimSubproblemResult] | dict[DayName, FatSubproblemResult] = {}
+
+        for day_name in master_result.scheduled.keys():
+
+            subproblem_instance = get_subproblem_instance_from_master_result(master_instance, master_result, day_name)
+            all_subproblem_instances[day_name] = subproblem_instance # type: ignore
+
+            with open(iteration_path.joinpath(f'subproblem_day_{day_name}_instance.json'), 'w') as file:
+                json.dump(encode_subproblem_instance(subproblem_instance), file, indent=4)
+
+            subproblem_result, _, _, errors = solve_day_subproblem(
+                subproblem_instance, master_result.scheduled[day_name], day_name,
+                config, iteration_path, get_subproblem_threads(config))
+            if len(errors) > 0:
+                for error in errors:
+                    print(f'[incumbent {incumbent_index}] [SUB] ERROR: {error}')
+                return 5
+
+            all_subproblem_result[day_name] = subproblem_result # type: ignore
+
+        final_result = compose_final_result(master_instance, master_result, all_subproblem_result)
+
+        with open(iteration_path.joinpath(f'final_result.json'), 'w') as file:
+            json.dump(encode_final_result(final_result), file, indent=4)
+
+        final_result_value = get_result_value(
+            master_instance, final_result,
+            config['master']['additional_info'], worst_case_day_number)
+        print(f'[incumbent {incumbent_index}] Master value: {master_result_value}, subproblem value: {final_result_value}')
+
+        if best_final_result_value_so_far is None or final_result_value > best_final_result_value_so_far:
+            best_final_result_value_so_far = final_result_value
+            with open(output_path.joinpath(f'best_final_result_so_far.json'), 'w') as file:
+                json.dump(encode_final_result(final_result), file, indent=4)
+
+        # Se ogni giorno è completamente risolto la soluzione è accettata
+        if all(len(result.rejected) == 0 for result in all_subproblem_result.values()):
+            print(f'[incumbent {incumbent_index}] All days are satisfied, solution accepted')
+            return 0
+
+        # Riallineamento degli operatori proposti dal master
+        if config['structure_type'] == 'fat-fat':
+            for day_name, subproblem_result in all_subproblem_result.items():
+                if len(subproblem_result.rejected) > 0:
+                    align_subproblem_result_operators(subproblem_result, master_result.scheduled[day_name]) # type: ignore
+
+        cores, _ = get_cores(
+            master_instance, all_subproblem_instances, all_subproblem_result,
+            all_possible_master_requests, subsumptions, config, satisfiability_oracles)
+
+        # La soluzione rifiutata deve essere esclusa da almeno un core, per cui
+        # in mancanza di core si ripiega su quelli generalisti, sempre presenti
+        # se un giorno ha richieste non soddisfatte
+        if len(cores) == 0:
+            print(f'[incumbent {incumbent_index}] [CORE] No \'{config["core_type"]}\' core found, falling back to \'generalist\' cores')
+            cores = get_generalist_cores(all_subproblem_result)
+
+        with open(iteration_path.joinpath(f'{config["core_type"]}_cores.json'), 'w') as file:
+            json.dump(encode_cores(cores), file, indent=4)
+
+        errors = check_cores(master_instance, cores)
+        if len(errors) > 0:
+            for error in errors:
+                print(f'[incumbent {incumbent_index}] [CORE] ERROR: {error}')
+            return 7
+
+        if config['structure_type'] in ['fat-slim', 'fat-fat']:
+            add_core_constraints_to_fat_master_model(callback_model, cores, callback_opt, lazy=True) # type: ignore
         else:
-            print(f'Configuration \'{config_name}\' will be solving {instances_number_to_solve_by_config} instances in {group_number_to_solve_by_config} groups')
-    
-    # Stampa di un avvertimento se non viene risolto nulla
-    if total_groups_to_solve == 0:
-        print(f'WARNING: no configuration found')
+            add_core_constraints_to_slim_master_model(callback_model, cores, callback_opt, lazy=True) # type: ignore
+        print(f'[incumbent {incumbent_index}] [CORE] Added {len(cores)} \'{config["core_type"]}\' lazy cores')
+
+        return 0
+
+    def check_incumbent(callback_model, callback_opt, callback_where):
+        '''Callback del master che controlla ogni nuova soluzione intera.'''
+
+        nonlocal error_code
+
+        if callback_where != GRB.Callback.MIPSOL or error_code != 0:
+            return
+
+        # Gurobi ignora le eccezioni sollevate nella callback e accetterebbe la
+        # soluzione senza averla controllata: ogni errore interrompe invece la
+        # risoluzione e viene riportato come fallimento dell'istanza
+        try:
+            error_code = check_incumbent_solution(callback_model, callback_opt)
+        except Exception:
+            print(f'[incumbent {incumbent_index}] ERROR: exception while checking the incumbent')
+            traceback.print_exc()
+            error_code = 18
+
+        if error_code != 0:
+            terminate_persistent_solver(callback_opt)
+
+    master_opt.set_callback(check_incumbent)
+
+    print(f'\n*************************** [START OF BRANCH AND CHECK] ***************************')
+    for line in iteration_summary_lines:
+        print(line)
+
+    start = time.perf_counter()
+    results = master_opt.solve(master_model, logfile=output_path.joinpath('master_log.log'))
+    end = time.perf_counter()
+    print(f'[MASTER] Branch and check ended after {incumbent_index} incumbents ({end - start:.04}s)', end='')
+    if end - start >= config['total_time_limit']:
+        print(' [TIME LIMIT]')
     else:
-        print(f'{total_groups_to_solve} configurations will be solving {total_instances_to_solve} instances overall; some may be the same, repeated in different groups')
+        print('')
+
+    # Solo una risoluzione terminata all'ottimo garantisce che la migliore
+    # soluzione accettata sia ottima
+    if error_code != 0:
+        print(f'[MASTER] [STOP] Solving interrupted by an error (code {error_code})')
+    elif results.solver.termination_condition == pyo.TerminationCondition.optimal:
+        print(f'[MASTER] [STOP] Reached optimum of value: {best_final_result_value_so_far}')
+    else:
+        print(f'[MASTER] [STOP] Optimality not proven ({results.solver.termination_condition}), best solution value: {best_final_result_value_so_far}')
 
-    print('*********************** [END OF PRELIMINARY INFORMATIONS] **********************\n')
+    print(f'**************************** [END OF BRANCH AND CHECK] ****************************\n')
 
-    return infos
+    return error_code
 
 
-def exhume_result_from_matching(
-        matching: CacheMatch,
-        output_path: Path) -> FinalResult:
-    '''Funzione che ritorna i risultati finali relativi al matching della cache,
-    leggendoli da file.'''
+# Giorno già risolto, indicizzato dalla classe del giorno e dalle richieste del
+# master: coppia (i, d) in cui è stato risolto, risultato e tempo di risoluzione
+type SolvedDay = tuple[IterationDay, FatSubproblemResult | SlimSubproblemResult, float]
 
-    final_result = FinalResult()
 
-    # Ciclo per ogni giorno
-    for day_name, iteration_name in matching.items():
-        
-        # Lettura del sottoproblema specificato dal matching
-        subproblem_result_path = output_path.joinpath(f'iter_{iteration_name}').joinpath(f'subproblem_day_{day_name}_result.json')
-        with open(subproblem_result_path, 'r') as file:
-            subproblem_result = decode_subproblem_result(json.load(file))
-        
-        final_result.scheduled[day_name] = subproblem_result.scheduled
-    
-    return final_result
+def solve_master_pool_solutions(
+        master_instance: MasterInstance,
+        master_model: pyo.ConcreteModel,
+        master_opt,
+        config,
+        iteration_path: Path,
+        iteration_index: int,
+        solved_days: dict[tuple[DayName, frozenset], SolvedDay],
+        day_representatives: dict[DayName, DayName],
+        all_possible_master_requests: dict[DayName, list[PatientServiceOperator]] | dict[DayName, list[PatientService]],
+        subsumptions,
+        satisfiability_oracles: dict[DayName, SatisfiabilityOracle],
+        worst_case_day_number: int) -> tuple[list[FinalResult], list[FatCore] | list[SlimCore], float, int]:
+    '''Funzione che valuta le soluzioni non ottime presenti nel pool del master
+    dopo l'ultima risoluzione. Ogni soluzione viene salvata in una cartella
+    'pool_' dell'iterazione, i suoi giorni sono risolti (riutilizzando quelli
+    con le stesse richieste già risolti in 'solved_days') e ne vengono
+    ricavati i core. Ritorna i risultati finali, i core, il tempo di
+    risoluzione dei sottoproblemi e un eventuale codice di errore.'''
+
+    pool_size = min(get_master_solution_pool_size(master_opt), config['master']['solution_pool_size'])
+
+    final_results: list[FinalResult] = []
+    pool_cores: list[FatCore] | list[SlimCore] = []
+    time_elapsed = 0.0
+
+    for solution_number in range(1, pool_size):
+
+        pool_path = iteration_path.joinpath(f'pool_{solution_number}')
+        pool_path.mkdir()
+
+        load_master_pool_solution(master_model, master_opt, solution_number)
+        if config['structure_type'] in ['fat-slim', 'fat-fat']:
+            master_result = get_result_from_fat_master_model(master_model)
+        else:
+            master_result = get_result_from_slim_master_model(master_model)
+
+        with open(pool_path.joinpath('master_result.json'), 'w') as file:
+            json.dump(encode_master_result(master_result), file, indent=4)
+
+        if isinstance(master_result, FatMasterResult):
+            errors = check_fat_master_result(master_instance, master_result)
+        else:
+            errors = check_slim_master_result(master_instance, master_result)
+        if len(errors) > 0:
+            for error in errors:
+                print(f'[iter {iteration_index}] [POOL {solution_number}] [MASTER] ERROR: {error}')
+            return final_results, pool_cores, time_elapsed, 2
+
+        all_subproblem_instances: dict[DayName, FatSubproblemInstance] | dict[DayName, SlimSubproblemInstance] = {}
+        all_subproblem_result: dict[DayName, SlimSubproblemResult] | dict[DayName, FatSubproblemResult] = {}
+        reused_day_number = 0
+
+        for day_name, master_requests in master_result.scheduled.items():
+
+            subproblem_instance = get_subproblem_instance_from_master_result(master_instance, master_result, day_name)
+            all_subproblem_instances[day_name] = subproblem_instance # type: ignore
+
+            with open(pool_path.joinpath(f'subproblem_day_{day_name}_instance.json'), 'w') as file:
+                json.dump(encode_subproblem_instance(subproblem_instance), file, indent=4)
+
+            # Giorni della stessa classe con le stesse richieste hanno lo
+            # stesso sottoproblema. Il risultato è copiato perché il
+            # riallineamento degli operatori lo modifica
+            day_key = (day_representatives[day_name], frozenset(master_requests))
+            if day_key in solved_days:
+                subproblem_result = copy.copy(solved_days[day_key][1])
+                reused_day_number += 1
+
+                with open(pool_path.joinpath(f'subproblem_day_{day_name}_result.json'), 'w') as file:
+                    json.dump(encode_subproblem_result(subproblem_result), file, indent=4)
+
+            else:
+                subproblem_result, _, solving_time, errors = solve_day_subproblem(
+                    subproblem_instance, master_requests, day_name,
+                    config, pool_path, get_subproblem_threads(config),
+                    config['subproblem']['parallel_workers'])
+                time_elapsed += solving_time
+
+                if len(errors) > 0:
+                    for error in errors:
+                        print(f'[iter {iteration_index}] [POOL {solution_number}] [SUB] ERROR: {error}')
+                    return final_results, pool_cores, time_elapsed, 5
+
+                solved_days[day_key] = (IterationDay(iteration_index, day_name), copy.copy(subproblem_result), solving_time)
+
+            all_subproblem_result[day_name] = subproblem_result # type: ignore
+
+        final_result = compose_final_result(master_instance, master_result, all_subproblem_result)
+
+        with open(pool_path.joinpath(f'final_result.json'), 'w') as file:
+            json.dump(encode_final_result(final_result), file, indent=4)
+
+        errors = check_final_result(master_instance, final_result)
+        if len(errors) > 0:
+            for error in errors:
+                print(f'[iter {iteration_index}] [POOL {solution_number}] ERROR: {error}')
+            return final_results, pool_cores, time_elapsed, 6
+
+        final_results.append(final_result)
+
+        final_result_value = get_result_value(
+            master_instance, final_result,
+            config['master']['additional_info'], worst_case_day_number)
+        print(f'[iter {iteration_index}] [POOL {solution_number}] Combined subproblem result value: {final_result_value} ({reused_day_number}/{len(all_subproblem_result)} days reused)')
+
+        if all(len(result.rejected) == 0 for result in all_subproblem_result.values()):
+            continue
+
+        # Riallineamento degli operatori proposti dal master
+        if config['structure_type'] == 'fat-fat':
+            for day_name, subproblem_result in all_subproblem_result.items():
+                if len(subproblem_result.rejected) > 0:
+                    align_subproblem_result_operators(subproblem_result, master_result.scheduled[day_name]) # type: ignore
+
+        start = time.perf_counter()
+        cores, _ = get_cores(
+            master_instance, all_subproblem_instances, all_subproblem_result,
+            all_possible_master_requests, subsumptions, config, satisfiability_oracles)
+        end = time.perf_counter()
+        time_elapsed += end - start
+        print(f'[iter {iteration_index}] [POOL {solution_number}] [CORE] {len(cores)} \'{config["core_type"]}\' cores found ({end - start:.04}s)')
+
+        with open(pool_path.joinpath(f'{config["core_type"]}_cores.json'), 'w') as file:
+            json.dump(encode_cores(cores), file, indent=4)
+
+        pool_cores.extend(cores) # type: ignore
+
+    # Ripristino della soluzione ottima, usata come partenza della risoluzione
+    # successiva
+    master_opt.load_vars()
+
+    return final_results, pool_cores, time_elapsed, 0
 
 
 def solve_instance(
@@ -176,25 +462,59 @@ def solve_instance(
     '''Funzione che esegue il ciclo di iterazioni necessario per risolvere una
     istanza del problema master con la configurazione fornita.'''
     
-    cache: Cache = {}
+    # Il master può essere risolto una sola volta con i core come tagli lazy
+    if config['master']['branch_and_check']:
+        return solve_instance_with_branch_and_check(master_instance, config, output_path, iteration_summary_lines)
+
+    cache: Cache = Cache()
+
+    # Risposte di soddisfacibilità della potatura dei core, per ogni giorno.
+    # Dipendono solo dagli operatori del giorno e dalle richieste e sono quindi
+    # valide fra iterazioni diverse
+    satisfiability_oracles: dict[DayName, SatisfiabilityOracle] = {}
+
+    # Primo giorno della classe di equivalenza di ogni giorno: giorni con gli
+    # stessi operatori possono scambiarsi i risultati della cache
+    day_representatives: dict[DayName, DayName] = get_day_representatives(master_instance.days)
+
+    # Risultati dei giorni già risolti per classe del giorno e richieste del
+    # master. Un giorno che riceve le stesse richieste di uno già risolto ne
+    # riutilizza direttamente il risultato
+    solved_days: dict[tuple[DayName, frozenset], SolvedDay] = {}
 
     # Contatori per i valori dei migliori risultati finora incontrati
+    best_final_result_so_far: FinalResult | None = None
     best_final_result_value_so_far = None
     cache_final_result_value = None
     best_cache_result_value_so_far = None
     best_subproblem_result_value_so_far = None
 
-    master_opt = pyo.SolverFactory('gurobi')
+    # Con il master persistente il modello viene caricato nel solutore una
+    # volta sola e ad ogni iterazione vengono aggiunti solo i nuovi core
+    if config['master']['persistent']:
+        master_opt = pyo.SolverFactory('gurobi_persistent')
+    else:
+        master_opt = pyo.SolverFactory('gurobi')
     master_opt.options['TimeLimit'] = config['master']['time_limit']
     master_opt.options['SoftMemLimit'] = config['master']['memory_limit']
-
-    subproblem_opt = pyo.SolverFactory('gurobi')
-    subproblem_opt.options['TimeLimit'] = config['subproblem']['time_limit']
-    subproblem_opt.options['SoftMemLimit'] = config['subproblem']['memory_limit']
+    if config['thread_budget'] > 0:
+        master_opt.options['Threads'] = config['thread_budget']
+
+    # Il pool di soluzioni del master è leggibile solo dal solutore persistente.
+    # Gurobi cerca in modo sistematico le migliori 'solution_pool_size'
+    use_master_solution_pool = config['master']['solution_pool_size'] > 1
+    if use_master_solution_pool and not config['master']['persistent']:
+        print('[MASTER] WARNING: the master solution pool requires the persistent master, using only the optimal solution')
+        use_master_solution_pool = False
+    if use_master_solution_pool:
+        master_opt.options['PoolSolutions'] = config['master']['solution_pool_size']
+        master_opt.options['PoolSearchMode'] = 2
 
     cache_opt = pyo.SolverFactory('gurobi')
     cache_opt.options['TimeLimit'] = config['cache']['time_limit']
     cache_opt.options['SoftMemLimit'] = config['cache']['memory_limit']
+    if config['thread_budget'] > 0:
+        cache_opt.options['Threads'] = config['thread_budget']
 
     # Copia dell'istanza master nella cartella dei risultati
     with open(output_path.joinpath('master_instance.json'), 'w') as file:
@@ -236,6 +556,18 @@ def solve_instance(
     end = time.perf_counter()
     print(f'done ({end - start:.04}s)')
 
+    # Caricamento del modello nel solutore persistente, a cui verranno passati
+    # solo i vincoli dei core aggiunti di volta in volta
+    persistent_master_opt = None
+    if config['master']['persistent']:
+        print('[MASTER] Loading master model in the persistent solver...', end='')
+        start = time.perf_counter()
+        master_opt.set_instance(master_model)
+        end = time.perf_counter()
+        total_time_elapsed += end - start
+        print(f'done ({end - start:.04}s)')
+        persistent_master_opt = master_opt
+
     # Ottenimento delle relazioni di minore o uguale sui giorni, per espanderli
     if config['core_day_expansion']:
         print('[CORE] Start subsumption computation...', end='')
@@ -256,12 +588,25 @@ def solve_instance(
             shutil.rmtree(iteration_path)
         iteration_path.mkdir()
 
+        # Senza riutilizzo fra iterazioni i giorni risolti valgono solo per le
+        # soluzioni del pool della stessa iterazione
+        if not config['reuse_solved_days']:
+            solved_days.clear()
+
         print(f'\n*************************** [START OF ITERATION {iteration_index:03}] ***************************')
         if len(iteration_summary_lines) > 0:
             for line in iteration_summary_lines:
                 print(line)
             print(f'********************************************************************************')
 
+        # Il miglior risultato finale è sempre ammissibile per il master, che
+        # parte quindi da una soluzione valida anche dopo l'aggiunta dei core
+        if config['master']['warm_start_from_best_result'] and best_final_result_so_far is not None:
+            if config['structure_type'] in ['fat-slim', 'fat-fat']:
+                set_fat_master_model_start(master_model, best_final_result_so_far)
+            else:
+                set_slim_master_model_start(master_model, best_final_result_so_far)
+
         # Risoluzione del problema master
         print(f'[iter {iteration_index}] [MASTER] Starting master solving...', end='')
         start = time.perf_counter()
@@ -350,6 +695,7 @@ def solve_instance(
 
             if best_final_result_value_so_far is None or cache_final_result_value > best_final_result_value_so_far:
                 best_final_result_value_so_far = cache_final_result_value
+                best_final_result_so_far = cache_final_result
                 
                 print(f'[iter {iteration_index}] Found new best solution of value {best_final_result_value_so_far}')
                 with open(output_path.joinpath(f'best_final_result_so_far.json'), 'w') as file:
@@ -363,11 +709,12 @@ def solve_instance(
                 break
         
         if config['use_true_cache'] and iteration_index > 1:
-            previous_cache_day_iterations = get_previous_cache_day_iterations(cache, master_result)
+            previous_cache_day_iterations = get_previous_cache_day_iterations(cache, master_result, day_representatives)
             if len(previous_cache_day_iterations) > 0:
                 print(f'[iter {iteration_index}] [CACHE] Found {len(previous_cache_day_iterations)} days already solved in cache')
                 with open(iteration_path.joinpath(f'true_cache_finds.json'), 'w') as file:
-                    json.dump(previous_cache_day_iterations, file, indent=4)
+                    json.dump({day_name: {'iteration': id.iteration_name, 'day': id.day_name}
+                        for day_name, id in previous_cache_day_iterations.items()}, file, indent=4)
             else: 
                 print(f'[iter {iteration_index}] [CACHE] No already solved days found in cache')
 
@@ -377,6 +724,14 @@ def solve_instance(
 
         all_subproblem_instances: dict[DayName, FatSubproblemInstance] | dict[DayName, SlimSubproblemInstance] = {}
         all_subproblem_result:  dict[DayName, SlimSubproblemResult] | dict[DayName, FatSubproblemResult] = {}
+
+        # Istanze dei giorni che non sono presenti in cache e che dovranno
+        # essere effettivamente risolti
+        subproblem_instances_to_solve: dict[DayName, FatSubproblemInstance] | dict[DayName, SlimSubproblemInstance] = {}
+
+        # Giorni riutilizzati e tempo di risoluzione risparmiato
+        reused_day_number = 0
+        reused_solving_time = 0.0
         
         for day_name in master_result.scheduled.keys():
             
@@ -397,58 +752,41 @@ def solve_instance(
                     print(f'[iter {iteration_index}] [SUB] ERROR: {error}')
                 return 4
 
-            # Copia del risultato del giorno corrente se trovato nella cache
-            if config['use_true_cache'] and iteration_index > 1 and day_name in previous_cache_day_iterations: # type: ignore
+            # Se il giorno ha ricevuto le stesse richieste di un giorno già
+            # risolto della stessa classe il risultato viene copiato
+            day_key = (day_representatives[day_name], frozenset(master_result.scheduled[day_name]))
+            if day_key in solved_days:
+                solved_iteration_day, solved_result, solved_solving_time = solved_days[day_key]
+                subproblem_result = copy.copy(solved_result)
 
-                iteration_name: IterationName = previous_cache_day_iterations[day_name] # type: ignore
+                reused_day_number += 1
+                reused_solving_time += solved_solving_time
+                print(f'[iter {iteration_index}] [SUB] Day {day_name} unchanged, reusing result (iter {solved_iteration_day.iteration_name}, day {solved_iteration_day.day_name}, {solved_solving_time:.04}s saved)')
+
+                with open(iteration_path.joinpath(f'subproblem_day_{day_name}_result.json'), 'w') as file:
+                    json.dump(encode_subproblem_result(subproblem_result), file, indent=4)
+
+                all_subproblem_result[day_name] = subproblem_result # type: ignore
+                continue
 
-                print(f'[iter {iteration_index}] [CACHE] Found day {day_name} already in cache (iter {iteration_name})')
-                
-                previous_iteration_path = output_path.joinpath(f'iter_{iteration_name}') # type: ignore
-                with open(previous_iteration_path.joinpath(f'subproblem_day_{day_name}_result.json'), 'r') as file:
-                    subproblem_result = decode_subproblem_result(json.load(file))
-                
-                remove_requests_not_present(subproblem_result, master_result, day_name)
-            
             # Se il risultato non è già presente nella cache in una qualche
-            # iterazione precedente, risolvi il sottoproblema normalmente
-            else:
-                # Creazione del modello MILP del giorno corrente
-                print(f'[iter {iteration_index}] [SUB] Start day {day_name} model creation...', end='')
-                start = time.perf_counter()
-
-                # Se la struttura risolutiva è 'fat-fat' ed è selezionata l'opzione
-                # 'preemptive_forbidding'allora bisogna costruire l'istanza del
-                # sottoproblema dimenticandosi dei nomi degli operatori
-                if config['structure_type'] == 'fat-fat' and 'preemptive_forbidding' in config['subproblem']['additional_info']:
-                    
-                    forgetful_subproblem_instance = get_slim_subproblem_instance_from_fat(subproblem_instance) # type: ignore
-                    subproblem_model = get_fat_subproblem_model(forgetful_subproblem_instance, config['subproblem']['additional_info'], master_result.scheduled[day_name]) # type: ignore
-                
-                elif config['structure_type'] in ['slim-fat', 'fat-fat']:
-                    subproblem_model = get_fat_subproblem_model(subproblem_instance, config['subproblem']['additional_info']) # type: ignore
-                else:
-                    subproblem_model = get_slim_subproblem_model(subproblem_instance) # type: ignore
-                
-                end = time.perf_counter()
-                print(f'done ({end - start:.04}s) ', end='')
-
-                # Risoluzione del modello MILP del giorno corrente
-                print('Start solving...', end='')
-                start = time.perf_counter()
-                subproblem_opt.solve(subproblem_model, logfile=iteration_path.joinpath(f'subproblem_day_{day_name}_log.log'))
-                end = time.perf_counter()
-                total_time_elapsed += end - start
-                print(f'done ({end - start:.04}s)', end='')
-                if end - start >= config['subproblem']['time_limit']:
-                    print(' [TIME LIMIT]')
-                else:
-                    print('')
-
-                if config['structure_type'] in ['slim-fat', 'fat-fat']:
-                    subproblem_result = get_result_from_fat_subproblem_model(subproblem_model)
-                else:
-                    subproblem_result = get_result_from_slim_subproblem_model(subproblem_model)
+            # iterazione precedente, il sottoproblema andrà risolto normalmente
+            if not (config['use_true_cache'] and iteration_index > 1 and day_name in previous_cache_day_iterations): # type: ignore
+                subproblem_instances_to_solve[day_name] = subproblem_instance # type: ignore
+                continue
+
+            # Copia del risultato del giorno corrente se trovato nella cache
+            # Il risultato può provenire da un altro giorno della stessa classe
+            iteration_name: IterationName = previous_cache_day_iterations[day_name].iteration_name # type: ignore
+            cache_day_name: DayName = previous_cache_day_iterations[day_name].day_name # type: ignore
+
+            print(f'[iter {iteration_index}] [CACHE] Found day {day_name} already in cache (iter {iteration_name}, day {cache_day_name})')
+            
+            previous_iteration_path = output_path.joinpath(f'iter_{iteration_name}') # type: ignore
+            with open(previous_iteration_path.joinpath(f'subproblem_day_{cache_day_name}_result.json'), 'r') as file:
+                subproblem_result = decode_subproblem_result(json.load(file))
+            
+            remove_requests_not_present(subproblem_result, master_result, day_name)
 
             # Salvataggio dei risultati del giorno corrente
             with open(iteration_path.joinpath(f'subproblem_day_{day_name}_result.json'), 'w') as file:
@@ -461,6 +799,59 @@ def solve_instance(
                 return 5
             
             all_subproblem_result[day_name] = subproblem_result # type: ignore
+
+        # Risoluzione dei giorni rimanenti, in parallelo se configurato
+        if config['subproblem']['parallel_workers'] > 1 and len(subproblem_instances_to_solve) > 1:
+
+            print(f'[iter {iteration_index}] [SUB] Solving {len(subproblem_instances_to_solve)} days with {config["subproblem"]["parallel_workers"]} workers...', end='')
+            start = time.perf_counter()
+            outcomes = solve_day_subproblems_in_parallel(subproblem_instances_to_solve, master_result.scheduled, config, iteration_path)
+            end = time.perf_counter()
+
+            # I giorni sono risolti contemporaneamente: conta solo il tempo
+            # reale trascorso
+            total_time_elapsed += end - start
+            print(f'done ({end - start:.04}s)')
+        
+        # Con un solo giorno da risolvere il pool, se configurato, è usato per
+        # le sue componenti indipendenti
+        else:
+            outcomes = {}
+            for day_name, subproblem_instance in subproblem_instances_to_solve.items():
+                outcomes[day_name] = solve_day_subproblem(
+                    subproblem_instance, master_result.scheduled[day_name], day_name,
+                    config, iteration_path, get_subproblem_threads(config),
+                    config['subproblem']['parallel_workers'])
+                total_time_elapsed += outcomes[day_name][2]
+
+        # Unione dei risultati in ordine di giorno
+        for day_name in sorted(outcomes.keys()):
+
+            subproblem_result, model_creation_time, solving_time, errors = outcomes[day_name]
+
+            print(f'[iter {iteration_index}] [SUB] Day {day_name} model creation ({model_creation_time:.04}s), solving ({solving_time:.04}s)', end='')
+            if solving_time >= config['subproblem']['time_limit']:
+                print(' [TIME LIMIT]')
+            else:
+                print('')
+
+            if len(errors) > 0:
+                for error in errors:
+                    print(f'[iter {iteration_index}] [SUB] ERROR: {error}')
+                return 5
+            
+            all_subproblem_result[day_name] = subproblem_result # type: ignore
+
+            # Copia del risultato per le iterazioni successive, fatta prima del
+            # riallineamento degli operatori dei core
+            day_key = (day_representatives[day_name], frozenset(master_result.scheduled[day_name]))
+            solved_days[day_key] = (IterationDay(iteration_index, day_name), copy.copy(subproblem_result), solving_time)
+
+        if reused_day_number > 0:
+            print(f'[iter {iteration_index}] [SUB] Reused {reused_day_number}/{len(all_subproblem_result)} days already solved ({reused_solving_time:.04}s of solving saved)')
+
+        # Ordinamento dei risultati per giorno
+        all_subproblem_result = dict(sorted(all_subproblem_result.items(), key=lambda v: v[0])) # type: ignore
         
         ########################## FINE SOTTOPROBLEMA ##########################
         
@@ -533,7 +924,7 @@ def solve_instance(
                 with open(iteration_path.joinpath(f'preemptive_cores.json'), 'w') as file:
                         json.dump(encode_cores(preemptive_cores), file, indent=4) # type: ignore
 
-                add_core_constraints_to_fat_master_model(master_model, preemptive_cores) # type: ignore
+                add_core_constraints_to_fat_master_model(master_model, preemptive_cores, persistent_master_opt) # type: ignore
                 print(f'[iter {iteration_index}] [CORE] Added {len(preemptive_cores)} preemptive cores')
 
         final_result_value = get_result_value(
@@ -547,6 +938,7 @@ def solve_instance(
 
         if best_final_result_value_so_far is None or final_result_value > best_final_result_value_so_far:
             best_final_result_value_so_far = final_result_value
+            best_final_result_so_far = final_result
 
             print(f'[iter {iteration_index}] Found new best solution of value {best_final_result_value_so_far}')
             with open(output_path.joinpath(f'best_final_result_so_far.json'), 'w') as file:
@@ -574,6 +966,40 @@ def solve_instance(
             print(f'{day_name} ', end='')
         print('] are not completely satisfied')
 
+        ########################### INIZIO POOL MASTER #########################
+
+        pool_cores: list[FatCore] | list[SlimCore] = []
+
+        if use_master_solution_pool:
+            print(f'[iter {iteration_index}] [POOL] Evaluating the other master pool solutions')
+            pool_final_results, pool_cores, pool_time_elapsed, error_code = solve_master_pool_solutions(
+                master_instance, master_model, master_opt, config, iteration_path, iteration_index,
+                solved_days, day_representatives, all_possible_master_requests, subsumptions,
+                satisfiability_oracles, worst_case_day_number)
+            total_time_elapsed += pool_time_elapsed
+            if error_code != 0:
+                return error_code
+
+            for pool_final_result in pool_final_results:
+                pool_final_result_value = get_result_value(
+                    master_instance, pool_final_result,
+                    config['master']['additional_info'], worst_case_day_number)
+
+                if pool_final_result_value > best_subproblem_result_value_so_far:
+                    best_subproblem_result_value_so_far = pool_final_result_value
+
+                if pool_final_result_value > best_final_result_value_so_far:
+                    best_final_result_value_so_far = pool_final_result_value
+                    best_final_result_so_far = pool_final_result
+
+                    print(f'[iter {iteration_index}] [POOL] Found new best solution of value {best_final_result_value_so_far}')
+                    with open(output_path.joinpath(f'best_final_result_so_far.json'), 'w') as file:
+                        json.dump(encode_final_result(pool_final_result), file, indent=4)
+
+            print(f'[iter {iteration_index}] [POOL] Found {len(pool_cores)} cores from {len(pool_final_results)} other master solutions')
+
+        ############################ FINE POOL MASTER ##########################
+
         ############################# INIZIO CORE ##############################
         
         print(f'[iter {iteration_index}] [CORE] Starting core creation')
@@ -594,159 +1020,62 @@ def solve_instance(
                 daily_master_result: list[PatientServiceOperator] = master_result.scheduled[day_name] # type: ignore
 
                 # Ogni richiesta copia il suo operatore dal master
-                for subproblem_request in subproblem_result.scheduled:
-                    for master_request in daily_master_result:
-                        if (master_request.patient_name == subproblem_request.patient_name
-                            and master_request.service_name == subproblem_request.service_name):
-                            subproblem_request.operator_name = master_request.operator_name
-                            break
+                align_subproblem_result_operators(subproblem_result, daily_master_result)
 
-        # Ottenimento dei core
-        if config['core_type'] == 'generalist':
-            start = time.perf_counter()
-            cores = get_generalist_cores(all_subproblem_result)
-            end = time.perf_counter()
-            total_time_elapsed += end - start
-            print(f'[iter {iteration_index}] [CORE] {len(cores)} \'generalist\' cores found ({end - start:.04}s)')
+        # Codici d'errore dei controlli sui core di ogni passo
+        if config['structure_type'] in ['fat-slim', 'fat-fat']:
+            core_error_codes = {'generalist': 7, 'basic': 8, 'reduced': 9, 'pruned': 10, 'minimal': 15, 'expanded': 14}
+        else:
+            core_error_codes = {'generalist': 7, 'basic': 11, 'reduced': 12, 'pruned': 13, 'minimal': 16, 'expanded': 14}
 
-            with open(iteration_path.joinpath(f'generalist_cores.json'), 'w') as file:
-                json.dump(encode_cores(cores), file, indent=4)
-            
-            errors = check_cores(master_instance, cores)
+        def save_and_check_cores(stage_name: str, stage_cores: list, elapsed: float) -> int:
+            '''Salva e controlla i core di un passo della loro generazione.'''
+
+            nonlocal total_time_elapsed
+
+            # Il tempo dell'espansione non è conteggiato nel tempo totale
+            if stage_name != 'expanded':
+                total_time_elapsed += elapsed
+            print(f'[iter {iteration_index}] [CORE] {len(stage_cores)} \'{stage_name}\' cores found ({elapsed:.04}s)')
+
+            with open(iteration_path.joinpath(f'{stage_name}_cores.json'), 'w') as file:
+                json.dump(encode_cores(stage_cores), file, indent=4)
+
+            errors = check_cores(master_instance, stage_cores)
             if len(errors) > 0:
                 for error in errors:
                     print(f'[iter {iteration_index}] [CORE] ERROR: {error}')
-                return 7
-        else:
-            # Master fat
-            if config['structure_type'] in ['fat-slim', 'fat-fat']:
-                
-                if config['core_type'] in ['basic', 'reduced', 'pruned']:
-                    start = time.perf_counter()
-                    cores = get_basic_fat_cores(all_subproblem_result)
-                    end = time.perf_counter()
-                    total_time_elapsed += end - start
-                    print(f'[iter {iteration_index}] [CORE] {len(cores)} \'basic\' cores found ({end - start:.04}s)')
-
-                    with open(iteration_path.joinpath(f'basic_cores.json'), 'w') as file:
-                        json.dump(encode_cores(cores), file, indent=4)
-                    
-                    errors = check_cores(master_instance, cores)
-                    if len(errors) > 0:
-                        for error in errors:
-                            print(f'[iter {iteration_index}] [CORE] ERROR: {error}')
-                        return 8
-                
-                if config['core_type'] in ['reduced', 'pruned']:
-                    start = time.perf_counter()
-                    cores = get_reduced_fat_cores(cores) # type: ignore
-                    end = time.perf_counter()
-                    total_time_elapsed += end - start
-                    print(f'[iter {iteration_index}] [CORE] {len(cores)} \'reduced\' cores found ({end - start:.04}s)')
-
-                    with open(iteration_path.joinpath(f'reduced_cores.json'), 'w') as file:
-                        json.dump(encode_cores(cores), file, indent=4)
-                    
-                    errors = check_cores(master_instance, cores)
-                    if len(errors) > 0:
-                        for error in errors:
-                            print(f'[iter {iteration_index}] [CORE] ERROR: {error}')
-                        return 9
-                
-                if config['core_type'] in ['pruned']:
-                    start = time.perf_counter()
-                    cores = get_pruned_fat_cores(all_subproblem_instances, cores, config) # type: ignore
-                    end = time.perf_counter()
-                    total_time_elapsed += end - start
-                    print(f'[iter {iteration_index}] [CORE] {len(cores)} \'pruned\' cores found ({end - start:.04}s)')
-
-                    with open(iteration_path.joinpath(f'pruned_cores.json'), 'w') as file:
-                        json.dump(encode_cores(cores), file, indent=4)
-                    
-                    errors = check_cores(master_instance, cores)
-                    if len(errors) > 0:
-                        for error in errors:
-                            print(f'[iter {iteration_index}] [CORE] ERROR: {error}')
-                        return 10
-            
-            # Master slim
-            else:
-                
-                if config['core_type'] in ['basic', 'reduced', 'pruned']:
-                    start = time.perf_counter()
-                    cores = get_basic_slim_cores(all_subproblem_result) # type: ignore
-                    end = time.perf_counter()
-                    total_time_elapsed += end - start
-                    print(f'[iter {iteration_index}] [CORE] {len(cores)} \'basic\' cores found ({end - start:.04}s)')
-
-                    with open(iteration_path.joinpath(f'basic_cores.json'), 'w') as file:
-                        json.dump(encode_cores(cores), file, indent=4)
-
-                    errors = check_cores(master_instance, cores)
-                    if len(errors) > 0:
-                        for error in errors:
-                            print(f'[iter {iteration_index}] [CORE] ERROR: {error}')
-                        return 11
-                
-                if config['core_type'] in ['reduced', 'pruned']:
-                    start = time.perf_counter()
-                    cores = get_reduced_slim_cores(master_instance.services, cores) # type: ignore
-                    end = time.perf_counter()
-                    total_time_elapsed += end - start
-                    print(f'[iter {iteration_index}] [CORE] {len(cores)} \'reduced\' cores found ({end - start:.04}s)')
-
-                    with open(iteration_path.joinpath(f'reduced_cores.json'), 'w') as file:
-                        json.dump(encode_cores(cores), file, indent=4)
-                    
-                    errors = check_cores(master_instance, cores)
-                    if len(errors) > 0:
-                        for error in errors:
-                            print(f'[iter {iteration_index}] [CORE] ERROR: {error}')
-                        return 12
-                
-                if config['core_type'] in ['pruned']:
-                    start = time.perf_counter()
-                    cores = get_pruned_slim_cores(all_subproblem_result, all_subproblem_instances, cores, config) # type: ignore
-                    end = time.perf_counter()
-                    total_time_elapsed += end - start
-                    print(f'[iter {iteration_index}] [CORE] {len(cores)} \'pruned\' cores found ({end - start:.04}s)')
-
-                    with open(iteration_path.joinpath(f'pruned_cores.json'), 'w') as file:
-                        json.dump(encode_cores(cores), file, indent=4)
-                    
-                    errors = check_cores(master_instance, cores)
-                    if len(errors) > 0:
-                        for error in errors:
-                            print(f'[iter {iteration_index}] [CORE] ERROR: {error}')
-                        return 13
-        
-        print(f'[iter {iteration_index}] [CORE] Cores creation done')
+                return core_error_codes[stage_name]
+            return 0
 
-        # Espansione dei core
-        if config['core_patient_expansion'] or config['core_service_expansion'] or config['core_operator_expansion'] or config['core_day_expansion']:
-            print(f'[iter {iteration_index}] [CORE] Starting core expansion')
-            expanded_cores = expand_cores(cores, all_possible_master_requests, master_instance.services, config, subsumptions)
-            print(f'[iter {iteration_index}] [CORE] End of core expansion. Found {len(expanded_cores)} cores from starting with {len(cores)} cores')
+        # Ottenimento dei core, salvati e controllati dopo ogni passo
+        cores, error_code = get_cores(
+            master_instance, all_subproblem_instances, all_subproblem_result,
+            all_possible_master_requests, subsumptions, config, satisfiability_oracles,
+            stage_hook=save_and_check_cores)
+        if error_code != 0:
+            return error_code
 
-            # Se per qualche motivo l'espansione non ha prodotto il caso
-            # denegenere a->a, aggiungilo e rimuovi eventuali duplicati
-            cores = aggregate_core_lists(cores, expanded_cores)
-            print(f'[iter {iteration_index}] [CORE] {len(cores)} cores remaining after aggregate and duplicate removal')
+        print(f'[iter {iteration_index}] [CORE] Cores creation done')
+
+        # Unione dei core delle altre soluzioni del pool, senza duplicati né
+        # core implicati da altri core dello stesso giorno
+        if len(pool_cores) > 0:
+            cores = aggregate_core_lists(cores, pool_cores)
+            cores = remove_dominated_cores(cores)
+            print(f'[iter {iteration_index}] [CORE] {len(cores)} cores remaining after adding the master pool cores and dominance removal')
 
-            with open(iteration_path.joinpath(f'expanded_cores.json'), 'w') as file:
-                json.dump(encode_cores(cores), file, indent=4)
-            
             errors = check_cores(master_instance, cores)
             if len(errors) > 0:
                 for error in errors:
                     print(f'[iter {iteration_index}] [CORE] ERROR: {error}')
-                return 14
+                return 17
 
         # Aggiunta dei vincoli dei core nel master
         if config['structure_type'] in ['fat-slim', 'fat-fat']:
-            add_core_constraints_to_fat_master_model(master_model, cores) # type: ignore
+            add_core_constraints_to_fat_master_model(master_model, cores, persistent_master_opt) # type: ignore
         else:
-            add_core_constraints_to_slim_master_model(master_model, cores) # type: ignore
+            add_core_constraints_to_slim_master_model(master_model, cores, persistent_master_opt) # type: ignore
 
         ############################## FINE CORE ###############################
 
@@ -788,12 +1117,21 @@ def solve_instance(
 
     return 0
 
+def read_instance(instance_path: Path, config) -> MasterInstance:
+    '''Funzione che legge l'istanza master di input.'''
+
+    with open(instance_path, 'r') as file:
+        return decode_master_instance(json.load(file))
+
 # Definizione dei parametri a linea di comando
 parser = ArgumentParser(prog='Iterative instance solver')
 parser.add_argument('-c', '--config', help='Location of the solving configuration', type=Path, required=True)
 parser.add_argument('-i', '--input', help='Location of master instance groups', type=Path, required=True)
 parser.add_argument('-o', '--output', help='Where the output will be written', type=Path, required=True)
 parser.add_argument('--overwrite', help='If output can overwrite previous files', action='store_true')
+parser.add_argument('-j', '--jobs', help='Number of instances solved at the same time', type=int, default=1)
+parser.add_argument('-t', '--threads', help='Total solver threads shared by the running instances (0 for no limit)', type=int, default=0)
+parser.add_argument('--resume', help='Skip the instances already solved according to the job ledger', action='store_true')
 args = parser.parse_args()
 
 config_path = Path(args.config).resolve()
@@ -807,75 +1145,18 @@ output_path.mkdir(exist_ok=True)
 with open(config_path, 'r') as file:
     config = yaml.load(file, yaml.CLoader)
 
-infos = get_preliminary_solving_info(config, input_path, can_overwrite)
-total_instance_solved = 0
-total_instances_to_solve = sum(infos.values())
-
-base_config = config['base']
-
-# Iterazione di ogni configurazione
-for config_name, config_diff_from_base in config['groups'].items():
-
-    # Creazione della configurazione del gruppo corrente, sovrascrivendo alcuni
-    # parametri
-    group_config = copy.deepcopy(base_config)
-    for key, value in config_diff_from_base.items():
-        group_config[key] = value
-    
-    # Controllo se la configurazione deve essere esclusa dall'analisi
-    if not is_combination_to_do(config_name, None, None, group_config):
-        continue
-    
-    instance_solved_of_this_config = 0
-
-    # Iterazione dei gruppi di istanze
-    for input_group_path in input_path.iterdir():
-        if not input_group_path.is_dir():
-            continue
-
-        # Controllo se il gruppo deve essere escluso dall'analisi
-        group_name = input_group_path.name
-        if not is_combination_to_do(config_name, group_name, None, group_config):
-            continue
-    
-        instance_solved_of_this_group = 0
-
-        # Iterazione di ogni istanza del gruppo
-        for input_instance_path in input_group_path.iterdir():
-            if input_instance_path.suffix != '.json':
-                continue
+# Espansione della configurazione in un elenco di lavori
+ledger = read_ledger(output_path) if args.resume else None
+jobs = get_batch_jobs(config, input_path, output_path, can_overwrite, ledger)
 
-            # Controllo se l'istanza deve essere esclusa dall'analisi
-            instance_name = input_instance_path.stem
-            if not is_combination_to_do(config_name, group_name, instance_name, group_config):
-                continue
+get_preliminary_solving_info(jobs)
 
-            # Eventuale creazione della cartella dei risultati dell'istanza
-            # corrente
-            solving_path = output_path.joinpath(f'{config_name}__{group_name}__{instance_name}')
-            if not can_overwrite and solving_path.exists():
-                print(f'Directory {solving_path} already exists.')
-                continue
-            solving_path.mkdir(exist_ok=True)
+# Risoluzione delle istanze
+total_instance_solved, total_instance_failed = run_batch(jobs, read_instance, solve_instance, output_path, args.jobs, args.threads)
 
-            # Lettura dell'istanza master di input
-            with open(input_instance_path, 'r') as file:
-                master_instance = decode_master_instance(json.load(file))
-            
-            # Aggiornamento dei contatori
-            instance_solved_of_this_group += 1
-            instance_solved_of_this_config += 1
-            total_instance_solved += 1
-
-            iteration_summary_lines = [
-                f'Solving instance \'{instance_name}\' of group \'{group_name}\' with config \'{config_name}\'',
-                f'{instance_solved_of_this_group}/{infos[config_name, group_name]} instance of this group, {instance_solved_of_this_config}/{sum(n for cg, n in infos.items() if cg[0] == config_name)} instance of this config',
-                f'{total_instance_solved}/{total_instances_to_solve} instance solving in total'
-            ]
-
-            # Risoluzione dell'istanza corrente
-            error_code = solve_instance(master_instance, group_config, solving_path, iteration_summary_lines)
-            if error_code != 0:
-                print(f'Error code: {error_code}')
+print(f'End of tests. Solved {total_instance_solved} instances.')
 
-print(f'End of tests. Solved {total_instance_solved} instances.')
\ No newline at end of file
+# Codice d'uscita non nullo se almeno un'istanza è terminata con un errore
+if total_instance_failed > 0:
+    print(f'{total_instance_failed} instances ended with an error.')
+    exit(1)
\ No newline at end of file
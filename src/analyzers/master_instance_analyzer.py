@@ -1,44 +1,39 @@
+import numpy as np
+
 from src.common.custom_types import MasterInstance
+from src.common.columnar_instance import get_columnar_master_instance, get_care_unit_capacities
+from src.common.columnar_instance import get_care_unit_operator_numbers, get_window_overlap_counts
 
 def analyze_master_instance(instance: MasterInstance) -> dict[str, int | float]:
 
+    # Gli aggregati sono calcolati sulla vista a colonne dell'istanza
+    columnar = get_columnar_master_instance(instance)
+
     day_number = len(instance.days)
 
-    care_unit_total_number = sum(len(day.care_units) for day in instance.days.values())
-    care_unit_durations = [sum(operator.duration for operator in care_unit.values()) for day in instance.days.values() for care_unit in day.care_units.values()]
+    # Solo le coppie (giorno, unità di cura) con almeno un operatore
+    operator_numbers = get_care_unit_operator_numbers(columnar)
+    care_unit_durations = get_care_unit_capacities(columnar)[operator_numbers > 0]
+    care_unit_total_number = len(care_unit_durations)
 
-    operator_total_number = sum(len(care_unit) for day in instance.days.values() for care_unit in day.care_units.values())
-    operator_durations = [operator.duration for day in instance.days.values() for care_unit in day.care_units.values() for operator in care_unit.values()]
-    operator_total_duration = sum(operator_durations)
+    operator_durations = columnar.operator_durations
+    operator_total_number = len(operator_durations)
+    operator_total_duration = int(operator_durations.sum())
 
-    service_durations = [service.duration for service in instance.services.values()]
+    service_durations = columnar.service_durations
     
-    all_windows = [window for patient in instance.patients.values() for windows in patient.requests.values() for window in windows]
-    total_window_number = len(all_windows)
-    all_window_sizes = [window.end - window.start + 1 for window in all_windows]
-    total_time_slots_requested = sum(all_window_sizes)
+    total_window_number = len(columnar.window_starts)
+    all_window_sizes = columnar.window_ends - columnar.window_starts + 1
+    total_time_slots_requested = int(all_window_sizes.sum())
     
     patient_number = len(instance.patients)
     patient_request_numbers = [sum(len(windows) for windows in patient.requests.items()) for patient in instance.patients.values()]
 
-    windows_overapping_per_patient: list[int] = []
-    day_number_used_per_patient: list[int] = []
-
-    for patient in instance.patients.values():
-        
-        patient_windows = [window for windows in patient.requests.values() for window in windows]
-        day_number_used_per_patient.append(len([day_name for window in patient_windows for day_name in range(window.start, window.end + 1)]))
-        
-        overlapping_windows = 0
-        for i in range(len(patient_windows) - 1):
-            window = patient_windows[i]
-            for j in range(i + 1, len(patient_windows)):
-                if window.overlaps(patient_windows[j]):
-                    overlapping_windows += 1
-        
-        windows_overapping_per_patient.append(overlapping_windows)
+    # Giorni (con ripetizioni) coperti dalle finestre di ogni paziente
+    day_number_used_per_patient = np.bincount(columnar.window_patients, weights=all_window_sizes, minlength=patient_number).astype(np.int64)
     
-    total_overlapping_windows = sum(windows_overapping_per_patient)
+    windows_overapping_per_patient = get_window_overlap_counts(columnar)
+    total_overlapping_windows = int(windows_overapping_per_patient.sum())
 
     return {
         'day_number': day_number,
@@ -48,24 +43,24 @@ def analyze_master_instance(instance: MasterInstance) -> dict[str, int | float]:
         'total_window_number': total_window_number,
         
         'average_care_unit_per_day': care_unit_total_number / day_number,
-        'min_care_unit_duration': min(care_unit_durations),
-        'max_care_unit_duration': max(care_unit_durations),
-        'average_care_unit_duration': sum(care_unit_durations) / care_unit_total_number,
+        'min_care_unit_duration': int(care_unit_durations.min()),
+        'max_care_unit_duration': int(care_unit_durations.max()),
+        'average_care_unit_duration': int(care_unit_durations.sum()) / care_unit_total_number,
         
-        'min_operator_duration': min(operator_durations),
-        'max_operator_duration': max(operator_durations),
+        'min_operator_duration': int(operator_durations.min()),
+        'max_operator_duration': int(operator_durations.max()),
         'average_operator_duration': operator_total_duration / operator_total_number,
         
-        'min_service_duration': min(service_durations),
-        'max_service_duration': max(service_durations),
-        'average_service_duration': sum(service_durations) / len(instance.services),
+        'min_service_duration': int(service_durations.min()),
+        'max_service_duration': int(service_durations.max()),
+        'average_service_duration': int(service_durations.sum()) / len(instance.services),
         
         'operator_total_duration': operator_total_duration,
         'total_time_slots_requested': total_time_slots_requested,
         'request_over_disponibility_ratio': total_time_slots_requested / operator_total_duration,
         
-        'min_window_size': min(all_window_sizes),
-        'max_window_size': max(all_window_sizes),
+        'min_window_size': int(all_window_sizes.min()),
+        'max_window_size': int(all_window_sizes.max()),
         'average_window_size': total_time_slots_requested / total_window_number,
         
         'min_patient_request_number': min(patient_request_numbers),
@@ -73,11 +68,11 @@ def analyze_master_instance(instance: MasterInstance) -> dict[str, int | float]:
         'average_patient_request_number': sum(patient_request_numbers) / patient_number,
         
         'total_overlapping_windows': total_overlapping_windows,
-        'min_windows_overapping_per_patient': min(windows_overapping_per_patient),
-        'max_windows_overapping_per_patient': max(windows_overapping_per_patient),
+        'min_windows_overapping_per_patient': int(windows_overapping_per_patient.min()),
+        'max_windows_overapping_per_patient': int(windows_overapping_per_patient.max()),
         'average_windows_overapping_per_patient': total_overlapping_windows / patient_number,
         
-        'min_day_number_used_per_patient': min(day_number_used_per_patient),
-        'max_day_number_used_per_patient': max(day_number_used_per_patient),
-        'average_day_number_used_per_patient': sum(day_number_used_per_patient) / patient_number
+        'min_day_number_used_per_patient': int(day_number_used_per_patient.min()),
+        'max_day_number_used_per_patient': int(day_number_used_per_patient.max()),
+        'average_day_number_used_per_patient': int(day_number_used_per_patient.sum()) / patient_number
     }
\ No newline at end of file
@@ -3,6 +3,7 @@ from pathlib import Path
 from src.common.custom_types import MasterInstance, FatMasterResult, SlimMasterResult, FinalResult
 from src.common.custom_types import PatientName, DayName, PatientService, PatientServiceOperator
 from src.common.custom_types import PatientServiceOperatorTimeSlot
+from src.common.schedule_index import ScheduleIndex
 
 def analyze_log(log_path: Path) -> dict[str, int | float | str]:
 
@@ -57,6 +58,44 @@ def analyze_log(log_path: Path) -> dict[str, int | float | str]:
 
     return analysis
 
+def analyze_component_logs(log_paths: list[Path]) -> dict[str, int | float | str]:
+    '''Funzione che unisce i log delle componenti di un giorno risolte
+    separatamente, nell'ordine in cui sono state risolte. Valori, limiti,
+    tempi e dimensioni dei modelli vengono sommati; il giorno è ottimo solo se
+    ogni componente lo è.'''
+
+    analysis: dict[str, int | float | str] = {'component_number': len(log_paths)}
+
+    elapsed_time = 0.0
+    for log_path in log_paths:
+        component_analysis = analyze_log(log_path)
+
+        for key in ['objective_value', 'upper_bound', 'time', 'constraint_number', 'variable_number',
+                    'presolved_constraint_number', 'presolved_variable_number']:
+            if key in component_analysis:
+                analysis[key] = analysis.get(key, 0) + component_analysis[key] # type: ignore
+
+        # Una rilassazione non disponibile rende non disponibile quella totale
+        if 'root_relaxation' in component_analysis:
+            if component_analysis['root_relaxation'] < 0 or analysis.get('root_relaxation', 0) < 0: # type: ignore
+                analysis['root_relaxation'] = -1.0
+            else:
+                analysis['root_relaxation'] = analysis.get('root_relaxation', 0) + component_analysis['root_relaxation'] # type: ignore
+
+        if 'status' in component_analysis and analysis.get('status') != 'time_limit':
+            analysis['status'] = component_analysis['status']
+
+        # Le componenti sono risolte una dopo l'altra: l'ultima soluzione
+        # migliorante arriva dopo i tempi delle componenti precedenti
+        if 'best_solution_time' in component_analysis:
+            analysis['best_solution_time'] = elapsed_time + component_analysis['best_solution_time'] # type: ignore
+        elapsed_time += component_analysis.get('time', 0.0) # type: ignore
+
+    if 'objective_value' in analysis and 'upper_bound' in analysis and analysis['objective_value'] != 0:
+        analysis['gap'] = 100.0 * abs(analysis['upper_bound'] - analysis['objective_value']) / abs(analysis['objective_value']) # type: ignore
+
+    return analysis
+
 def get_day_number_used_by_patients(all_days_requests: dict[DayName, list[PatientServiceOperator]] | dict[DayName, list[PatientService]] | dict[DayName, list[PatientServiceOperatorTimeSlot]]) -> int:
 
     day_used_by_patient: dict[PatientName, set[DayName]] = {}
@@ -74,22 +113,15 @@ def get_result_value(
         additional_info: list[str],
         worst_case_day_number: int | None) -> float:
 
+    # Indice delle richieste programmate, costruito una sola volta
+    schedule_index = ScheduleIndex(result.scheduled)
+
     value = 0
     for patient_name, patient in instance.patients.items():
         for service_name, windows in patient.requests.items():
             for window in windows:
                 
-                is_window_satisfied = False
-                
-                for day_index in range(window.start, window.end + 1):
-                    for request in result.scheduled[day_index]:
-                        if patient_name == request.patient_name and service_name == request.service_name:
-                            is_window_satisfied = True
-                            break
-                    if is_window_satisfied:
-                        break
-
-                if is_window_satisfied:
+                if schedule_index.is_window_satisfied(patient_name, service_name, window):
                     value += instance.services[service_name].duration * instance.patients[patient_name].priority
 
     if 'minimize_hospital_accesses' in additional_info and worst_case_day_number is not None:
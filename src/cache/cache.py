@@ -1,7 +1,8 @@
 from src.common.custom_types import Cache, PatientServiceWindow, DayName, IterationDay
 from src.common.custom_types import MasterInstance, FinalResult, IterationName
-from src.common.custom_types import PatientServiceOperatorTimeSlot
+from src.common.custom_types import PatientServiceOperatorTimeSlot, PatientService
 from src.common.custom_types import FatMasterResult, SlimMasterResult
+from src.common.schedule_index import ScheduleIndex
 
 def is_request_already_present(
         cache: Cache,
@@ -9,35 +10,22 @@ def is_request_already_present(
         day_name: DayName) -> bool:
     """Controlla se le richieste da aggiungere in cache sono già presenti tutte
     nello stesso giorno ma in un'altra iterazione."""
+
+    if len(requests_to_add) == 0:
+        return True
     
-    # Elenco di (i, d) che possiedono tutte le richieste da aggiungere in
-    # cache (diminuiranno di volta in volta)
-    possible_values: set[IterationDay] | None = None
-    
-    # Ogni richiesta deve essere presente in una stessa iterazione
-    for request in requests_to_add:
+    # Se la cache non contiene ancora una delle richieste allora di sicuro
+    # la combinazione di richieste non è presente
+    mask = cache.get_mask(requests_to_add)
+    if mask is None:
+        return False
 
-        # Se la cache non contiene ancora una delle richieste allora di sicuro
-        # la combinazione di richieste non è presente
-        if request not in cache:
-            return False
-        
-        # La prima richiesta popola le iterazioni possibili con tutte quelle che
-        # possiedono la richiesta
-        if possible_values is None:
-            possible_values = {id for id in cache[request] if id.day_name == day_name}
-        
-        # Dalla seconda richiesta scarteremo le iterazioni che non permettono
-        # di mantenere soddisfatte tutte le richieste incontrate fino ad ora
-        else:
-            possible_values.intersection_update(cache[request])
-        
-        # Se non si hanno più iterazioni possibili allora la combinazione di
-        # richieste è nuova
-        if len(possible_values) == 0:
-            return False
+    # Ogni richiesta deve essere presente in una stessa iterazione
+    for iteration_name in cache.iterations.get(day_name, []):
+        if cache.request_masks[IterationDay(iteration_name, day_name)] & mask == mask:
+            return True
 
-    return True
+    return False
 
 def add_final_result_to_cache(
         cache: Cache, master_instance: MasterInstance,
@@ -66,13 +54,14 @@ def add_final_result_to_cache(
             continue
 
         # Aggiungi la coppia (i, d) alla cache per ogni richiesta toccata
-        for request in requests_to_add:
-            if request not in cache:
-                cache[request] = []
-            cache[request].append(IterationDay(iteration_name, day_name))
+        cache.add_iteration_day(IterationDay(iteration_name, day_name), requests_to_add)
 
 def fix_cache_final_result(master_instance: MasterInstance, final_result: FinalResult):
 
+    # Indice delle richieste programmate e rifiutate, aggiornato ad ogni
+    # rimozione
+    schedule_index = ScheduleIndex(final_result.scheduled, final_result.rejected)
+
     for patient_name, patient in master_instance.patients.items():
         for service_name, windows in patient.requests.items():
             for window in windows:
@@ -80,44 +69,47 @@ def fix_cache_final_result(master_instance: MasterInstance, final_result: FinalR
                 is_satisfied = False
                 requests_to_remove: dict[DayName, PatientServiceOperatorTimeSlot] = {}
                 
-                for day_name in range(window.start, window.end + 1):
+                for day_name in schedule_index.get_days(patient_name, service_name):
+                    if not window.contains(day_name):
+                        continue
                     
-                    for request in final_result.scheduled[day_name]:
-                        if patient_name == request.patient_name and service_name == request.service_name:
-                            if is_satisfied:
-                                requests_to_remove[day_name] = request
-                            is_satisfied = True
+                    for request in schedule_index.get_requests(patient_name, service_name, day_name):
+                        if is_satisfied:
+                            requests_to_remove[day_name] = request
+                        is_satisfied = True
                             
                 for day_name, request in requests_to_remove.items():
                     final_result.scheduled[day_name].remove(request)
+                    schedule_index.remove(day_name, request)
 
     for patient_name, patient in master_instance.patients.items():
         for service_name, windows in patient.requests.items():
             for window in windows:
                 
-                is_satisfied = False
-                for day_name in range(window.start, window.end + 1):
-                    for request in final_result.scheduled[day_name]:
-                        if patient_name == request.patient_name and service_name == request.service_name:
-                            is_satisfied = True
-                            break
-                    if is_satisfied:
-                        break
-                
-                if not is_satisfied:
+                if not schedule_index.is_window_satisfied(patient_name, service_name, window):
                     request = PatientServiceWindow(patient_name, service_name, window)
-                    if request not in final_result.rejected:
-                        final_result.rejected.append(PatientServiceWindow(patient_name, service_name, window))
+                    if request not in schedule_index.rejected:
+                        final_result.rejected.append(request)
+                        schedule_index.rejected.add(request)
 
 def get_previous_cache_day_iterations(
         cache: Cache,
-        master_result: FatMasterResult | SlimMasterResult) -> dict[DayName, IterationName]:
-    '''Funzione che ritorna un dizionario [day, iteration] per tutti quei giorni
-    che sono già presenti in cache. Risulta valido anche un sottoinsieme di
-    richieste, per cui è necessario eliminare dai risultati quelle eventualmente
-    sovrabbondanti.'''
-
-    previous_cache_day_iterations: dict[DayName, IterationName] = {}
+        master_result: FatMasterResult | SlimMasterResult,
+        day_representatives: dict[DayName, DayName] | None = None) -> dict[DayName, IterationDay]:
+    '''Funzione che ritorna un dizionario [day, (iteration, day)] per tutti
+    quei giorni che sono già presenti in cache. Risulta valido anche un
+    sottoinsieme di richieste, per cui è necessario eliminare dai risultati
+    quelle eventualmente sovrabbondanti. Se vengono fornite le classi di giorni
+    equivalenti (come rappresentante di ogni giorno) è valido anche il
+    risultato di un altro giorno della stessa classe, preferendo comunque
+    quello del giorno stesso.'''
+
+    previous_cache_day_iterations: dict[DayName, IterationDay] = {}
+
+    def is_same_class(day_name: DayName, other_day_name: DayName) -> bool:
+        if day_representatives is None:
+            return day_name == other_day_name
+        return day_representatives[day_name] == day_representatives[other_day_name]
 
     for day_name, requests in master_result.scheduled.items():
         
@@ -128,34 +120,18 @@ def get_previous_cache_day_iterations(
         # Ogni richiesta deve essere presente in una stessa iterazione
         for request in requests:
 
-            # Se la cache non contiene ancora una delle richieste allora di sicuro
-            # la combinazione di richieste non è presente
-            request_in_cache = False
-            for psw in cache.keys():
-                if psw.patient_name == request.patient_name and psw.service_name == request.service_name:
-                    request_in_cache = True
-                    break
-            if not request_in_cache:
-                possible_values = set()
-                break
+            # Coppie (i, d) della stessa classe di giorni che possiedono la
+            # richiesta in una qualsiasi delle sue finestre
+            current_possible_values = {id
+                for id in cache.get_iteration_days(PatientService(request.patient_name, request.service_name))
+                if is_same_class(id.day_name, day_name)}
             
-            # La prima richiesta popola le iterazioni possibili con tutte quelle che
-            # possiedono la richiesta
+            # La prima richiesta popola le iterazioni possibili, dalla seconda
+            # scarteremo le iterazioni che non permettono di mantenere
+            # soddisfatte tutte le richieste incontrate fino ad ora
             if possible_values is None:
-                possible_values = {id
-                    for psw, ids in cache.items() for id in ids
-                    if psw.patient_name == request.patient_name and
-                       psw.service_name == request.service_name and
-                       id.day_name == day_name}
-            
-            # Dalla seconda richiesta scarteremo le iterazioni che non permettono
-            # di mantenere soddisfatte tutte le richieste incontrate fino ad ora
+                possible_values = current_possible_values
             else:
-                current_possible_values = {id
-                    for psw, ids in cache.items() for id in ids
-                    if psw.patient_name == request.patient_name and
-                       psw.service_name == request.service_name and
-                       id.day_name == day_name}
                 possible_values.intersection_update(current_possible_values)
             
             # Se non si hanno più iterazioni possibili allora la combinazione di
@@ -164,6 +140,7 @@ def get_previous_cache_day_iterations(
                 break
 
         if possible_values is not None and len(possible_values) > 0:
-            previous_cache_day_iterations[day_name] = possible_values.pop().iteration_name
+            previous_cache_day_iterations[day_name] = min(possible_values,
+                key=lambda id: (id.day_name != day_name, id.iteration_name, id.day_name))
 
     return previous_cache_day_iterations
\ No newline at end of file
@@ -0,0 +1,191 @@
+from pathlib import Path
+import hashlib
+import json
+import sys
+import os
+
+from src.common.custom_types import FatSubproblemInstance, SlimSubproblemInstance, PatientName
+from src.common.custom_types import FatSubproblemResult, SlimSubproblemResult
+from src.common.custom_types import PatientServiceOperatorTimeSlot, PatientServiceOperator, PatientService
+from src.common.day_profiles import get_day_profile
+
+# Cache su disco dei risultati dei sottoproblemi, condivisa fra iterazioni,
+# istanze e configurazioni. Ogni risultato è salvato in un file il cui nome è
+# l'impronta della forma canonica dell'istanza: profilo del giorno, servizi
+# richiesti e multiinsieme dei pazienti descritti da priorità e richieste. I
+# nomi dei pazienti non fanno parte della chiave e sono rinominati ad ogni
+# lettura. L'ultimo accesso ad ogni file (data di modifica) permette di
+# eliminare i risultati usati meno di recente.
+
+# Numero di risultati di ogni cartella della cache, contato una sola volta e
+# poi aggiornato ad ogni nuova scrittura. Altri processi possono scrivere nella
+# stessa cartella, per cui il valore è una stima che viene corretta ad ogni
+# eliminazione
+entry_numbers: dict[Path, int] = {}
+
+# Frazione della dimensione massima a cui viene ridotta la cache quando la
+# supera: la cartella viene scansionata solo una volta ogni molte scritture
+EVICTION_TARGET_RATIO = 0.9
+
+
+def get_subproblem_instance_key(
+        instance: FatSubproblemInstance | SlimSubproblemInstance,
+        config) -> tuple[str, list[PatientName]]:
+    '''Funzione che ritorna l'impronta della forma canonica dell'istanza e
+    l'elenco dei suoi pazienti nell'ordine canonico. Pazienti con la stessa
+    priorità e le stesse richieste sono intercambiabili.'''
+
+    patient_signatures: dict[PatientName, tuple] = {}
+    service_names: set[str] = set()
+
+    for patient_name, patient in instance.patients.items():
+        if isinstance(instance, FatSubproblemInstance):
+            requests = sorted((request.service_name, request.operator_name) for request in patient.requests) # type: ignore
+            service_names.update(request.service_name for request in patient.requests) # type: ignore
+        else:
+            requests = sorted(patient.requests) # type: ignore
+            service_names.update(patient.requests) # type: ignore
+        patient_signatures[patient_name] = (patient.priority, tuple(requests))
+
+    canonical_patient_names = sorted(patient_signatures.keys(), key=lambda p: (patient_signatures[p], p))
+
+    canonical_form = {
+        'structure_type': config['structure_type'],
+        'additional_info': sorted(config['subproblem']['additional_info']),
+        'day': get_day_profile(instance.day),
+        'services': sorted((s, instance.services[s].care_unit_name, instance.services[s].duration) for s in service_names),
+        'patients': [patient_signatures[p] for p in canonical_patient_names]
+    }
+
+    key = hashlib.sha256(json.dumps(canonical_form).encode()).hexdigest()
+
+    return key, canonical_patient_names
+
+
+def load_cached_subproblem_result(
+        cache_path: Path,
+        instance: FatSubproblemInstance | SlimSubproblemInstance,
+        config) -> FatSubproblemResult | SlimSubproblemResult | None:
+    '''Funzione che ritorna il risultato salvato di un'istanza con la stessa
+    forma canonica, con i pazienti rinominati su quelli dell'istanza fornita.
+    Ritorna None se il risultato non è presente.'''
+
+    key, canonical_patient_names = get_subproblem_instance_key(instance, config)
+    file_path = cache_path.joinpath(f'{key}.json')
+
+    try:
+        with open(file_path, 'r') as file:
+            obj = json.load(file)
+        os.utime(file_path)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    if config['structure_type'] in ['slim-fat', 'fat-fat']:
+        result = SlimSubproblemResult()
+    else:
+        result = FatSubproblemResult()
+
+    # I pazienti sono salvati con la loro posizione nell'ordine canonico
+    for request in obj['scheduled']:
+        result.scheduled.append(PatientServiceOperatorTimeSlot(
+            canonical_patient_names[request['patient']],
+            sys.intern(request['service']),
+            sys.intern(request['operator']),
+            request['time']))
+
+    for request in obj['rejected']:
+        if isinstance(result, FatSubproblemResult):
+            result.rejected.append(PatientServiceOperator(
+                canonical_patient_names[request['patient']],
+                sys.intern(request['service']),
+                sys.intern(request['operator'])))
+        else:
+            result.rejected.append(PatientService(
+                canonical_patient_names[request['patient']],
+                sys.intern(request['service'])))
+
+    # Ordina le chiavi come nei risultati ottenuti dai modelli
+    result.scheduled.sort(key=lambda r: (r.patient_name, r.service_name, r.operator_name, r.time_slot))
+    result.rejected.sort(key=lambda r: (r.patient_name, r.service_name)) # type: ignore
+
+    return result
+
+
+def store_subproblem_result(
+        cache_path: Path,
+        instance: FatSubproblemInstance | SlimSubproblemInstance,
+        result: FatSubproblemResult | SlimSubproblemResult,
+        config):
+    '''Funzione che salva il risultato di un'istanza nella cache ed elimina i
+    risultati usati meno di recente se viene superata la dimensione massima.
+    La scrittura passa da un file temporaneo in modo che processi diversi non
+    leggano mai un file incompleto.'''
+
+    key, canonical_patient_names = get_subproblem_instance_key(instance, config)
+    patient_indexes = {patient_name: index for index, patient_name in enumerate(canonical_patient_names)}
+
+    obj = {
+        'scheduled': [],
+        'rejected': []
+    }
+
+    for request in result.scheduled:
+        obj['scheduled'].append({
+            'patient': patient_indexes[request.patient_name],
+            'service': request.service_name,
+            'operator': request.operator_name,
+            'time': request.time_slot
+        })
+
+    for request in result.rejected:
+        if isinstance(result, FatSubproblemResult):
+            obj['rejected'].append({
+                'patient': patient_indexes[request.patient_name],
+                'service': request.service_name,
+                'operator': request.operator_name # type: ignore
+            })
+        else:
+            obj['rejected'].append({
+                'patient': patient_indexes[request.patient_name],
+                'service': request.service_name
+            })
+
+    cache_path.mkdir(parents=True, exist_ok=True)
+    file_path = cache_path.joinpath(f'{key}.json')
+    is_new_entry = not file_path.exists()
+
+    temporary_file_path = cache_path.joinpath(f'{key}.{os.getpid()}.tmp')
+    with open(temporary_file_path, 'w') as file:
+        json.dump(obj, file)
+    os.replace(temporary_file_path, file_path)
+
+    if cache_path not in entry_numbers:
+        entry_numbers[cache_path] = len(list(cache_path.glob('*.json')))
+    elif is_new_entry:
+        entry_numbers[cache_path] += 1
+
+    max_entry_number = config['subproblem']['persistent_cache_size']
+    if entry_numbers[cache_path] > max_entry_number:
+        entry_numbers[cache_path] = evict_subproblem_cache(cache_path, int(max_entry_number * EVICTION_TARGET_RATIO))
+
+
+def evict_subproblem_cache(cache_path: Path, max_entry_number: int) -> int:
+    '''Funzione che elimina i risultati usati meno di recente finché la cache
+    non contiene al più 'max_entry_number' risultati. Ritorna il numero di
+    risultati rimasti.'''
+
+    file_paths = list(cache_path.glob('*.json'))
+    if len(file_paths) <= max_entry_number:
+        return len(file_paths)
+
+    last_uses: dict[Path, float] = {}
+    for file_path in file_paths:
+        try:
+            last_uses[file_path] = file_path.stat().st_mtime
+        except FileNotFoundError:
+            continue
+
+    for file_path in sorted(last_uses.keys(), key=lambda f: last_uses[f])[:len(last_uses) - max_entry_number]:
+        file_path.unlink(missing_ok=True)
+
+    return min(len(last_uses), max_entry_number)
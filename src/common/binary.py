@@ -9,6 +9,7 @@ from src.common.custom_types import PatientServiceOperator, Service, ServiceOper
 from src.common.custom_types import MasterPatient, Window, Day, Operator, PatientService
 from src.common.custom_types import ServiceName, PatientName, OperatorName, CareUnitName, DayName
 from src.common.custom_types import PatientServiceOperatorTimeSlot
+from src.common.day_profiles import get_day_classes
 
 
 MASTER_INSTANCE = 0
@@ -57,37 +58,7 @@ def reverse_code(code) -> dict[int, str]:
 
 
 def are_days_all_equal(days: dict[DayName, Day]) -> bool:
-
-    day_to_compare = None
-    
-    for day in days.values():
-        
-        if day_to_compare is None:
-            day_to_compare = day
-            continue
-
-        if len(day.care_units) != len(day_to_compare.care_units):
-            return False
-        
-        for care_unit_name, care_unit in day.care_units.items():
-            
-            if care_unit_name not in day_to_compare.care_units:
-                return False
-            
-            care_unit_to_compare = day_to_compare.care_units[care_unit_name]
-            if len(care_unit) != len(care_unit_to_compare):
-                return False
-            
-            for operator_name, operator in care_unit.items():
-            
-                if operator_name not in care_unit_to_compare:
-                    return False
-                operator_to_compare = care_unit_to_compare[operator_name]
-            
-                if operator.start != operator_to_compare.start or operator.duration != operator_to_compare.duration:
-                    return False
-        
-    return True
+    return len(get_day_classes(days)) <= 1
             
 
 def compress_services(b: list[int], services: dict[ServiceName, Service], codes: dict):
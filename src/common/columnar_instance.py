@@ -0,0 +1,152 @@
+from dataclasses import dataclass, field
+import numpy as np
+
+from src.common.custom_types import MasterInstance, PatientName, ServiceName, CareUnitName
+from src.common.custom_types import OperatorName, DayName, Window
+
+
+@dataclass
+class ColumnarMasterInstance:
+    '''Vista a colonne di un'istanza master: finestre, servizi e operatori sono
+    righe di array NumPy in cui pazienti, servizi, unità di cura e giorni sono
+    indicati dalla loro posizione negli elenchi dei nomi. Le righe mantengono
+    l'ordine di iterazione dell'istanza di partenza.'''
+
+    patient_names: list[PatientName] = field(default_factory=list)
+    service_names: list[ServiceName] = field(default_factory=list)
+    care_unit_names: list[CareUnitName] = field(default_factory=list)
+    day_names: list[DayName] = field(default_factory=list)
+    operator_names: list[OperatorName] = field(default_factory=list)
+
+    # Priorità di ogni paziente
+    patient_priorities: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+
+    # Finestre (paziente, servizio, inizio, fine)
+    window_patients: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    window_services: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    window_starts: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    window_ends: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+
+    # Servizi (unità di cura, durata)
+    service_care_units: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    service_durations: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+
+    # Operatori (giorno, unità di cura, inizio, durata)
+    operator_days: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    operator_care_units: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    operator_starts: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    operator_durations: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+
+    def get_window(self, window_index: int) -> Window:
+        return Window(int(self.window_starts[window_index]), int(self.window_ends[window_index]))
+
+
+def get_columnar_master_instance(instance: MasterInstance) -> ColumnarMasterInstance:
+    '''Funzione che costruisce la vista a colonne di un'istanza master.'''
+
+    columnar = ColumnarMasterInstance()
+
+    columnar.patient_names = list(instance.patients.keys())
+    columnar.service_names = list(instance.services.keys())
+    columnar.day_names = list(instance.days.keys())
+
+    care_unit_indexes: dict[CareUnitName, int] = {}
+    for service in instance.services.values():
+        care_unit_indexes.setdefault(service.care_unit_name, len(care_unit_indexes))
+    for day in instance.days.values():
+        for care_unit_name in day.care_units.keys():
+            care_unit_indexes.setdefault(care_unit_name, len(care_unit_indexes))
+    columnar.care_unit_names = list(care_unit_indexes.keys())
+
+    service_indexes = {service_name: index for index, service_name in enumerate(columnar.service_names)}
+
+    columnar.patient_priorities = np.array([patient.priority for patient in instance.patients.values()], dtype=np.int64)
+
+    columnar.service_care_units = np.array([care_unit_indexes[service.care_unit_name] for service in instance.services.values()], dtype=np.int64)
+    columnar.service_durations = np.array([service.duration for service in instance.services.values()], dtype=np.int64)
+
+    windows = [(patient_index, service_indexes[service_name], window.start, window.end)
+        for patient_index, patient in enumerate(instance.patients.values())
+        for service_name, service_windows in patient.requests.items()
+        for window in service_windows]
+    window_columns = np.array(windows, dtype=np.int64).reshape(-1, 4)
+    columnar.window_patients = window_columns[:, 0].copy()
+    columnar.window_services = window_columns[:, 1].copy()
+    columnar.window_starts = window_columns[:, 2].copy()
+    columnar.window_ends = window_columns[:, 3].copy()
+
+    operators = []
+    for day_index, day in enumerate(instance.days.values()):
+        for care_unit_name, care_unit in day.care_units.items():
+            for operator_name, operator in care_unit.items():
+                columnar.operator_names.append(operator_name)
+                operators.append((day_index, care_unit_indexes[care_unit_name], operator.start, operator.duration))
+    operator_columns = np.array(operators, dtype=np.int64).reshape(-1, 4)
+    columnar.operator_days = operator_columns[:, 0].copy()
+    columnar.operator_care_units = operator_columns[:, 1].copy()
+    columnar.operator_starts = operator_columns[:, 2].copy()
+    columnar.operator_durations = operator_columns[:, 3].copy()
+
+    return columnar
+
+
+def get_care_unit_capacities(columnar: ColumnarMasterInstance) -> np.ndarray:
+    '''Matrice (giorno, unità di cura) della durata totale degli operatori.'''
+
+    capacities = np.zeros((len(columnar.day_names), len(columnar.care_unit_names)), dtype=np.int64)
+    np.add.at(capacities, (columnar.operator_days, columnar.operator_care_units), columnar.operator_durations)
+
+    return capacities
+
+
+def get_care_unit_operator_numbers(columnar: ColumnarMasterInstance) -> np.ndarray:
+    '''Matrice (giorno, unità di cura) del numero di operatori.'''
+
+    operator_numbers = np.zeros((len(columnar.day_names), len(columnar.care_unit_names)), dtype=np.int64)
+    np.add.at(operator_numbers, (columnar.operator_days, columnar.operator_care_units), 1)
+
+    return operator_numbers
+
+
+def get_window_overlap_counts(columnar: ColumnarMasterInstance) -> np.ndarray:
+    '''Numero di coppie di finestre sovrapposte (estremi compresi) di ogni
+    paziente. Le coppie disgiunte sono quelle in cui una finestra finisce
+    prima dell'inizio dell'altra e vengono contate con una ricerca binaria
+    sugli inizi ordinati, per cui il calcolo non è quadratico nel numero di
+    finestre del paziente.'''
+
+    patient_number = len(columnar.patient_names)
+    window_numbers = np.bincount(columnar.window_patients, minlength=patient_number)
+
+    # Chiavi (paziente, giorno) ordinabili come un unico intero
+    offset = int(max(columnar.window_ends.max(initial=0), columnar.window_starts.max(initial=0))) + 2
+    sorted_start_keys = np.sort(columnar.window_patients * offset + columnar.window_starts)
+    end_keys = columnar.window_patients * offset + columnar.window_ends
+
+    # Finestre dello stesso paziente che iniziano dopo la fine di ognuna
+    group_ends = np.searchsorted(sorted_start_keys, (columnar.window_patients + 1) * offset, side='left')
+    later_windows = group_ends - np.searchsorted(sorted_start_keys, end_keys, side='right')
+    disjoint_pairs = np.bincount(columnar.window_patients, weights=later_windows, minlength=patient_number).astype(np.int64)
+
+    return window_numbers * (window_numbers - 1) // 2 - disjoint_pairs
+
+
+def get_day_candidate_windows(columnar: ColumnarMasterInstance) -> dict[DayName, np.ndarray]:
+    '''Indici delle finestre che contengono ogni giorno, nell'ordine delle
+    finestre. Sono le richieste che il master può programmare in quel giorno.'''
+
+    window_sizes = columnar.window_ends - columnar.window_starts + 1
+    window_indexes = np.repeat(np.arange(len(window_sizes)), window_sizes)
+
+    # Giorno di ogni coppia (finestra, giorno) come inizio più scostamento
+    group_starts = np.repeat(np.cumsum(window_sizes) - window_sizes, window_sizes)
+    day_names = columnar.window_starts[window_indexes] + np.arange(len(window_indexes)) - group_starts
+
+    order = np.argsort(day_names, kind='stable')
+    day_names = day_names[order]
+    window_indexes = window_indexes[order]
+
+    unique_day_names, day_starts = np.unique(day_names, return_index=True)
+    candidate_windows = np.split(window_indexes, day_starts[1:])
+
+    return {int(day_name): windows for day_name, windows in zip(unique_day_names, candidate_windows)}
@@ -13,12 +13,17 @@ type IterationName = int
 
 # STRUTTURE DATI BASICHE #######################################################
 
-@dataclass
+# I tipi valore (finestre e combinazioni di paziente, servizio, operatore e
+# slot temporale) sono immutabili e senza dizionario degli attributi: occupano
+# meno memoria e il loro hash non può cambiare dopo l'inserimento in un
+# insieme. I nomi letti da file sono internati in 'file_load_and_dump'
+
+@dataclass(slots=True)
 class Service:
     care_unit_name: CareUnitName
     duration: TimeSlot
 
-@dataclass
+@dataclass(slots=True)
 class Operator:
     care_unit_name: CareUnitName
     start: TimeSlot
@@ -52,7 +57,12 @@ class Day:
         
         return 0
 
-@dataclass(unsafe_hash=True, eq=True)
+# Forma canonica di un giorno: due giorni con lo stesso profilo hanno gli
+# stessi operatori (nome, inizio e durata) nelle stesse unità di cura
+type CareUnitProfile = tuple[tuple[OperatorName, TimeSlot, TimeSlot], ...]
+type DayProfile = tuple[tuple[CareUnitName, CareUnitProfile], ...]
+
+@dataclass(frozen=True, slots=True, eq=True)
 class Window:
     start: DayName
     end: DayName
@@ -68,39 +78,107 @@ class Window:
         return ((self.start <= window.start and self.end >= window.start) or
                 (window.start <= self.start and window.end >= self.start))
 
-@dataclass(unsafe_hash=True, eq=True, order=True)
+@dataclass(frozen=True, slots=True, eq=True, order=True)
 class PatientService:
     patient_name: PatientName
     service_name: ServiceName
 
-@dataclass(unsafe_hash=True, eq=True, order=True)
+@dataclass(frozen=True, slots=True, eq=True, order=True)
 class ServiceWindow:
     service_name: ServiceName
     window: Window
 
-@dataclass(unsafe_hash=True, eq=True, order=True)
+@dataclass(frozen=True, slots=True, eq=True, order=True)
 class ServiceOperator:
     service_name: ServiceName
     operator_name: OperatorName
 
-@dataclass(unsafe_hash=True, eq=True, order=True)
+@dataclass(frozen=True, slots=True, eq=True, order=True)
 class PatientServiceWindow(PatientService):
     window: Window
 
-@dataclass(unsafe_hash=True, eq=True, order=True)
+@dataclass(frozen=True, slots=True, eq=True, order=True)
 class PatientServiceOperator(PatientService):
     operator_name: OperatorName
 
-@dataclass(unsafe_hash=True, eq=True, order=True)
+@dataclass(frozen=True, slots=True, eq=True, order=True)
 class PatientServiceOperatorTimeSlot(PatientServiceOperator):
     time_slot: TimeSlot
 
-@dataclass(unsafe_hash=True, eq=True)
+@dataclass(frozen=True, slots=True, eq=True)
 class IterationDay:
     iteration_name: IterationName
     day_name: DayName
 
-type Cache = dict[PatientServiceWindow, list[IterationDay]]
+@dataclass
+class Cache:
+    '''Richieste soddisfatte da ogni coppia (i, d) delle iterazioni precedenti,
+    con indici inversi che permettono ricerche lineari nella dimensione del
+    risultato invece che in quella dell'intera cache.'''
+
+    # Coppie (i, d) che soddisfano ogni richiesta
+    iteration_days: dict[PatientServiceWindow, list[IterationDay]] = field(default_factory=dict)
+
+    # Finestre presenti in cache per ogni coppia (p, s)
+    windows: dict[PatientService, list[Window]] = field(default_factory=dict)
+
+    # Iterazioni presenti in cache per ogni giorno
+    iterations: dict[DayName, list[IterationName]] = field(default_factory=dict)
+
+    # Richieste di ogni coppia (i, d) come maschera di bit sui codici delle
+    # richieste
+    request_codes: dict[PatientServiceWindow, int] = field(default_factory=dict)
+    request_masks: dict[IterationDay, int] = field(default_factory=dict)
+
+    def get_mask(self, requests: set[PatientServiceWindow]) -> int | None:
+        '''Maschera di bit delle richieste, oppure None se almeno una non è
+        ancora presente in cache.'''
+
+        mask = 0
+        for request in requests:
+            if request not in self.request_codes:
+                return None
+            mask |= 1 << self.request_codes[request]
+
+        return mask
+
+    def add_iteration_day(self, iteration_day: IterationDay, requests: set[PatientServiceWindow]):
+        '''Aggiunge la coppia (i, d) con le richieste che soddisfa. Una coppia
+        già presente viene ignorata, dato che ripeterla duplicherebbe i suoi
+        termini nei vincoli del modello di selezione della cache.'''
+
+        if iteration_day in self.request_masks:
+            return
+
+        for request in requests:
+            if request not in self.iteration_days:
+                self.iteration_days[request] = []
+                self.request_codes[request] = len(self.request_codes)
+
+                patient_service = PatientService(request.patient_name, request.service_name)
+                if patient_service not in self.windows:
+                    self.windows[patient_service] = []
+                self.windows[patient_service].append(request.window)
+
+            self.iteration_days[request].append(iteration_day)
+
+        if iteration_day.day_name not in self.iterations:
+            self.iterations[iteration_day.day_name] = []
+        self.iterations[iteration_day.day_name].append(iteration_day.iteration_name)
+
+        self.request_masks[iteration_day] = self.get_mask(requests) # type: ignore
+
+    def get_iteration_days(self, patient_service: PatientService) -> set[IterationDay]:
+        '''Coppie (i, d) che soddisfano la coppia (p, s) in una qualsiasi delle
+        sue finestre.'''
+
+        iteration_days: set[IterationDay] = set()
+        for window in self.windows.get(patient_service, []):
+            iteration_days.update(self.iteration_days[PatientServiceWindow(
+                patient_service.patient_name, patient_service.service_name, window)])
+
+        return iteration_days
+
 type CacheMatch = dict[DayName, IterationName]
 
 # PAZIENTE #####################################################################
@@ -206,6 +284,13 @@ class FinalResult(AbstractMasterResult):
 class AbstractCore:
     day: DayName
 
+    @property
+    def signature(self) -> tuple[DayName, frozenset]:
+        """Firma canonica del core: due core con la stessa firma producono lo
+        stesso taglio nel master, indipendentemente dall'ordine delle
+        componenti."""
+        return (self.day, frozenset(self.components)) # type: ignore
+
 @dataclass
 class SlimCore(AbstractCore):
     reason: list[PatientService] = field(default_factory=list)
@@ -0,0 +1,80 @@
+from src.common.custom_types import Day, DayName, DayProfile, CareUnitProfile, CareUnitName
+from src.common.custom_types import Operator, OperatorName, TimeSlot
+
+
+def get_care_unit_profile(care_unit: dict[OperatorName, Operator]) -> CareUnitProfile:
+    '''Forma canonica di un'unità di cura: l'elenco ordinato degli operatori
+    con il loro inizio e la loro durata.'''
+
+    return tuple(sorted((operator_name, operator.start, operator.duration) for operator_name, operator in care_unit.items()))
+
+
+def get_day_profile(day: Day) -> DayProfile:
+    '''Forma canonica di un giorno: l'elenco ordinato delle unità di cura con
+    il loro profilo. Due giorni con lo stesso profilo sono intercambiabili.'''
+
+    return tuple(sorted((care_unit_name, get_care_unit_profile(care_unit)) for care_unit_name, care_unit in day.care_units.items()))
+
+
+def get_day_classes(days: dict[DayName, Day]) -> dict[DayProfile, list[DayName]]:
+    '''Funzione che raggruppa i giorni in classi di equivalenza secondo il loro
+    profilo. I giorni di ogni classe mantengono l'ordine di partenza.'''
+
+    day_classes: dict[DayProfile, list[DayName]] = {}
+
+    for day_name, day in days.items():
+        day_profile = get_day_profile(day)
+        if day_profile not in day_classes:
+            day_classes[day_profile] = []
+        day_classes[day_profile].append(day_name)
+
+    return day_classes
+
+
+def get_day_representatives(days: dict[DayName, Day]) -> dict[DayName, DayName]:
+    '''Funzione che associa ad ogni giorno il primo giorno della sua classe di
+    equivalenza, su cui possono essere svolti i calcoli dell'intera classe.'''
+
+    day_representatives: dict[DayName, DayName] = {}
+
+    for day_names in get_day_classes(days).values():
+        for day_name in day_names:
+            day_representatives[day_name] = day_names[0]
+
+    return day_representatives
+
+
+def get_max_spans(days: dict[DayName, Day]) -> dict[DayName, TimeSlot]:
+    '''Numero di slot temporali fra il primo inizio e l'ultima fine degli
+    operatori di ogni giorno, calcolato una volta per classe.'''
+
+    max_spans: dict[DayName, TimeSlot] = {}
+
+    for day_names in get_day_classes(days).values():
+
+        day = days[day_names[0]]
+        min_time_slot = min([o.start for o in day.operators.values()])
+        max_time_slot = max([o.start + o.duration for o in day.operators.values()])
+
+        for day_name in day_names:
+            max_spans[day_name] = max_time_slot - min_time_slot
+
+    return max_spans
+
+
+def get_care_unit_durations(days: dict[DayName, Day]) -> dict[tuple[DayName, CareUnitName], TimeSlot]:
+    '''Durata totale degli operatori di ogni coppia (giorno, unità di cura),
+    calcolata una volta per classe.'''
+
+    care_unit_durations: dict[tuple[DayName, CareUnitName], TimeSlot] = {}
+
+    for day_names in get_day_classes(days).values():
+
+        day = days[day_names[0]]
+        for care_unit_name in day.care_units.keys():
+            care_unit_duration = day.duration(care_unit_name)
+
+            for day_name in day_names:
+                care_unit_durations[(day_name, care_unit_name)] = care_unit_duration
+
+    return care_unit_durations
@@ -0,0 +1,89 @@
+from src.common.custom_types import FatSubproblemInstance, SlimSubproblemInstance, PatientName
+from src.common.custom_types import FatSubproblemResult, SlimSubproblemResult
+
+
+def get_subproblem_instance_components(
+        instance: FatSubproblemInstance | SlimSubproblemInstance) -> list[FatSubproblemInstance] | list[SlimSubproblemInstance]:
+    '''Funzione che suddivide l'istanza del sottoproblema nelle sue componenti
+    connesse. Due pazienti sono collegati se richiedono lo stesso operatore
+    (istanze 'fat') o la stessa unità di cura (istanze 'slim'): richieste di
+    componenti diverse non interagiscono e possono essere risolte
+    separatamente. Le componenti sono ordinate per nome del primo paziente.'''
+
+    # Risorse (operatori o unità di cura) toccate da ogni paziente
+    resources_by_patient: dict[PatientName, set[str]] = {}
+    patients_by_resource: dict[str, set[PatientName]] = {}
+
+    for patient_name, patient in instance.patients.items():
+
+        resources_by_patient[patient_name] = set()
+
+        for request in patient.requests:
+            if isinstance(instance, FatSubproblemInstance):
+                resource_name = request.operator_name # type: ignore
+            else:
+                resource_name = instance.services[request].care_unit_name # type: ignore
+
+            resources_by_patient[patient_name].add(resource_name)
+            if resource_name not in patients_by_resource:
+                patients_by_resource[resource_name] = set()
+            patients_by_resource[resource_name].add(patient_name)
+
+    components: list[FatSubproblemInstance] | list[SlimSubproblemInstance] = []
+    patients_visited: set[PatientName] = set()
+
+    for patient_name in sorted(instance.patients.keys()):
+        if patient_name in patients_visited:
+            continue
+
+        # Visita di tutti i pazienti raggiungibili da quello corrente
+        patients_to_visit: set[PatientName] = set([patient_name])
+        component_patient_names: set[PatientName] = set()
+
+        while len(patients_to_visit) > 0:
+
+            # Estrai un paziente e segnalo come visitato
+            current_patient_name = patients_to_visit.pop()
+            patients_visited.add(current_patient_name)
+            component_patient_names.add(current_patient_name)
+
+            # Ogni paziente che condivide una risorsa viene aggiunto
+            for resource_name in resources_by_patient[current_patient_name]:
+                for other_patient_name in patients_by_resource[resource_name]:
+                    if other_patient_name not in patients_visited:
+                        patients_to_visit.add(other_patient_name)
+
+        if isinstance(instance, FatSubproblemInstance):
+            component = FatSubproblemInstance(day=instance.day, services=instance.services)
+        else:
+            component = SlimSubproblemInstance(day=instance.day, services=instance.services)
+
+        # I pazienti sono copiati mantenendo l'ordine dell'istanza originale
+        for other_patient_name, patient in instance.patients.items():
+            if other_patient_name in component_patient_names:
+                component.patients[other_patient_name] = patient # type: ignore
+
+        components.append(component) # type: ignore
+
+    return components
+
+
+def merge_subproblem_results(
+        results: list[FatSubproblemResult] | list[SlimSubproblemResult]) -> FatSubproblemResult | SlimSubproblemResult:
+    '''Funzione che unisce i risultati delle componenti di un sottoproblema in
+    un unico risultato, ordinato come quelli ottenuti dai modelli.'''
+
+    if len(results) > 0 and isinstance(results[0], FatSubproblemResult):
+        merged_result = FatSubproblemResult()
+    else:
+        merged_result = SlimSubproblemResult()
+
+    for result in results:
+        merged_result.scheduled.extend(result.scheduled)
+        merged_result.rejected.extend(result.rejected) # type: ignore
+
+    # Ordina le chiavi
+    merged_result.scheduled.sort(key=lambda r: (r.patient_name, r.service_name, r.operator_name, r.time_slot))
+    merged_result.rejected.sort(key=lambda r: (r.patient_name, r.service_name))
+
+    return merged_result
@@ -1,3 +1,5 @@
+import sys
+
 from src.common.custom_types import MasterInstance, Service, Day, Operator, MasterPatient
 from src.common.custom_types import ServiceWindow, Window, FatMasterResult, SlimMasterResult
 from src.common.custom_types import FatSubproblemInstance, SlimSubproblemInstance, FatSubproblemResult, SlimSubproblemResult
@@ -11,10 +13,10 @@ def decode_master_instance(obj) -> MasterInstance:
 
     for service_name, service in obj['services'].items():
         
-        care_unit_name = service['care_unit']
+        care_unit_name = sys.intern(service['care_unit'])
         duration = service['duration']
         
-        instance.services[service_name] = Service(care_unit_name, duration)
+        instance.services[sys.intern(service_name)] = Service(care_unit_name, duration)
     
     for day_name, day in obj['days'].items():
         
@@ -26,17 +28,18 @@ def decode_master_instance(obj) -> MasterInstance:
                 start = operator['start']
                 duration = operator['duration']
 
-                instance.days[int(day_name)].add_operator(operator_name, Operator(
-                    care_unit_name, start, duration))
+                instance.days[int(day_name)].add_operator(sys.intern(operator_name), Operator(
+                    sys.intern(care_unit_name), start, duration))
     
     for patient_name, patient in obj['patients'].items():
         
+        patient_name = sys.intern(patient_name)
         instance.patients[patient_name] = MasterPatient(patient['priority'])
         
         service_windows: set[ServiceWindow] = set()
         for service_name, windows in patient['requests'].items():
             for window in windows:
-                service_windows.add(ServiceWindow(service_name, Window(window[0], window[1])))
+                service_windows.add(ServiceWindow(sys.intern(service_name), Window(window[0], window[1])))
         
         instance.patients[patient_name].add_requests(list(service_windows))
 
@@ -127,15 +130,15 @@ def decode_master_result(obj) -> FatMasterResult | SlimMasterResult:
         for request in requests:
             if isinstance(result, FatMasterResult):
                 result.scheduled[int(day_name)].append(PatientServiceOperator(
-                    request['patient'], request['service'], request['operator']))
+                    sys.intern(request['patient']), sys.intern(request['service']), sys.intern(request['operator'])))
             else:
                 result.scheduled[int(day_name)].append(PatientService(
-                    request['patient'], request['service']))
+                    sys.intern(request['patient']), sys.intern(request['service'])))
     
     for request in obj['rejected']:
         result.rejected.append(PatientServiceWindow(
-            request['patient'],
-            request['service'],
+            sys.intern(request['patient']),
+            sys.intern(request['service']),
             Window(request['window'][0], request['window'][1])))
 
     return result
@@ -178,26 +181,28 @@ def decode_subproblem_instance(obj) -> FatSubproblemInstance | SlimSubproblemIns
         instance = SlimSubproblemInstance()
     
     for service_name, service in obj['services'].items():
-        instance.services[service_name] = Service(service['care_unit'], service['duration'])
+        instance.services[sys.intern(service_name)] = Service(sys.intern(service['care_unit']), service['duration'])
     
     for care_unit_name, care_unit in obj['day'].items():
         for operator_name, operator in care_unit.items():
-            instance.day.add_operator(operator_name, Operator(
-                care_unit_name,
+            instance.day.add_operator(sys.intern(operator_name), Operator(
+                sys.intern(care_unit_name),
                 operator['start'],
                 operator['duration']))
     
     if isinstance(instance, FatSubproblemInstance):
         for patient_name, patient in obj['patients'].items():
+            patient_name = sys.intern(patient_name)
             instance.patients[patient_name] = FatSubproblemPatient(patient['priority'])
             for request in patient['requests']:
                 instance.patients[patient_name].requests.append(ServiceOperator(
-                    request['service'], request['operator']))
+                    sys.intern(request['service']), sys.intern(request['operator'])))
     else:
         for patient_name, patient in obj['patients'].items():
+            patient_name = sys.intern(patient_name)
             instance.patients[patient_name] = SlimSubproblemPatient(patient['priority'])
             for service_name in patient['requests']:
-                instance.patients[patient_name].requests.append(service_name)
+                instance.patients[patient_name].requests.append(sys.intern(service_name))
     
     return instance
 
@@ -242,22 +247,22 @@ def decode_subproblem_result(obj) -> FatSubproblemResult | SlimSubproblemResult:
 
     for request in obj['scheduled']:
         result.scheduled.append(PatientServiceOperatorTimeSlot(
-            request['patient'],
-            request['service'],
-            request['operator'],
+            sys.intern(request['patient']),
+            sys.intern(request['service']),
+            sys.intern(request['operator']),
             request['time']))
     
     if is_fat:
         for request in obj['rejected']:
             result.rejected.append(PatientServiceOperator(
-                request['patient'],
-                request['service'],
-                request['operator']))
+                sys.intern(request['patient']),
+                sys.intern(request['service']),
+                sys.intern(request['operator'])))
     else:
         for request in obj['rejected']:
             result.rejected.append(PatientService(
-                request['patient'],
-                request['service'])) # type: ignore
+                sys.intern(request['patient']),
+                sys.intern(request['service']))) # type: ignore
 
     return result
 
@@ -299,15 +304,15 @@ def decode_final_result(obj) -> FinalResult:
         result.scheduled[int(day_name)] = []
         for request in requests:
             result.scheduled[int(day_name)].append(PatientServiceOperatorTimeSlot(
-                request['patient'],
-                request['service'],
-                request['operator'],
+                sys.intern(request['patient']),
+                sys.intern(request['service']),
+                sys.intern(request['operator']),
                 request['time']))
     
     for request in obj['rejected']:
         result.rejected.append(PatientServiceWindow(
-            request['patient'],
-            request['service'],
+            sys.intern(request['patient']),
+            sys.intern(request['service']),
             Window(request['window'][0], request['window'][1])))
     
     return result
@@ -347,24 +352,24 @@ def decode_cores(obj) -> list[FatCore] | list[SlimCore]:
         for reason in core_obj['reason']:
             if is_fat:
                     core.reason.append(PatientServiceOperator(
-                        reason['patient'],
-                        reason['service'],
-                        reason['operator']))
+                        sys.intern(reason['patient']),
+                        sys.intern(reason['service']),
+                        sys.intern(reason['operator'])))
             else:
                     core.reason.append(PatientService(
-                        reason['patient'],
-                        reason['service'])) # type: ignore
+                        sys.intern(reason['patient']),
+                        sys.intern(reason['service']))) # type: ignore
         
         for component in core_obj['components']:
             if is_fat:
                     core.components.append(PatientServiceOperator(
-                        component['patient'],
-                        component['service'],
-                        component['operator']))
+                        sys.intern(component['patient']),
+                        sys.intern(component['service']),
+                        sys.intern(component['operator'])))
             else:
                     core.components.append(PatientService(
-                        component['patient'],
-                        component['service'])) # type: ignore
+                        sys.intern(component['patient']),
+                        sys.intern(component['service']))) # type: ignore
         
         cores.append(core) # type: ignore
 
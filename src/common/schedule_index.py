@@ -0,0 +1,63 @@
+from src.common.custom_types import PatientName, ServiceName, DayName, Window
+from src.common.custom_types import PatientService, PatientServiceOperator, PatientServiceWindow
+from src.common.custom_types import PatientServiceOperatorTimeSlot
+
+
+class ScheduleIndex:
+    '''Indice di un elenco di richieste programmate giorno per giorno: per ogni
+    coppia (p, s) memorizza i giorni in cui è programmata e le richieste
+    corrispondenti, e mantiene l'insieme delle richieste rifiutate. Permette di
+    controllare il soddisfacimento di una finestra senza scorrere le richieste
+    di ogni giorno.'''
+
+    def __init__(
+            self,
+            scheduled: dict[DayName, list[PatientService]] | dict[DayName, list[PatientServiceOperator]] | dict[DayName, list[PatientServiceOperatorTimeSlot]],
+            rejected: list[PatientServiceWindow] | None = None):
+
+        self.requests: dict[tuple[PatientName, ServiceName], dict[DayName, list]] = {}
+        for day_name, requests in scheduled.items():
+            for request in requests:
+                self.add(day_name, request)
+
+        self.rejected: set[PatientServiceWindow] = set(rejected) if rejected is not None else set()
+
+    def add(self, day_name: DayName, request: PatientService):
+
+        key = (request.patient_name, request.service_name)
+        if key not in self.requests:
+            self.requests[key] = {}
+        if day_name not in self.requests[key]:
+            self.requests[key][day_name] = []
+        self.requests[key][day_name].append(request)
+
+    def remove(self, day_name: DayName, request: PatientService):
+
+        day_requests = self.requests[(request.patient_name, request.service_name)]
+        day_requests[day_name].remove(request)
+        if len(day_requests[day_name]) == 0:
+            del day_requests[day_name]
+
+    def get_days(self, patient_name: PatientName, service_name: ServiceName) -> list[DayName]:
+        '''Giorni in ordine crescente in cui la coppia (p, s) è programmata.'''
+
+        return sorted(self.requests.get((patient_name, service_name), {}).keys())
+
+    def get_requests(self, patient_name: PatientName, service_name: ServiceName, day_name: DayName) -> list:
+
+        return self.requests.get((patient_name, service_name), {}).get(day_name, [])
+
+    def is_scheduled(self, patient_name: PatientName, service_name: ServiceName, day_name: DayName) -> bool:
+
+        return day_name in self.requests.get((patient_name, service_name), {})
+
+    def is_window_satisfied(self, patient_name: PatientName, service_name: ServiceName, window: Window) -> bool:
+        '''Controlla se la coppia (p, s) è programmata in almeno un giorno della
+        finestra.'''
+
+        day_names = self.requests.get((patient_name, service_name), {})
+
+        # Si scorre la più piccola fra la finestra e i giorni programmati
+        if len(day_names) < window.end - window.start + 1:
+            return any(window.contains(day_name) for day_name in day_names)
+        return any(day_name in day_names for day_name in range(window.start, window.end + 1))
@@ -3,7 +3,9 @@ from src.common.custom_types import DayName, FatSubproblemInstance, SlimSubprobl
 from src.common.custom_types import FatSubproblemPatient, ServiceOperator, SlimSubproblemPatient
 from src.common.custom_types import FatSubproblemResult, SlimSubproblemResult, FinalResult
 from src.common.custom_types import PatientServiceWindow, PatientService, PatientServiceOperator
-from src.common.custom_types import PatientServiceOperatorTimeSlot
+from src.common.custom_types import PatientServiceOperatorTimeSlot, PatientName, ServiceName, OperatorName
+from src.common.schedule_index import ScheduleIndex
+from src.common.columnar_instance import get_columnar_master_instance, get_day_candidate_windows
 
 
 def is_combination_to_do(
@@ -92,6 +94,9 @@ def compose_final_result(
         for result in subproblem_result.scheduled:
             final_result.scheduled[day_name].append(result)
     
+    # Indice delle richieste soddisfatte e rifiutate, costruito una sola volta
+    schedule_index = ScheduleIndex(final_result.scheduled, final_result.rejected)
+
     # Per ogni finestra richiesta dall'istanza master, se non è soddisfatta
     # viene aggiunta alle richieste rifiutate
     for patient_name, patient in master_instance.patients.items():
@@ -101,22 +106,14 @@ def compose_final_result(
                 request = PatientServiceWindow(patient_name, service_name, window)
                 
                 # Nessuna finestra doppia
-                if request in final_result.rejected:
+                if request in schedule_index.rejected:
                     continue
                 
                 # Se non esiste nessuna richiesta nei sottoproblemi relativi ai
                 # giorni della finestra, la richiesta non è soddisfatta
-                is_satisfied = False
-                for day_name in range(window.start, window.end + 1):
-                    for subproblem_request in all_subproblem_result[day_name].scheduled:
-                        if patient_name == subproblem_request.patient_name and service_name == subproblem_request.service_name:
-                            is_satisfied = True
-                            break
-                    if is_satisfied:
-                        break
-                
-                if not is_satisfied:
+                if not schedule_index.is_window_satisfied(patient_name, service_name, window):
                     final_result.rejected.append(request)
+                    schedule_index.rejected.add(request)
 
     return final_result
 
@@ -127,27 +124,26 @@ def get_all_possible_fat_master_requests(instance: MasterInstance) -> dict[DayNa
 
     all_possible_master_requests: dict[DayName, list[PatientServiceOperator]] = {}
 
-    # Scorri tutte le finestre
-    for patient_name, patient in instance.patients.items():
-        for service_name, windows in patient.requests.items():
+    # Le finestre che contengono ogni giorno sono ottenute dalla vista a
+    # colonne dell'istanza
+    columnar = get_columnar_master_instance(instance)
+    
+    for day_name, window_indexes in get_day_candidate_windows(columnar).items():
 
-            care_unit_name = instance.services[service_name].care_unit_name
+        # Ogni richiesta è aggiunta una sola volta, mantenendo l'ordine
+        requests: dict[PatientServiceOperator, None] = {}
+        
+        for window_index in window_indexes.tolist():
             
-            for window in windows:
+            patient_name = columnar.patient_names[columnar.window_patients[window_index]]
+            service_name = columnar.service_names[columnar.window_services[window_index]]
+            care_unit_name = instance.services[service_name].care_unit_name
 
-                # Scorri tutti i giorni della finestra corrente
-                for day_name in range(window.start, window.end + 1):
-                    
-                    # Scorri tutti gli operatori del giorno corrente
-                    for operator_name in instance.days[day_name].care_units[care_unit_name].keys():
-                        
-                        request = PatientServiceOperator(patient_name, service_name, operator_name)
-                        
-                        # Aggiungi la richiesta
-                        if day_name not in all_possible_master_requests:
-                            all_possible_master_requests[day_name] = []
-                        if request not in all_possible_master_requests[day_name]:
-                            all_possible_master_requests[day_name].append(request)
+            # Scorri tutti gli operatori del giorno corrente
+            for operator_name in instance.days[day_name].care_units[care_unit_name].keys():
+                requests[PatientServiceOperator(patient_name, service_name, operator_name)] = None
+        
+        all_possible_master_requests[day_name] = list(requests.keys())
 
     return all_possible_master_requests
 
@@ -158,21 +154,17 @@ def get_all_possible_slim_master_requests(instance: MasterInstance) -> dict[DayN
 
     all_possible_master_requests: dict[DayName, list[PatientService]] = {}
 
-    # Scorri tutte le finestre
-    for patient_name, patient in instance.patients.items():
-        for service_name, windows in patient.requests.items():
-            
-            request = PatientService(patient_name, service_name)
-            
-            # Scorri tutti i giorni della finestra corrente
-            for window in windows:
-                for day_name in range(window.start, window.end + 1):
-                    
-                    # Aggiungi la richiesta
-                    if day_name not in all_possible_master_requests:
-                        all_possible_master_requests[day_name] = []
-                    if request not in all_possible_master_requests[day_name]:
-                        all_possible_master_requests[day_name].append(request)
+    # Le finestre che contengono ogni giorno sono ottenute dalla vista a
+    # colonne dell'istanza
+    columnar = get_columnar_master_instance(instance)
+
+    for day_name, window_indexes in get_day_candidate_windows(columnar).items():
+
+        # Ogni richiesta è aggiunta una sola volta, mantenendo l'ordine
+        all_possible_master_requests[day_name] = list(dict.fromkeys(PatientService(
+            columnar.patient_names[columnar.window_patients[window_index]],
+            columnar.service_names[columnar.window_services[window_index]])
+            for window_index in window_indexes.tolist()))
 
     return all_possible_master_requests
 
@@ -213,6 +205,26 @@ def get_slim_subproblem_instance_from_fat(instance: FatSubproblemInstance) -> Sl
     return forgetful_subproblem_instance
 
 
+def align_subproblem_result_operators(
+        result: FatSubproblemResult | SlimSubproblemResult,
+        master_requests: list[PatientServiceOperator]):
+    '''Funzione che riassegna ad ogni richiesta programmata dal sottoproblema
+    l'operatore proposto dal master per la stessa coppia (p, s), in modo che i
+    core riguardino le richieste reali del master.'''
+
+    # Operatore della prima richiesta del master con ogni coppia (p, s)
+    master_operator_names: dict[tuple[PatientName, ServiceName], OperatorName] = {}
+    for master_request in master_requests:
+        master_operator_names.setdefault((master_request.patient_name, master_request.service_name), master_request.operator_name)
+
+    # Le richieste sono immutabili e vengono quindi ricreate
+    result.scheduled = [PatientServiceOperatorTimeSlot(
+        request.patient_name,
+        request.service_name,
+        master_operator_names.get((request.patient_name, request.service_name), request.operator_name),
+        request.time_slot) for request in result.scheduled]
+
+
 def remove_requests_not_present(
         result: FatSubproblemResult | SlimSubproblemResult,
         master_result: FatMasterResult | SlimMasterResult,
@@ -221,17 +233,12 @@ def remove_requests_not_present(
     allinearli con l'elenco di richieste fornito. Eventuali richieste non
     presenti nella lista verranno eliminate.'''
 
+    # Richieste del master nel giorno, indicizzate per coppia (p, s)
+    schedule_index = ScheduleIndex({day_name: master_result.scheduled[day_name]})
+
     new_requests: list[PatientServiceOperatorTimeSlot] = []
     for request in result.scheduled:
-        
-        request_found = False
-        for request_to_keep in master_result.scheduled[day_name]:
-            if (request_to_keep.patient_name == request.patient_name and
-                request_to_keep.service_name == request.service_name):
-                request_found = True
-                break
-        
-        if request_found:
+        if schedule_index.is_scheduled(request.patient_name, request.service_name, day_name):
             new_requests.append(request)
     
     result.scheduled = new_requests
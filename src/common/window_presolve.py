@@ -0,0 +1,34 @@
+from src.common.custom_types import PatientName, ServiceName, DayName
+
+# Finestra di una richiesta nella forma (p, s, start, end) degli indici del master
+type WindowKey = tuple[PatientName, ServiceName, DayName, DayName]
+
+
+def get_dominated_windows(window_keys) -> set[WindowKey]:
+    '''Funzione che ritorna le finestre strettamente contenute in un'altra
+    finestra della stessa coppia (p, s). Il vincolo della finestra più grande
+    impedisce già di programmare (p, s) più di una volta al suo interno, per
+    cui quella contenuta non richiede né variabile né vincolo: il suo valore è
+    la somma delle variabili 'do' dei suoi giorni.'''
+
+    windows_by_patient_service: dict[tuple[PatientName, ServiceName], list[tuple[DayName, DayName]]] = {}
+    for p, s, start, end in window_keys:
+        windows_by_patient_service.setdefault((p, s), []).append((start, end))
+
+    dominated_windows: set[WindowKey] = set()
+
+    for (p, s), windows in windows_by_patient_service.items():
+        if len(windows) < 2:
+            continue
+
+        # A parità di inizio le finestre più lunghe vengono prima, per cui ogni
+        # finestra è contenuta in una precedente se e solo se la massima fine
+        # vista finora non è inferiore alla sua
+        max_end = None
+        for start, end in sorted(windows, key=lambda w: (w[0], -w[1])):
+            if max_end is not None and max_end >= end:
+                dominated_windows.add((p, s, start, end))
+            else:
+                max_end = end
+
+    return dominated_windows
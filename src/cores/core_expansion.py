@@ -1,8 +1,10 @@
 import pyomo.environ as pyo
+import functools
 import time
 
 from src.common.custom_types import FatCore, SlimCore, DayName, MasterInstance, ServiceName, Service
 from src.common.custom_types import PatientService, PatientServiceOperator, SlimArc, FatArc, CareUnitName
+from src.common.custom_types import Operator, OperatorName, TimeSlot
 from src.milp_models.max_matching_model import get_max_matching_model, get_matching_from_max_matching_model, ban_matching_from_model
 from src.milp_models.subsumption_model import get_subsumption_model, subsumption_model_has_solution
 
@@ -61,6 +63,103 @@ def get_expansion_arcs(
     return arcs
 
 
+def get_expansion_matchings(
+        core: FatCore | SlimCore,
+        arcs: set[SlimArc] | set[FatArc],
+        max_matching_number: int) -> list[set[SlimArc]] | list[set[FatArc]]:
+    """Enumerazione combinatoria (backtracking) dei matching che assegnano ogni
+    componente del core ad una diversa richiesta del master, mantenendo la
+    consistenza dei nomi: componenti con lo stesso paziente (o operatore, per i
+    core 'fat') devono essere rinominate con lo stesso paziente (o operatore).
+    Sono gli stessi matching prodotti dal modello di massimo matching con i
+    tagli di esclusione, ma senza chiamate al solutore. La ricerca si ferma
+    dopo 'max_matching_number' matching."""
+
+    is_fat = isinstance(core, FatCore)
+
+    # Destinazioni possibili per ogni componente
+    destinations_by_source: dict = {}
+    for source, destination in arcs:
+        if source not in destinations_by_source:
+            destinations_by_source[source] = []
+        destinations_by_source[source].append(destination)
+
+    sources = list(dict.fromkeys(core.components))
+    if any(source not in destinations_by_source for source in sources):
+        return []
+
+    for source in sources:
+        destinations_by_source[source].sort()
+
+    # Le componenti con meno alternative sono assegnate per prime così da
+    # scoprire presto le inconsistenze
+    sources.sort(key=lambda s: (len(destinations_by_source[s]), s))
+
+    matchings: list = []
+
+    used_destinations: set = set()
+    chosen_arcs: list = []
+
+    # Rinomina corrente di pazienti ed operatori, con il numero di componenti
+    # che la utilizzano
+    patient_renaming: dict[str, tuple[str, int]] = {}
+    operator_renaming: dict[str, tuple[str, int]] = {}
+
+    def is_renaming_consistent(renaming: dict[str, tuple[str, int]], name: str, new_name: str) -> bool:
+        return name not in renaming or renaming[name][0] == new_name
+
+    def add_renaming(renaming: dict[str, tuple[str, int]], name: str, new_name: str):
+        count = renaming[name][1] if name in renaming else 0
+        renaming[name] = (new_name, count + 1)
+
+    def remove_renaming(renaming: dict[str, tuple[str, int]], name: str):
+        new_name, count = renaming[name]
+        if count == 1:
+            del renaming[name]
+        else:
+            renaming[name] = (new_name, count - 1)
+
+    def assign(source_index: int):
+
+        if len(matchings) >= max_matching_number:
+            return
+
+        if source_index == len(sources):
+            matchings.append(set(chosen_arcs))
+            return
+
+        source = sources[source_index]
+
+        for destination in destinations_by_source[source]:
+            if destination in used_destinations:
+                continue
+            if not is_renaming_consistent(patient_renaming, source.patient_name, destination.patient_name):
+                continue
+            if is_fat and not is_renaming_consistent(operator_renaming, source.operator_name, destination.operator_name):
+                continue
+
+            used_destinations.add(destination)
+            chosen_arcs.append((source, destination))
+            add_renaming(patient_renaming, source.patient_name, destination.patient_name)
+            if is_fat:
+                add_renaming(operator_renaming, source.operator_name, destination.operator_name)
+
+            assign(source_index + 1)
+
+            used_destinations.remove(destination)
+            chosen_arcs.pop()
+            remove_renaming(patient_renaming, source.patient_name)
+            if is_fat:
+                remove_renaming(operator_renaming, source.operator_name)
+
+            if len(matchings) >= max_matching_number:
+                return
+
+    assign(0)
+
+    return matchings
+
+
 def get_core_from_matching(
         core: FatCore | SlimCore,
         matching: set[SlimArc] | set[FatArc]) -> FatCore | SlimCore:
@@ -117,6 +216,11 @@ def expand_cores(
     opt.options['TimeLimit'] = config['core_expansion']['time_limit']
     opt.options['SoftMemLimit'] = config['core_expansion']['memory_limit']
 
+    # Giorni con le stesse richieste possibili producono gli stessi archi e
+    # quindi gli stessi matching: ogni core è espanso una sola volta per classe
+    request_classes: dict[DayName, frozenset] = {
+        day_name: frozenset(requests) for day_name, requests in all_possible_master_requests.items()}
+
     print(f'Expanding {len(cores)} cores')
     for core_index, core in enumerate(cores):
 
@@ -133,16 +237,45 @@ def expand_cores(
 
             # Elenco di giorni più piccoli o uguali al giorno corrente in
             # tutte le unità di cura toccate
-            smaller_days: set[DayName] = subsumptions[care_unit_affected.pop()][core.day]
+            smaller_days: set[DayName] = set(subsumptions[care_unit_affected.pop()][core.day])
             for care_unit_name in care_unit_affected:
                 smaller_days.intersection_update(subsumptions[care_unit_name][core.day])
             
             days_to_do.update(smaller_days)
 
-        for day_name in days_to_do:
+        # Raggruppamento dei giorni per classe di richieste possibili
+        day_groups: dict[frozenset, list[DayName]] = {}
+        for day_name in sorted(days_to_do):
+            if request_classes[day_name] not in day_groups:
+                day_groups[request_classes[day_name]] = []
+            day_groups[request_classes[day_name]].append(day_name)
+
+        for day_names in day_groups.values():
 
-            print(f'core {core_index + 1}, day {day_name}: ', end='')
-            arcs = get_expansion_arcs(core, all_possible_master_requests[day_name], services, config)
+            print(f'core {core_index + 1}, days {day_names}: ', end='')
+            arcs = get_expansion_arcs(core, all_possible_master_requests[day_names[0]], services, config)
+
+            # Enumerazione combinatoria dei matching senza solutore
+            if not config['core_expansion']['use_solver']:
+
+                matchings = get_expansion_matchings(core, arcs, config['max_single_core_expansion'])
+                if len(matchings) == 0:
+                    print('nosol')
+                    continue
+
+                for matching in matchings:
+                    print('.', end='')
+
+                    for day_name in day_names:
+                        expanded_core = get_core_from_matching(core, matching)
+                        expanded_core.day = day_name
+                        expanded_cores.append(expanded_core) # type: ignore
+
+                if len(matchings) >= config['max_single_core_expansion']:
+                    print('maxcut')
+                else:
+                    print('')
+                continue
             
             matching_model = get_max_matching_model(arcs)
             if matching_model is None:
@@ -169,9 +302,10 @@ def expand_cores(
 
                 print('.', end='')
 
-                expanded_core = get_core_from_matching(core, matching)
-                expanded_core.day = day_name
-                expanded_cores.append(expanded_core) # type: ignore
+                for day_name in day_names:
+                    expanded_core = get_core_from_matching(core, matching)
+                    expanded_core.day = day_name
+                    expanded_cores.append(expanded_core) # type: ignore
                 ban_matching_from_model(matching_model, matching)
 
                 core_expansion_number += 1
@@ -182,39 +316,125 @@ def expand_cores(
     return expanded_cores
 
 
+def get_operator_layout(operators: dict[OperatorName, Operator]) -> tuple[tuple[TimeSlot, TimeSlot], ...]:
+    """Disposizione canonica degli operatori di un'unità di cura: gli
+    intervalli di attività ordinati, indipendentemente dai nomi."""
+
+    return tuple(sorted((operator.start, operator.end) for operator in operators.values()))
+
+
+# Numero massimo di coppie di disposizioni di cui viene ricordata la sussunzione.
+# I risultati sono riutilizzati da tutte le istanze risolte nello stesso
+# processo, ad esempio in una serie di configurazioni
+SUBSUMPTION_CACHE_SIZE = 65536
+
+
+@functools.lru_cache(maxsize=SUBSUMPTION_CACHE_SIZE)
+def is_layout_subsumed(
+        big_layout: tuple[tuple[TimeSlot, TimeSlot], ...],
+        small_layout: tuple[tuple[TimeSlot, TimeSlot], ...]) -> bool:
+    """Funzione che stabilisce se ogni operatore piccolo può essere assegnato
+    ad un operatore grande che ne contiene l'intervallo di attività, senza che
+    due operatori piccoli sovrapposti (anche solo agli estremi) siano assegnati
+    allo stesso operatore grande. Equivale all'esistenza di una soluzione
+    completa del modello di sussunzione."""
+
+    # Gli operatori piccoli sono assegnati in ordine di inizio: in questo modo
+    # basta confrontare ognuno con la fine massima già assegnata ad ogni
+    # operatore grande
+    candidates: list[list[int]] = []
+    for small_start, small_end in small_layout:
+        candidates.append([
+            i for i, (big_start, big_end) in enumerate(big_layout)
+            if small_start >= big_start and small_end <= big_end])
+        if len(candidates[-1]) == 0:
+            return False
+
+    assigned_ends: list[TimeSlot | None] = [None for _ in big_layout]
+
+    def assign(small_index: int) -> bool:
+
+        if small_index == len(small_layout):
+            return True
+
+        small_start, small_end = small_layout[small_index]
+
+        # Operatori grandi con lo stesso intervallo e la stessa fine assegnata
+        # sono intercambiabili e vengono provati una sola volta
+        tried_states: set = set()
+
+        for i in candidates[small_index]:
+
+            assigned_end = assigned_ends[i]
+            if assigned_end is not None and assigned_end >= small_start:
+                continue
+
+            state = (big_layout[i], assigned_end)
+            if state in tried_states:
+                continue
+            tried_states.add(state)
+
+            assigned_ends[i] = small_end if assigned_end is None else max(assigned_end, small_end)
+            if assign(small_index + 1):
+                assigned_ends[i] = assigned_end
+                return True
+            assigned_ends[i] = assigned_end
+
+        return False
+
+    return assign(0)
+
+
 def get_subsumptions(instance: MasterInstance, config) -> dict[CareUnitName, dict[DayName, set[DayName]]]:
+    """Funzione che calcola, per ogni unità di cura, l'insieme dei giorni
+    minori o uguali di ogni giorno. I giorni con la stessa disposizione di
+    operatori nell'unità di cura formano una classe: la relazione è calcolata
+    una sola volta per ogni coppia di classi e poi estesa ai loro giorni."""
 
     subsumptions: dict[CareUnitName, dict[DayName, set[DayName]]] = {}
 
-    # Nomi delle unità di cura toccate
-    care_unit_names: set[CareUnitName] = set()
-    for day in instance.days.values():
-        care_unit_names.update(day.care_units.keys())
+    # Classi di giorni con la stessa disposizione di operatori, per ogni unità
+    # di cura toccata
+    day_classes: dict[CareUnitName, dict[tuple[tuple[TimeSlot, TimeSlot], ...], list[DayName]]] = {}
+    for day_name, day in instance.days.items():
+        for care_unit_name, care_unit in day.care_units.items():
+            if care_unit_name not in day_classes:
+                day_classes[care_unit_name] = {}
+            layout = get_operator_layout(care_unit)
+            if layout not in day_classes[care_unit_name]:
+                day_classes[care_unit_name][layout] = []
+            day_classes[care_unit_name][layout].append(day_name)
     
     opt = pyo.SolverFactory('gurobi')
     opt.options['TimeLimit'] = config['subsumption']['time_limit']
     opt.options['SoftMemLimit'] = config['subsumption']['memory_limit']
 
     # Generazione della relazione di minore o uguale per ogni unità di cura
-    for care_unit_name in care_unit_names:
+    for care_unit_name, care_unit_classes in day_classes.items():
         subsumptions[care_unit_name] = {}
 
-        # Ogni giorno ricerca i suoi minori o uguali
-        for big_day_name, big_day in instance.days.items():
-            if care_unit_name not in big_day.care_units:
-                continue
+        # Ogni classe ricerca le classi minori o uguali
+        for big_layout, big_day_names in care_unit_classes.items():
 
-            subsumptions[care_unit_name][big_day_name] = set()
+            smaller_day_names: set[DayName] = set()
 
-            for small_day_name, small_day in instance.days.items():
-                if big_day_name == small_day_name:
-                    continue
-                if care_unit_name not in small_day.care_units:
+            for small_layout, small_day_names in care_unit_classes.items():
+
+                # Una classe è sempre minore o uguale a se stessa
+                if big_layout == small_layout:
+                    smaller_day_names.update(small_day_names)
                     continue
-                if small_day_name in subsumptions[care_unit_name][big_day_name]:
+
+                # Calcolo diretto, riutilizzando le disposizioni già incontrate
+                if not config['subsumption']['use_solver']:
+                    if is_layout_subsumed(big_layout, small_layout):
+                        smaller_day_names.update(small_day_names)
                     continue
 
-                subsumption_model = get_subsumption_model(big_day.care_units[care_unit_name], small_day.care_units[care_unit_name])
+                # Il modello è risolto sui primi giorni delle due classi
+                subsumption_model = get_subsumption_model(
+                    instance.days[big_day_names[0]].care_units[care_unit_name],
+                    instance.days[small_day_names[0]].care_units[care_unit_name])
 
                 start = time.perf_counter()
                 result = opt.solve(subsumption_model, logfile=None)
@@ -224,8 +444,10 @@ def get_subsumptions(instance: MasterInstance, config) -> dict[CareUnitName, dic
                     continue
 
                 if subsumption_model_has_solution(subsumption_model, result):
-                    subsumptions[care_unit_name][big_day_name].add(small_day_name)
-                    if small_day_name in subsumptions[care_unit_name]:
-                        subsumptions[care_unit_name][big_day_name].update(subsumptions[care_unit_name][small_day_name])
+                    smaller_day_names.update(small_day_names)
+
+            # Un giorno non è mai incluso fra i suoi minori
+            for big_day_name in big_day_names:
+                subsumptions[care_unit_name][big_day_name] = smaller_day_names - {big_day_name}
 
-    return subsumptions
\ No newline at end of file
+    return subsumptions
@@ -0,0 +1,121 @@
+import time
+
+from src.common.custom_types import MasterInstance, DayName, FatCore, SlimCore
+from src.common.custom_types import FatSubproblemInstance, SlimSubproblemInstance
+from src.common.custom_types import FatSubproblemResult, SlimSubproblemResult
+from src.common.custom_types import PatientServiceOperator, PatientService, CareUnitName
+from src.cores.generalist_cores import get_generalist_cores
+from src.cores.basic_cores import get_basic_fat_cores, get_basic_slim_cores
+from src.cores.reduced_cores import get_reduced_fat_cores, get_reduced_slim_cores
+from src.cores.pruned_cores import get_pruned_fat_cores, get_pruned_slim_cores
+from src.cores.minimal_cores import get_minimal_fat_cores, get_minimal_slim_cores
+from src.cores.satisfiability_oracle import SatisfiabilityOracle
+from src.cores.core_expansion import expand_cores
+from src.cores.tools import aggregate_core_lists, remove_dominated_cores
+
+
+def get_cores(
+        master_instance: MasterInstance,
+        all_subproblem_instances: dict[DayName, FatSubproblemInstance] | dict[DayName, SlimSubproblemInstance],
+        all_subproblem_result: dict[DayName, FatSubproblemResult] | dict[DayName, SlimSubproblemResult],
+        all_possible_master_requests: dict[DayName, list[PatientServiceOperator]] | dict[DayName, list[PatientService]],
+        subsumptions: dict[CareUnitName, dict[DayName, set[DayName]]] | None,
+        config,
+        oracles: dict[DayName, SatisfiabilityOracle] | None = None,
+        stage_hook=None) -> tuple[list[FatCore] | list[SlimCore], int]:
+    '''Funzione che calcola i core del tipo configurato a partire dai risultati
+    dei sottoproblemi ed eventualmente li espande. Se fornita, 'stage_hook'
+    viene chiamata dopo ogni passo con il nome del passo, i core ottenuti ed il
+    tempo impiegato: un valore di ritorno diverso da 0 interrompe il calcolo.
+    Ritorna i core ed il codice d'errore dell'eventuale interruzione.'''
+
+    def end_stage(stage_name: str, stage_cores: list, start: float) -> int:
+        if stage_hook is None:
+            return 0
+        return stage_hook(stage_name, stage_cores, time.perf_counter() - start)
+
+    if config['core_type'] == 'generalist':
+        start = time.perf_counter()
+        cores = get_generalist_cores(all_subproblem_result)
+        error_code = end_stage('generalist', cores, start)
+        if error_code != 0:
+            return cores, error_code
+
+    # Master fat
+    elif config['structure_type'] in ['fat-slim', 'fat-fat']:
+
+        start = time.perf_counter()
+        cores = get_basic_fat_cores(all_subproblem_result)
+        error_code = end_stage('basic', cores, start)
+        if error_code != 0:
+            return cores, error_code
+
+        if config['core_type'] in ['reduced', 'pruned', 'minimal']:
+            start = time.perf_counter()
+            cores = get_reduced_fat_cores(cores) # type: ignore
+            error_code = end_stage('reduced', cores, start)
+            if error_code != 0:
+                return cores, error_code
+
+        if config['core_type'] in ['pruned']:
+            start = time.perf_counter()
+            cores = get_pruned_fat_cores(all_subproblem_instances, cores, config, oracles) # type: ignore
+            error_code = end_stage('pruned', cores, start)
+            if error_code != 0:
+                return cores, error_code
+
+        if config['core_type'] in ['minimal']:
+            start = time.perf_counter()
+            cores = get_minimal_fat_cores(all_subproblem_instances, cores, config, oracles) # type: ignore
+            error_code = end_stage('minimal', cores, start)
+            if error_code != 0:
+                return cores, error_code
+
+    # Master slim
+    else:
+
+        start = time.perf_counter()
+        cores = get_basic_slim_cores(all_subproblem_result) # type: ignore
+        error_code = end_stage('basic', cores, start)
+        if error_code != 0:
+            return cores, error_code
+
+        if config['core_type'] in ['reduced', 'pruned', 'minimal']:
+            start = time.perf_counter()
+            cores = get_reduced_slim_cores(master_instance.services, cores) # type: ignore
+            error_code = end_stage('reduced', cores, start)
+            if error_code != 0:
+                return cores, error_code
+
+        if config['core_type'] in ['pruned']:
+            start = time.perf_counter()
+            cores = get_pruned_slim_cores(all_subproblem_result, all_subproblem_instances, cores, config, oracles) # type: ignore
+            error_code = end_stage('pruned', cores, start)
+            if error_code != 0:
+                return cores, error_code
+
+        if config['core_type'] in ['minimal']:
+            start = time.perf_counter()
+            cores = get_minimal_slim_cores(all_subproblem_result, all_subproblem_instances, cores, config, oracles) # type: ignore
+            error_code = end_stage('minimal', cores, start)
+            if error_code != 0:
+                return cores, error_code
+
+    # Espansione dei core
+    if config['core_patient_expansion'] or config['core_service_expansion'] or config['core_operator_expansion'] or config['core_day_expansion']:
+        start = time.perf_counter()
+        expanded_cores = expand_cores(cores, all_possible_master_requests, master_instance.services, config, subsumptions)
+
+        # Se per qualche motivo l'espansione non ha prodotto il caso
+        # denegenere a->a, aggiungilo e rimuovi eventuali duplicati
+        cores = aggregate_core_lists(cores, expanded_cores)
+
+        # I core che contengono un altro core dello stesso giorno sono
+        # implicati da quest'ultimo
+        cores = remove_dominated_cores(cores)
+
+        error_code = end_stage('expanded', cores, start)
+        if error_code != 0:
+            return cores, error_code
+
+    return cores, 0
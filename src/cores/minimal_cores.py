@@ -0,0 +1,147 @@
+from src.common.custom_types import FatCore, SlimCore, PatientServiceOperator, PatientService, ServiceOperator
+from src.common.custom_types import FatSubproblemInstance, SlimSubproblemInstance, SlimSubproblemResult
+from src.common.custom_types import DayName, FatSubproblemPatient, SlimSubproblemPatient
+from src.checkers.check_subproblem_instance import check_fat_subproblem_instance, check_slim_subproblem_instance
+from src.cores.satisfiability_oracle import SatisfiabilityOracle
+from src.cores.pruned_cores import get_fat_core_components_metric, get_slim_core_components_metric
+from src.cores.pruned_cores import is_request_set_satisfiable, get_pruned_cores
+
+
+def get_instance_from_requests(
+        instance: FatSubproblemInstance | SlimSubproblemInstance,
+        requests: list[PatientServiceOperator] | list[PatientService]) -> FatSubproblemInstance | SlimSubproblemInstance:
+    """Costruisce una copia dell'istanza del giorno contenente solo le
+    richieste fornite."""
+
+    if isinstance(instance, FatSubproblemInstance):
+        cloned_instance = FatSubproblemInstance(services=instance.services, day=instance.day)
+    else:
+        cloned_instance = SlimSubproblemInstance(services=instance.services, day=instance.day)
+
+    for request in requests:
+
+        patient_name = request.patient_name
+        service_name = request.service_name
+
+        if isinstance(cloned_instance, FatSubproblemInstance):
+            if patient_name not in cloned_instance.patients:
+                cloned_instance.patients[patient_name] = FatSubproblemPatient(instance.patients[patient_name].priority)
+            cloned_instance.patients[patient_name].requests.append(ServiceOperator(service_name, request.operator_name)) # type: ignore
+        else:
+            if patient_name not in cloned_instance.patients:
+                cloned_instance.patients[patient_name] = SlimSubproblemPatient(instance.patients[patient_name].priority)
+            cloned_instance.patients[patient_name].requests.append(service_name)
+
+    return cloned_instance
+
+def minimize_core(
+        core: FatCore | SlimCore,
+        core_index: int,
+        core_number: int,
+        instance: FatSubproblemInstance | SlimSubproblemInstance,
+        subproblem_result: SlimSubproblemResult | None,
+        oracle: SatisfiabilityOracle,
+        config) -> bool:
+    """Riduzione di un core ad un sottoinsieme irriducibile delle sue
+    componenti con l'algoritmo QuickXplain: le componenti sono divise a metà e
+    ricorsivamente si cerca il conflitto minimo, preferendo le richieste più
+    vicine alla ragione del core secondo la metrica euristica. Il numero di
+    controlli di soddisfacibilità è O(k log n), con k la dimensione del core
+    finale. Ritorna False se l'istanza del core non è valida."""
+
+    # Ordine euristico con cui le richieste vengono preferite
+    if isinstance(core, FatCore):
+        components_metric = get_fat_core_components_metric(core)
+    else:
+        components_metric = get_slim_core_components_metric(instance.services, subproblem_result, core) # type: ignore
+
+    sorted_requests = sorted(
+        components_metric.keys(),
+        key=lambda c: components_metric[c])
+
+    print(f'Minimizing core ({core_index + 1}/{core_number}) with {len(core.components)}:', end='')
+
+    # Ogni sottoinsieme di un'istanza valida è valido, per cui basta controllare
+    # l'istanza con tutte le componenti
+    if isinstance(instance, FatSubproblemInstance):
+        errors = check_fat_subproblem_instance(get_instance_from_requests(instance, sorted_requests)) # type: ignore
+    else:
+        errors = check_slim_subproblem_instance(get_instance_from_requests(instance, sorted_requests)) # type: ignore
+    if len(errors) > 0:
+        for error in errors:
+            print(f'ERROR: {error}')
+        return False
+
+    def is_satisfiable(requests) -> bool:
+        is_requests_satisfiable = is_request_set_satisfiable(oracle, requests, get_instance_from_requests(instance, requests), config)
+        print(' y' if is_requests_satisfiable else ' x', end='')
+        return is_requests_satisfiable
+
+    def quick_explain(background: list, has_delta: bool, candidates: list) -> list:
+
+        # Le ultime richieste aggiunte bastano a rendere insoddisfacibile lo
+        # sfondo: nessun candidato è necessario
+        if has_delta and not is_satisfiable(background):
+            return []
+
+        if len(candidates) == 1:
+            return candidates
+
+        half = len(candidates) // 2
+        first_candidates = candidates[:half]
+        second_candidates = candidates[half:]
+
+        second_conflict = quick_explain(background + first_candidates, len(first_candidates) > 0, second_candidates)
+        first_conflict = quick_explain(background + second_conflict, len(second_conflict) > 0, first_candidates)
+
+        return first_conflict + second_conflict
+
+    reason = [request for request in sorted_requests if request in core.reason]
+    candidates = [request for request in sorted_requests if request not in core.reason]
+
+    # Se il core non è insoddisfacibile (ad esempio per il limite di tempo del
+    # solutore) viene lasciato invariato
+    if len(candidates) == 0 or is_satisfiable(reason + candidates):
+        print(f' done with {len(core.components)} components')
+        return True
+
+    if not is_satisfiable(reason):
+        conflict = []
+    else:
+        conflict = quick_explain(reason, False, candidates)
+
+    # Le componenti mantengono l'ordine euristico
+    core.components = [request for request in sorted_requests if request in reason or request in conflict]
+
+    print(f' done with {len(core.components)} components')
+
+    return True
+
+def get_minimal_fat_cores(
+        instances: dict[DayName, FatSubproblemInstance],
+        reduced_cores: list[FatCore],
+        config,
+        oracles: dict[DayName, SatisfiabilityOracle] | None=None) -> list[FatCore]:
+    """Computazione dei core ridotti ed irriducibili con QuickXplain. Le
+    risposte di soddisfacibilità sono memorizzate negli oracoli dei giorni,
+    condivisi con la potatura."""
+
+    if oracles is None:
+        oracles = {}
+
+    return get_pruned_cores(instances, None, reduced_cores, config, oracles, minimize_core) # type: ignore
+
+def get_minimal_slim_cores(
+        all_subproblem_results: dict[DayName, SlimSubproblemResult],
+        instances: dict[DayName, SlimSubproblemInstance],
+        reduced_cores: list[SlimCore],
+        config,
+        oracles: dict[DayName, SatisfiabilityOracle] | None=None) -> list[SlimCore]:
+    """Computazione dei core ridotti ed irriducibili con QuickXplain. Le
+    risposte di soddisfacibilità sono memorizzate negli oracoli dei giorni,
+    condivisi con la potatura."""
+
+    if oracles is None:
+        oracles = {}
+
+    return get_pruned_cores(instances, all_subproblem_results, reduced_cores, config, oracles, minimize_core) # type: ignore
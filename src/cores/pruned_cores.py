@@ -1,4 +1,8 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout, nullcontext
+import multiprocessing
 import time
+import io
 import pyomo.environ as pyo
 
 from src.common.custom_types import FatCore, PatientServiceOperator, Service, SlimSubproblemResult
@@ -8,6 +12,8 @@ from src.common.custom_types import DayName, FatSubproblemPatient, SlimSubproble
 from src.checkers.check_subproblem_instance import check_fat_subproblem_instance, check_slim_subproblem_instance
 from src.milp_models.subproblem_model import get_fat_subproblem_model, get_slim_subproblem_model
 from src.milp_models.subproblem_model import get_result_from_fat_subproblem_model, get_result_from_slim_subproblem_model
+from src.heuristics.screening import get_screened_satisfiability
+from src.cores.satisfiability_oracle import SatisfiabilityOracle
 
 
 def get_fat_core_components_metric(core: FatCore) -> dict[PatientServiceOperator, int]:
@@ -121,6 +127,12 @@ def is_instance_fully_satisfiable(
     """Risolve un'istanza del sottoproblema e ritorna True se ogni richiesta è
     stata soddisfatta."""
 
+    # Verifiche rapide che possono evitare la risoluzione del modello
+    if config['core_pruning']['screening']:
+        screened_satisfiability = get_screened_satisfiability(instance)
+        if screened_satisfiability is not None:
+            return screened_satisfiability
+
     if isinstance(instance, FatSubproblemInstance):
         model = get_slim_subproblem_model(instance)
     else:
@@ -129,6 +141,8 @@ def is_instance_fully_satisfiable(
     opt = pyo.SolverFactory('gurobi')
     opt.options['TimeLimit'] = config['core_pruning']['time_limit']
     opt.options['SoftMemLimit'] = config['core_pruning']['memory_limit']
+    if config['thread_budget'] > 0:
+        opt.options['Threads'] = max(1, config['thread_budget'] // config['core_pruning']['parallel_workers'])
 
     start = time.perf_counter()
     opt.solve(model, logfile=None)
@@ -143,55 +157,122 @@ def is_instance_fully_satisfiable(
 
     return len(result.rejected) == 0
 
-def get_pruned_fat_cores(
-        instances: dict[DayName, FatSubproblemInstance],
-        reduced_cores: list[FatCore],
-        config) -> list[FatCore]:
-    """Computazione dei core ridotti, a cui si tenta progressivamente di
-    togliere le richieste più lontane secondo una metrica euristica. Appena il
-    core diventa pienamente soddisfacibile si torna indietro di un passaggio."""
-    
-    cores = reduced_cores
+def is_request_set_satisfiable(
+        oracle: SatisfiabilityOracle,
+        requests: list[PatientServiceOperator] | list[PatientService],
+        instance: FatSubproblemInstance | SlimSubproblemInstance,
+        config) -> bool:
+    """Ritorna la piena soddisfacibilità dell'istanza formata dalle richieste
+    fornite, risolvendola solo se la risposta non è deducibile da quelle già
+    memorizzate nell'oracolo del giorno."""
+
+    is_satisfiable = oracle.lookup(requests)
+    if is_satisfiable is not None:
+        return is_satisfiable
+
+    is_satisfiable = is_instance_fully_satisfiable(instance, config)
+    oracle.record(requests, is_satisfiable)
+
+    return is_satisfiable
+
+def prune_fat_core(
+        core: FatCore,
+        core_index: int,
+        core_number: int,
+        instance: FatSubproblemInstance,
+        oracle: SatisfiabilityOracle,
+        config) -> bool:
+    """Potatura di un singolo core sull'istanza del suo giorno. Le componenti
+    del core vengono sostituite con quelle potate. Ritorna False se una delle
+    istanze costruite non è valida."""
+
+    # Ottenimento della metrica euristica con cui selezionare le richieste
+    components_metric = get_fat_core_components_metric(core)
+
+    # Ordine euristico con cui le richieste verranno progressivamente
+    # eliminate dall'istanza
+    sorted_requests = sorted(
+        components_metric.keys(),
+        key=lambda c: components_metric[c])
+
+    # Il calcolo verrà eseguito su una copia dell'istanza del giorno del
+    # core
+    cloned_instance = FatSubproblemInstance(
+        services=instance.services,
+        day=instance.day)
+
+    start = 0
+    end = len(sorted_requests) - 1
+    cursor = (end - start) // 2 + start
+
+    print(f'Pruning core ({core_index + 1}/{core_number}) with {len(core.components)}:', end='')
+
+    # Continua a togliere richieste finchè l'istanza non è risolta
+    # pienamente
+    while end > start + 1:
+
+        print(f' -> {cursor}', end='')
+
+        # Elimina i pazienti dall'istanza copiata
+        cloned_instance.patients = {}
+
+        # Aggiungi le richieste fino a 'cursor'
+        for request in sorted_requests[:cursor + 1]:
+
+            patient_name = request.patient_name
+            service_name = request.service_name
+            operator_name = request.operator_name
+
+            if patient_name not in cloned_instance.patients:
+                cloned_instance.patients[patient_name] = FatSubproblemPatient(instance.patients[patient_name].priority)
+            cloned_instance.patients[patient_name].requests.append(ServiceOperator(service_name, operator_name))
+
+        errors = check_fat_subproblem_instance(cloned_instance)
+        if len(errors) > 0:
+            for error in errors:
+                print(f'ERROR: {error}')
+            return False
+
+        # Ricerca dicotomica
+        if is_request_set_satisfiable(oracle, sorted_requests[:cursor + 1], cloned_instance, config):
+            start = cursor
+        else:
+            end = cursor
+            print('x', end='')
 
-    # Ogni core tenta la potatura
-    for core_index, core in enumerate(cores):
-        if len(core.components) <= 1:
-            continue
-
-        # Ottenimento della metrica euristica con cui selezionare le richieste
-        components_metric = get_fat_core_components_metric(core)
-
-        # Ordine euristico con cui le richieste verranno progressivamente
-        # eliminate dall'istanza
-        sorted_requests = sorted(
-            components_metric.keys(),
-            key=lambda c: components_metric[c])
-        
-        # Il calcolo verrà eseguito su una copia dell'istanza del giorno del
-        # core
-        instance = instances[core.day]
-        cloned_instance = FatSubproblemInstance(
-            services=instance.services,
-            day=instance.day)
-        
-        start = 0
-        end = len(sorted_requests) - 1
         cursor = (end - start) // 2 + start
 
-        print(f'Pruning core ({core_index + 1}/{len(cores)}) with {len(core.components)}:', end='')
+    # Le nuove componenti sono quelle rimaste, più l'ultima appena tolta che
+    # ha garantito la piena soddisfacibilità
+    if end >= len(core.reason):
+        core.components = sorted_requests[:end + 1]
+    else:
+        print(f'ERROR: core size is less than its reason')
+
+    print(f' done with {len(core.components)} components')
 
-        # Continua a togliere richieste finchè l'istanza non è risolta
-        # pienamente
-        while end > start + 1:
+    # Ogni componente del core viene testata per raggiungere
+    # l'irriducibilità
+    if config['post_pruning_irreducibility']:
+
+        print(f'Checking irreducibility ({len(core.components)} components):', end='')
+
+        # Crea una copia delle componenti del core
+        irreducible_components: list[PatientServiceOperator] = core.components.copy()
+
+        # Tenta di eliminare ogni componente (a parte la prima e l'ultima)
+        # cercando di mantenere la non soddisfacibilità
+        for component_index, component in enumerate(core.components[1:-1]):
+
+            # Rimuovi la componente corrente
+            irreducible_components.remove(component)
 
-            print(f' -> {cursor}', end='')
-            
             # Elimina i pazienti dall'istanza copiata
             cloned_instance.patients = {}
-            
-            # Aggiungi le richieste fino a 'cursor'
-            for request in sorted_requests[:cursor + 1]:
-                
+
+            # Aggiungi le richieste senza quella corrente
+            for request in irreducible_components:
+
                 patient_name = request.patient_name
                 service_name = request.service_name
                 operator_name = request.operator_name
@@ -204,128 +285,121 @@ def get_pruned_fat_cores(
             if len(errors) > 0:
                 for error in errors:
                     print(f'ERROR: {error}')
-                return []
+                return False
 
-            # Ricerca dicotomica
-            if is_instance_fully_satisfiable(cloned_instance, config):
-                start = cursor
+            print(f' {component_index + 2}')
+            if is_request_set_satisfiable(oracle, irreducible_components, cloned_instance, config):
+                irreducible_components.append(component)
+                print('y', end='')
             else:
-                end = cursor
                 print('x', end='')
-            
-            cursor = (end - start) // 2 + start
 
-        # Le nuove componenti sono quelle rimaste, più l'ultima appena tolta che
-        # ha garantito la piena soddisfacibilità
-        if end >= len(core.reason):
-            core.components = sorted_requests[:end + 1]
-        else:
-            print(f'ERROR: core size is less than its reason')
+        print('')
 
-        print(f' done with {len(core.components)} components')
+        core.components = irreducible_components
 
-        # Ogni componente del core viene testata per raggiungere
-        # l'irriducibilità
-        if config['post_pruning_irreducibility']:
+    return True
 
-            print(f'Checking irreducibility ({len(core.components)} components):', end='')
+def prune_slim_core(
+        core: SlimCore,
+        core_index: int,
+        core_number: int,
+        instance: SlimSubproblemInstance,
+        subproblem_result: SlimSubproblemResult,
+        oracle: SatisfiabilityOracle,
+        config) -> bool:
+    """Potatura di un singolo core sull'istanza del suo giorno. Le componenti
+    del core vengono sostituite con quelle potate. Ritorna False se una delle
+    istanze costruite non è valida."""
 
-            # Crea una copia delle componenti del core
-            irreducible_components: list[PatientServiceOperator] = core.components.copy()
+    # Ottenimento della metrica euristica con cui selezionare le richieste
+    # (fat anche se i core sono slim per avere più granellazione)
+    components_metric = get_slim_core_components_metric(instance.services, subproblem_result, core)
 
-            # Tenta di eliminare ogni componente (a parte la prima e l'ultima)
-            # cercando di mantenere la non soddisfacibilità
-            for component_index, component in enumerate(core.components[1:-1]):
+    # Ordine euristico con cui le richieste verranno progressivamente
+    # eliminate dall'istanza
+    sorted_requests = sorted(
+        components_metric.keys(),
+        key=lambda c: components_metric[c])
 
-                # Rimuovi la componente corrente
-                irreducible_components.remove(component)
+    # Il calcolo verrà eseguito su una copia dell'istanza del giorno del
+    # core
+    cloned_instance = SlimSubproblemInstance(
+        services=instance.services,
+        day=instance.day)
 
-                # Elimina i pazienti dall'istanza copiata
-                cloned_instance.patients = {}
-                
-                # Aggiungi le richieste senza quella corrente
-                for request in irreducible_components:
-                    
-                    patient_name = request.patient_name
-                    service_name = request.service_name
-                    operator_name = request.operator_name
-
-                    if patient_name not in cloned_instance.patients:
-                        cloned_instance.patients[patient_name] = FatSubproblemPatient(instance.patients[patient_name].priority)
-                    cloned_instance.patients[patient_name].requests.append(ServiceOperator(service_name, operator_name))
-
-                errors = check_fat_subproblem_instance(cloned_instance)
-                if len(errors) > 0:
-                    for error in errors:
-                        print(f'ERROR: {error}')
-                    return []
-
-                print(f' {component_index + 2}')
-                if is_instance_fully_satisfiable(cloned_instance, config):
-                    irreducible_components.append(component)
-                    print('y', end='')
-                else:
-                    print('x', end='')
-            
-            print('')
-            
-            core.components = irreducible_components
-    
-    return cores
+    start = 0
+    end = len(sorted_requests) - 1
+    cursor = (end - start) // 2 + start
 
-def get_pruned_slim_cores(
-        all_subproblem_results: dict[DayName, SlimSubproblemResult],
-        instances: dict[DayName, SlimSubproblemInstance],
-        reduced_cores: list[SlimCore],
-        config) -> list[SlimCore]:
-    """Computazione dei core ridotti, a cui si tenta progressivamente di
-    togliere le richieste più lontane secondo una metrica euristica. Appena il
-    core diventa pienamente soddisfacibile si torna indietro di un passaggio."""
-    
-    cores = reduced_cores
+    print(f'Pruning core ({core_index + 1}/{core_number}) with {len(core.components)}:', end='')
+
+    # Continua a togliere richieste finchè l'istanza non è risolta
+    # pienamente
+    while end > start + 1:
+
+        print(f' -> {cursor}', end='')
+
+        # Elimina i pazienti dall'istanza copiata
+        cloned_instance.patients = {}
+
+        # Aggiungi le richieste fino a 'cursor'
+        for request in sorted_requests[:cursor + 1]:
+
+            patient_name = request.patient_name
+            service_name = request.service_name
+
+            if patient_name not in cloned_instance.patients:
+                cloned_instance.patients[patient_name] = SlimSubproblemPatient(instance.patients[patient_name].priority)
+            cloned_instance.patients[patient_name].requests.append(service_name)
+
+        errors = check_slim_subproblem_instance(cloned_instance)
+        if len(errors) > 0:
+            for error in errors:
+                print(f'ERROR: {error}')
+            return False
+
+        # Ricerca dicotomica
+        if is_request_set_satisfiable(oracle, sorted_requests[:cursor + 1], cloned_instance, config):
+            start = cursor
+        else:
+            end = cursor
+            print('x', end='')
 
-    # Ogni core tenta la potatura
-    for core_index, core in enumerate(cores):
-        if len(core.components) <= 1:
-            continue
-
-        day_name = core.day
-
-        # Ottenimento della metrica euristica con cui selezionare le richieste
-        # (fat anche se i core sono slim per avere più granellazione)
-        components_metric = get_slim_core_components_metric(instances[day_name].services, all_subproblem_results[day_name], core)
-
-        # Ordine euristico con cui le richieste verranno progressivamente
-        # eliminate dall'istanza
-        sorted_requests = sorted(
-            components_metric.keys(),
-            key=lambda c: components_metric[c])
-
-        # Il calcolo verrà eseguito su una copia dell'istanza del giorno del
-        # core
-        instance = instances[core.day]
-        cloned_instance = SlimSubproblemInstance(
-            services=instance.services,
-            day=instance.day)
-        
-        start = 0
-        end = len(sorted_requests) - 1
         cursor = (end - start) // 2 + start
 
-        print(f'Pruning core ({core_index + 1}/{len(cores)}) with {len(core.components)}:', end='')
 
-        # Continua a togliere richieste finchè l'istanza non è risolta
-        # pienamente
-        while end > start + 1:
+    # Le nuove componenti sono quelle rimaste, più l'ultima appena tolta che
+    # ha garantito la piena soddisfacibilità
+    if end >= len(core.reason):
+        core.components = sorted_requests[:end + 1]
+    else:
+        print(f'ERROR: core size is less than its reason')
+
+    print(f' done with {len(core.components)} components')
+
+    # Ogni componente del core viene testata per raggiungere
+    # l'irriducibilità
+    if config['post_pruning_irreducibility']:
+
+        print(f'Checking irreducibility ({len(core.components)} components):', end='')
+
+        # Crea una copia delle componenti del core
+        irreducible_components: list[PatientService] = core.components.copy()
+
+        # Tenta di eliminare ogni componente (a parte la prima e l'ultima)
+        # cercando di mantenere la non soddisfacibilità
+        for component_index, component in enumerate(core.components[1:-1]):
+
+            # Rimuovi la componente corrente
+            irreducible_components.remove(component)
 
-            print(f' -> {cursor}', end='')
-            
             # Elimina i pazienti dall'istanza copiata
             cloned_instance.patients = {}
-            
-            # Aggiungi le richieste fino a 'cursor'
-            for request in sorted_requests[:cursor + 1]:
-                
+
+            # Aggiungi le richieste senza quella corrente
+            for request in irreducible_components:
+
                 patient_name = request.patient_name
                 service_name = request.service_name
 
@@ -337,72 +411,160 @@ def get_pruned_slim_cores(
             if len(errors) > 0:
                 for error in errors:
                     print(f'ERROR: {error}')
-                return []
+                return False
 
-            # Ricerca dicotomica
-            if is_instance_fully_satisfiable(cloned_instance, config):
-                start = cursor
+            print(f' {component_index + 2}', end='')
+
+            if is_request_set_satisfiable(oracle, irreducible_components, cloned_instance, config):
+                irreducible_components.append(component)
+                print('y', end='')
             else:
-                end = cursor
                 print('x', end='')
-            
-            cursor = (end - start) // 2 + start
 
+        print('')
 
-        # Le nuove componenti sono quelle rimaste, più l'ultima appena tolta che
-        # ha garantito la piena soddisfacibilità
-        if end >= len(core.reason):
-            core.components = sorted_requests[:end + 1]
-        else:
-            print(f'ERROR: core size is less than its reason')
+        core.components = irreducible_components
 
-        print(f' done with {len(core.components)} components')
+    return True
 
-        # Ogni componente del core viene testata per raggiungere
-        # l'irriducibilità
-        if config['post_pruning_irreducibility']:
+def prune_day_cores(
+        indexed_cores: list[tuple[int, FatCore]] | list[tuple[int, SlimCore]],
+        core_number: int,
+        instance: FatSubproblemInstance | SlimSubproblemInstance,
+        subproblem_result: SlimSubproblemResult | None,
+        oracle: SatisfiabilityOracle,
+        config,
+        capture_output: bool=False,
+        core_minimizer=None) -> tuple[list[tuple[int, FatCore]] | list[tuple[int, SlimCore]], SatisfiabilityOracle, str, bool]:
+    """Potatura, nell'ordine fornito, dei core di uno stesso giorno che
+    condividono quindi lo stesso oracolo. Ritorna i core potati con il loro
+    indice, l'oracolo aggiornato, l'eventuale output catturato e False se la
+    potatura è fallita. Se fornita, 'core_minimizer' sostituisce la ricerca
+    dicotomica e riceve (core, indice, numero di core, istanza, risultato del
+    sottoproblema, oracolo, configurazione). Può essere eseguita in un processo
+    separato."""
+
+    output = io.StringIO()
+
+    with redirect_stdout(output) if capture_output else nullcontext():
+        for core_index, core in indexed_cores:
+            if len(core.components) <= 1:
+                continue
 
-            print(f'Checking irreducibility ({len(core.components)} components):', end='')
+            if core_minimizer is not None:
+                is_pruned = core_minimizer(core, core_index, core_number, instance, subproblem_result, oracle, config)
+            elif isinstance(core, FatCore):
+                is_pruned = prune_fat_core(core, core_index, core_number, instance, oracle, config) # type: ignore
+            else:
+                is_pruned = prune_slim_core(core, core_index, core_number, instance, subproblem_result, oracle, config) # type: ignore
+
+            if not is_pruned:
+                return indexed_cores, oracle, output.getvalue(), False
+
+    return indexed_cores, oracle, output.getvalue(), True
+
+def get_pruned_cores(
+        instances: dict[DayName, FatSubproblemInstance] | dict[DayName, SlimSubproblemInstance],
+        all_subproblem_results: dict[DayName, SlimSubproblemResult] | None,
+        cores: list[FatCore] | list[SlimCore],
+        config,
+        oracles: dict[DayName, SatisfiabilityOracle],
+        core_minimizer=None) -> list[FatCore] | list[SlimCore]:
+    """Potatura di tutti i core. I core sono raggruppati per giorno: se
+    configurato più di un processo, i giorni sono potati contemporaneamente ed
+    i core e l'output sono riuniti nell'ordine originale."""
+
+    # Core di ogni giorno, in ordine di prima apparizione del giorno
+    indexed_cores_by_day: dict[DayName, list] = {}
+    for core_index, core in enumerate(cores):
+        if core.day not in indexed_cores_by_day:
+            indexed_cores_by_day[core.day] = []
+        indexed_cores_by_day[core.day].append((core_index, core))
+
+    for day_name in indexed_cores_by_day.keys():
+        if day_name not in oracles:
+            oracles[day_name] = SatisfiabilityOracle()
+
+    def get_subproblem_result(day_name: DayName) -> SlimSubproblemResult | None:
+        if all_subproblem_results is None:
+            return None
+        return all_subproblem_results[day_name]
+
+    worker_number = min(config['core_pruning']['parallel_workers'], len(indexed_cores_by_day))
+
+    # Potatura sequenziale dei core nell'ordine originale
+    if worker_number <= 1:
+        for core_index, core in enumerate(cores):
+            _, _, _, is_pruned = prune_day_cores(
+                [(core_index, core)], len(cores), instances[core.day],
+                get_subproblem_result(core.day), oracles[core.day], config,
+                core_minimizer=core_minimizer)
+            if not is_pruned:
+                return []
+        return cores
 
-            # Crea una copia delle componenti del core
-            irreducible_components: list[PatientService] = core.components.copy()
-            
-            # Tenta di eliminare ogni componente (a parte la prima e l'ultima)
-            # cercando di mantenere la non soddisfacibilità
-            for component_index, component in enumerate(core.components[1:-1]):
+    # I processi sono creati con 'fork' dato che gli script principali terminano
+    # se importati come moduli (come avverrebbe con 'spawn')
+    context = multiprocessing.get_context('fork')
 
-                # Rimuovi la componente corrente
-                irreducible_components.remove(component)
+    pruned_cores: list = list(cores)
 
-                # Elimina i pazienti dall'istanza copiata
-                cloned_instance.patients = {}
-                
-                # Aggiungi le richieste senza quella corrente
-                for request in irreducible_components:
-                    
-                    patient_name = request.patient_name
-                    service_name = request.service_name
-
-                    if patient_name not in cloned_instance.patients:
-                        cloned_instance.patients[patient_name] = SlimSubproblemPatient(instance.patients[patient_name].priority)
-                    cloned_instance.patients[patient_name].requests.append(service_name)
-
-                errors = check_slim_subproblem_instance(cloned_instance)
-                if len(errors) > 0:
-                    for error in errors:
-                        print(f'ERROR: {error}')
-                    return []
-
-                print(f' {component_index + 2}', end='')
-
-                if is_instance_fully_satisfiable(cloned_instance, config):
-                    irreducible_components.append(component)
-                    print('y', end='')
-                else:
-                    print('x', end='')
-            
-            print('')
+    with ProcessPoolExecutor(max_workers=worker_number, mp_context=context) as executor:
+
+        futures = {}
+        for day_name, indexed_cores in indexed_cores_by_day.items():
+            futures[day_name] = executor.submit(
+                prune_day_cores, indexed_cores, len(cores), instances[day_name],
+                get_subproblem_result(day_name), oracles[day_name], config, True, core_minimizer)
+
+        # Unione deterministica dei risultati nell'ordine di prima apparizione dei
+        # giorni fra i core
+        are_all_pruned = True
+        for day_name, future in futures.items():
+            indexed_cores, oracle, output, is_pruned = future.result()
+
+            print(output, end='')
+            oracles[day_name] = oracle
+            for core_index, core in indexed_cores:
+                pruned_cores[core_index] = core
+
+            if not is_pruned:
+                are_all_pruned = False
+
+    if not are_all_pruned:
+        return []
+
+    return pruned_cores
+
+def get_pruned_fat_cores(
+        instances: dict[DayName, FatSubproblemInstance],
+        reduced_cores: list[FatCore],
+        config,
+        oracles: dict[DayName, SatisfiabilityOracle] | None=None) -> list[FatCore]:
+    """Computazione dei core ridotti, a cui si tenta progressivamente di
+    togliere le richieste più lontane secondo una metrica euristica. Appena il
+    core diventa pienamente soddisfacibile si torna indietro di un passaggio.
+    Le risposte di soddisfacibilità sono memorizzate negli oracoli dei giorni,
+    che possono essere forniti per riutilizzarle fra chiamate successive."""
+
+    if oracles is None:
+        oracles = {}
+
+    return get_pruned_cores(instances, None, reduced_cores, config, oracles) # type: ignore
+
+def get_pruned_slim_cores(
+        all_subproblem_results: dict[DayName, SlimSubproblemResult],
+        instances: dict[DayName, SlimSubproblemInstance],
+        reduced_cores: list[SlimCore],
+        config,
+        oracles: dict[DayName, SatisfiabilityOracle] | None=None) -> list[SlimCore]:
+    """Computazione dei core ridotti, a cui si tenta progressivamente di
+    togliere le richieste più lontane secondo una metrica euristica. Appena il
+    core diventa pienamente soddisfacibile si torna indietro di un passaggio.
+    Le risposte di soddisfacibilità sono memorizzate negli oracoli dei giorni,
+    che possono essere forniti per riutilizzarle fra chiamate successive."""
 
-            core.components = irreducible_components
+    if oracles is None:
+        oracles = {}
 
-    return cores
\ No newline at end of file
+    return get_pruned_cores(instances, all_subproblem_results, reduced_cores, config, oracles) # type: ignore
@@ -0,0 +1,64 @@
+from src.common.custom_types import PatientServiceOperator, PatientService
+
+
+class SatisfiabilityOracle:
+    '''Memoria delle risposte di piena soddisfacibilità per i sottoinsiemi di
+    richieste di uno stesso giorno. Ogni richiesta riceve un bit e gli insiemi
+    sono rappresentati come interi. La soddisfacibilità è monotona: ogni
+    sottoinsieme di un insieme soddisfacibile è soddisfacibile ed ogni
+    sovrainsieme di uno non soddisfacibile non lo è. Per questo sono mantenuti
+    solo gli insiemi soddisfacibili massimali e quelli non soddisfacibili
+    minimali.'''
+
+    def __init__(self):
+        self.request_bits: dict[PatientServiceOperator | PatientService, int] = {}
+        self.satisfiable_masks: list[int] = []
+        self.unsatisfiable_masks: list[int] = []
+        self.hit_number = 0
+        self.miss_number = 0
+
+    def get_mask(self, requests: list[PatientServiceOperator] | list[PatientService]) -> int:
+        '''Ritorna l'intero che rappresenta l'insieme di richieste, assegnando
+        un nuovo bit a quelle mai incontrate.'''
+
+        mask = 0
+        for request in requests:
+            if request not in self.request_bits:
+                self.request_bits[request] = len(self.request_bits)
+            mask |= 1 << self.request_bits[request]
+
+        return mask
+
+    def lookup(self, requests: list[PatientServiceOperator] | list[PatientService]) -> bool | None:
+        '''Ritorna la soddisfacibilità dell'insieme di richieste se deducibile
+        dalle risposte precedenti, None altrimenti.'''
+
+        mask = self.get_mask(requests)
+
+        # Sottoinsieme di un insieme soddisfacibile
+        for satisfiable_mask in self.satisfiable_masks:
+            if mask & ~satisfiable_mask == 0:
+                self.hit_number += 1
+                return True
+
+        # Sovrainsieme di un insieme non soddisfacibile
+        for unsatisfiable_mask in self.unsatisfiable_masks:
+            if unsatisfiable_mask & ~mask == 0:
+                self.hit_number += 1
+                return False
+
+        self.miss_number += 1
+        return None
+
+    def record(self, requests: list[PatientServiceOperator] | list[PatientService], is_satisfiable: bool):
+        '''Memorizza la risposta per l'insieme di richieste, scartando quelle
+        ormai implicate dalla nuova.'''
+
+        mask = self.get_mask(requests)
+
+        if is_satisfiable:
+            self.satisfiable_masks = [m for m in self.satisfiable_masks if m & ~mask != 0]
+            self.satisfiable_masks.append(mask)
+        else:
+            self.unsatisfiable_masks = [m for m in self.unsatisfiable_masks if mask & ~m != 0]
+            self.unsatisfiable_masks.append(mask)
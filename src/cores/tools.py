@@ -1,4 +1,4 @@
-from src.common.custom_types import FatCore, SlimCore
+from src.common.custom_types import FatCore, SlimCore, DayName
 
 def get_core_hash(core: FatCore | SlimCore) -> str:
     """Stringa che codifica in maniera non univoca uno specifico core.
@@ -9,7 +9,10 @@ def get_core_hash(core: FatCore | SlimCore) -> str:
 
 def is_core_included(core: FatCore | SlimCore, cores: list[FatCore] | list[SlimCore]) -> bool:
     """Funzione che stabilisce se un core è già presente all'interno di una
-    lista di core."""
+    lista di core. Per controlli ripetuti conviene mantenere un insieme delle
+    firme dei core."""
+
+    signature = core.signature
 
     for other_core in cores:
         
@@ -18,17 +21,10 @@ def is_core_included(core: FatCore | SlimCore, cores: list[FatCore] | list[SlimC
             continue
         if core.day != other_core.day:
             continue
-        if len(core.reason) != len(other_core.reason):
-            continue
 
         # I core, per essere uguali, devono avere le stesse componenti
         # (anche in diverso ordine)
-        are_all_component_present = True
-        for component in core.components:
-            if component not in other_core.components:
-                are_all_component_present = False
-                break
-        if are_all_component_present:
+        if signature == other_core.signature:
             return True
 
     return False
@@ -38,15 +34,17 @@ def check_for_duplicate_cores(cores: list[FatCore] | list[SlimCore]) -> list[Fat
     """Funzione che rimuove eventuali core duplicati, anche se hanno le
     componenti in un differente ordine. Non modifica la lista di input."""
 
-    # Lista dei soli core giudicati unici
+    # Lista dei soli core giudicati unici e delle loro firme
     unique_cores: list[FatCore] | list[SlimCore] = []
+    unique_signatures: set[tuple[DayName, frozenset]] = set()
     
     for core in cores:
 
-        # Se dopo aver controllato il core corrente con tutti quelli
-        # già unici non si è trovata nessuna copia, aggiungilo a sua volta nella
-        # lista degli unici
-        if is_core_included(core, unique_cores):
+        # Se la firma del core corrente non è mai stata incontrata, aggiungilo
+        # nella lista degli unici
+        signature = core.signature
+        if signature not in unique_signatures:
+            unique_signatures.add(signature)
             unique_cores.append(core) # type: ignore
 
     return unique_cores
@@ -58,16 +56,54 @@ def aggregate_core_lists(
     """Funzione che combina due liste di core, rimuovendo eventuali duplicati.
     Le liste originarie non vengono modificate."""
     
-    aggregate_list: list[FatCore] | list[SlimCore] = []
+    # Aggiungi tutti i core unici della prima lista e poi della seconda
+    return check_for_duplicate_cores(cores + other_cores) # type: ignore
 
-    # Aggiungi tutti i core unici della prima lista
-    for core in cores:
-        if not is_core_included(core, aggregate_list):
-            aggregate_list.append(core) # type: ignore
-    
-    # Aggiungi tutti i core unici della seconda lista
-    for other_core in other_cores:
-        if not is_core_included(other_core, aggregate_list):
-            aggregate_list.append(other_core) # type: ignore
 
-    return aggregate_list
\ No newline at end of file
+def remove_dominated_cores(cores: list[FatCore] | list[SlimCore]) -> list[FatCore] | list[SlimCore]:
+    """Funzione che rimuove i core le cui componenti contengono tutte quelle di
+    un altro core dello stesso giorno: il taglio del core più piccolo implica
+    quello del più grande. I core rimasti mantengono l'ordine originale. Non
+    modifica la lista di input."""
+
+    # I core più piccoli sono esaminati per primi, così che ogni core venga
+    # confrontato solo con quelli già tenuti
+    sorted_indices = sorted(range(len(cores)), key=lambda i: len(cores[i].components))
+
+    # Per ogni giorno e componente, gli indici dei core tenuti che la contengono
+    kept_cores_by_component: dict[DayName, dict] = {}
+    kept_sizes: dict[int, int] = {}
+
+    for core_index in sorted_indices:
+        
+        core = cores[core_index]
+        components = set(core.components)
+
+        if core.day not in kept_cores_by_component:
+            kept_cores_by_component[core.day] = {}
+        day_index = kept_cores_by_component[core.day]
+
+        # Conta quante componenti di ogni core tenuto sono presenti in quello
+        # corrente: se sono tutte, il core corrente è dominato
+        hit_numbers: dict[int, int] = {}
+        is_dominated = False
+
+        for component in components:
+            for other_core_index in day_index.get(component, []):
+                hit_numbers[other_core_index] = hit_numbers.get(other_core_index, 0) + 1
+                if hit_numbers[other_core_index] == kept_sizes[other_core_index]:
+                    is_dominated = True
+                    break
+            if is_dominated:
+                break
+
+        if is_dominated:
+            continue
+
+        kept_sizes[core_index] = len(components)
+        for component in components:
+            if component not in day_index:
+                day_index[component] = []
+            day_index[component].append(core_index)
+
+    return [core for core_index, core in enumerate(cores) if core_index in kept_sizes] # type: ignore
@@ -0,0 +1,108 @@
+from src.common.custom_types import FatSubproblemInstance, SlimSubproblemInstance, FatSubproblemResult, SlimSubproblemResult
+from src.common.custom_types import PatientServiceOperatorTimeSlot, PatientService, PatientServiceOperator
+from src.common.custom_types import PatientName, ServiceName, OperatorName, TimeSlot
+
+
+def get_earliest_time_slot(
+        busy_intervals: list[tuple[TimeSlot, TimeSlot]],
+        start: TimeSlot,
+        end: TimeSlot,
+        duration: TimeSlot) -> TimeSlot | None:
+    '''Funzione che ritorna il primo tempo di inizio in [start, end - duration]
+    che non si sovrappone a nessuno degli intervalli occupati forniti, oppure
+    None se il servizio non può essere inserito.'''
+
+    time_slot = start
+
+    for interval_start, interval_end in sorted(busy_intervals):
+
+        if time_slot + duration > end:
+            return None
+
+        # L'intervallo occupato termina prima del servizio oppure inizia dopo
+        if interval_end <= time_slot:
+            continue
+        if interval_start >= time_slot + duration:
+            break
+
+        time_slot = interval_end
+
+    if time_slot + duration > end:
+        return None
+
+    return time_slot
+
+
+def get_greedy_subproblem_result(instance: FatSubproblemInstance | SlimSubproblemInstance) -> FatSubproblemResult | SlimSubproblemResult:
+    '''Euristica costruttiva (list scheduling) per il sottoproblema di un
+    giorno. Le richieste sono considerate in ordine di priorità e durata
+    decrescenti ed ognuna viene inserita al primo tempo disponibile fra gli
+    operatori ammissibili (quello fissato per le istanze 'fat', tutti quelli
+    dell'unità di cura per le istanze 'slim'), rispettando la disgiunzione dei
+    servizi dello stesso paziente e dello stesso operatore. Le richieste che non
+    trovano posto vengono rifiutate.'''
+
+    if isinstance(instance, FatSubproblemInstance):
+        result = FatSubproblemResult()
+    else:
+        result = SlimSubproblemResult()
+
+    # Terne (p, s, operatori ammissibili) di ogni richiesta
+    requests: list[tuple[PatientName, ServiceName, list[OperatorName]]] = []
+
+    for patient_name, patient in instance.patients.items():
+        for request in patient.requests:
+            if isinstance(instance, FatSubproblemInstance):
+                requests.append((patient_name, request.service_name, [request.operator_name])) # type: ignore
+            else:
+                care_unit_name = instance.services[request].care_unit_name # type: ignore
+                requests.append((patient_name, request, sorted(instance.day.care_units[care_unit_name].keys()))) # type: ignore
+
+    requests.sort(key=lambda r: (
+        -instance.patients[r[0]].priority,
+        -instance.services[r[1]].duration,
+        r[0], r[1]))
+
+    patient_intervals: dict[PatientName, list[tuple[TimeSlot, TimeSlot]]] = {}
+    operator_intervals: dict[OperatorName, list[tuple[TimeSlot, TimeSlot]]] = {}
+
+    for patient_name, service_name, operator_names in requests:
+
+        duration = instance.services[service_name].duration
+        if patient_name not in patient_intervals:
+            patient_intervals[patient_name] = []
+
+        # Scelta dell'operatore che permette di iniziare prima
+        best_operator_name = None
+        best_time_slot = None
+
+        for operator_name in operator_names:
+
+            operator = instance.day.operators[operator_name]
+            if operator_name not in operator_intervals:
+                operator_intervals[operator_name] = []
+
+            time_slot = get_earliest_time_slot(
+                patient_intervals[patient_name] + operator_intervals[operator_name],
+                operator.start, operator.end, duration)
+
+            if time_slot is not None and (best_time_slot is None or time_slot < best_time_slot):
+                best_operator_name = operator_name
+                best_time_slot = time_slot
+
+        if best_operator_name is None or best_time_slot is None:
+            if isinstance(instance, FatSubproblemInstance):
+                result.rejected.append(PatientServiceOperator(patient_name, service_name, operator_names[0])) # type: ignore
+            else:
+                result.rejected.append(PatientService(patient_name, service_name)) # type: ignore
+            continue
+
+        patient_intervals[patient_name].append((best_time_slot, best_time_slot + duration))
+        operator_intervals[best_operator_name].append((best_time_slot, best_time_slot + duration))
+        result.scheduled.append(PatientServiceOperatorTimeSlot(patient_name, service_name, best_operator_name, best_time_slot))
+
+    # Ordina le chiavi
+    result.scheduled.sort(key=lambda r: (r.patient_name, r.service_name, r.operator_name, r.time_slot))
+    result.rejected.sort(key=lambda r: (r.patient_name, r.service_name))
+
+    return result
@@ -0,0 +1,91 @@
+from src.common.custom_types import FatSubproblemInstance, SlimSubproblemInstance
+from src.common.custom_types import PatientName, OperatorName, CareUnitName, TimeSlot
+from src.heuristics.list_scheduling import get_greedy_subproblem_result
+
+
+def is_instance_surely_unsatisfiable(instance: FatSubproblemInstance | SlimSubproblemInstance) -> bool:
+    '''Funzione che controlla alcune condizioni necessarie alla piena
+    soddisfacibilità dell'istanza, senza risolvere alcun modello. Se ritorna
+    True l'istanza non può essere pienamente soddisfatta, altrimenti non è
+    possibile concludere nulla.'''
+
+    # Durate richieste per ogni risorsa ed intervallo in cui ogni paziente può
+    # essere servito
+    load_by_operator: dict[OperatorName, TimeSlot] = {}
+    load_by_care_unit: dict[CareUnitName, TimeSlot] = {}
+    long_requests_by_care_unit: dict[CareUnitName, int] = {}
+    load_by_patient: dict[PatientName, TimeSlot] = {}
+    span_by_patient: dict[PatientName, tuple[TimeSlot, TimeSlot]] = {}
+
+    for patient_name, patient in instance.patients.items():
+        for request in patient.requests:
+
+            if isinstance(instance, FatSubproblemInstance):
+                service_name = request.service_name # type: ignore
+                operators = [instance.day.operators[request.operator_name]] # type: ignore
+            else:
+                service_name = request
+                operators = list(instance.day.care_units[instance.services[service_name].care_unit_name].values()) # type: ignore
+
+            duration = instance.services[service_name].duration # type: ignore
+            care_unit_name = instance.services[service_name].care_unit_name # type: ignore
+
+            # Il servizio deve entrare in almeno un operatore
+            if all(operator.duration < duration for operator in operators):
+                return True
+
+            if isinstance(instance, FatSubproblemInstance):
+                operator_name = request.operator_name # type: ignore
+                load_by_operator[operator_name] = load_by_operator.get(operator_name, 0) + duration
+            else:
+                load_by_care_unit[care_unit_name] = load_by_care_unit.get(care_unit_name, 0) + duration
+
+                # Due servizi più lunghi di metà dell'operatore più capiente
+                # non possono essere svolti dallo stesso operatore
+                if 2 * duration > max(operator.duration for operator in operators):
+                    long_requests_by_care_unit[care_unit_name] = long_requests_by_care_unit.get(care_unit_name, 0) + 1
+
+            load_by_patient[patient_name] = load_by_patient.get(patient_name, 0) + duration
+            span_start = min(operator.start for operator in operators)
+            span_end = max(operator.end for operator in operators)
+            if patient_name in span_by_patient:
+                span_start = min(span_start, span_by_patient[patient_name][0])
+                span_end = max(span_end, span_by_patient[patient_name][1])
+            span_by_patient[patient_name] = (span_start, span_end)
+
+    # Carico degli operatori rispetto alla loro durata
+    for operator_name, load in load_by_operator.items():
+        if load > instance.day.operators[operator_name].duration:
+            return True
+
+    # Carico delle unità di cura rispetto alla loro capacità
+    for care_unit_name, load in load_by_care_unit.items():
+        if load > instance.day.duration(care_unit_name):
+            return True
+
+    for care_unit_name, long_request_number in long_requests_by_care_unit.items():
+        if long_request_number > len(instance.day.care_units[care_unit_name]):
+            return True
+
+    # I servizi dello stesso paziente non si sovrappongono
+    for patient_name, load in load_by_patient.items():
+        span_start, span_end = span_by_patient[patient_name]
+        if load > span_end - span_start:
+            return True
+
+    return False
+
+
+def get_screened_satisfiability(instance: FatSubproblemInstance | SlimSubproblemInstance) -> bool | None:
+    '''Funzione che tenta di decidere la piena soddisfacibilità dell'istanza
+    senza risolvere alcun modello: ritorna False se una condizione necessaria
+    è violata, True se l'euristica costruttiva inserisce ogni richiesta e None
+    se nessuna delle due verifiche è conclusiva.'''
+
+    if is_instance_surely_unsatisfiable(instance):
+        return False
+
+    if len(get_greedy_subproblem_result(instance).rejected) == 0:
+        return True
+
+    return None
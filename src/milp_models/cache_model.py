@@ -12,21 +12,20 @@ def get_cache_model(
 
     # INSIEMI ##################################################################
     
-    day_names = set(iter_day.day_name for iter_days in cache.values() for iter_day in iter_days)
-    model.day_names = pyo.Set(initialize=sorted(day_names)) # type: ignore
+    model.day_names = pyo.Set(initialize=sorted(cache.iterations.keys())) # type: ignore
 
     # INDICI ###################################################################
 
     # Insieme di coppie (i, d)
-    choice_index = set((iter_day.iteration_name, iter_day.day_name) for iter_days in cache.values() for iter_day in iter_days)
+    choice_index = set((iter_day.iteration_name, iter_day.day_name) for iter_day in cache.request_masks.keys())
 
     # Tuple (p, s, start, end) per ogni richiesta
-    request_index = set((r.patient_name, r.service_name, r.window.start, r.window.end) for r in cache.keys())
+    request_index = set((r.patient_name, r.service_name, r.window.start, r.window.end) for r in cache.iteration_days.keys())
 
     model.choice_index = pyo.Set(initialize=sorted(choice_index)) # type: ignore
     model.request_index = pyo.Set(initialize=sorted(request_index)) # type: ignore
 
-    del day_names, choice_index, request_index
+    del choice_index, request_index
 
     # VARIABILI ################################################################
 
@@ -45,14 +44,14 @@ def get_cache_model(
     def link_choose_to_window_variables(model, p, s, start, end):
         
         request = PatientServiceWindow(p, s, Window(start, end))
-        affected_tuples = [(iter_day.iteration_name, iter_day.day_name) for iter_day in cache[request]]
+        affected_tuples = [(iter_day.iteration_name, iter_day.day_name) for iter_day in cache.iteration_days[request]]
         
         return pyo.quicksum(model.choose[i, d] for i, d in affected_tuples) >= model.request[p, s, start, end]
 
     # Ogni giorno deve scegliere un'iterazione sola
     @model.Constraint(model.day_names) # type: ignore
     def iteration_chooses_one_day(model, d):
-        return pyo.quicksum(model.choose[i, d] for i, dd in model.choice_index if d == dd) == 1
+        return pyo.quicksum(model.choose[i, d] for i in cache.iterations[d]) == 1
 
     # FUNZIONE OBIETTIVO #######################################################
 
@@ -1,7 +1,11 @@
 import pyomo.environ as pyo
 from src.common.custom_types import MasterInstance, PatientName, ServiceName, DayName, TimeSlot
+from src.common.custom_types import CareUnitName, OperatorName
 from src.common.custom_types import SlimMasterResult, PatientService, PatientServiceWindow, FatMasterResult
-from src.common.custom_types import PatientServiceOperator, FatCore, SlimCore, Window
+from src.common.custom_types import PatientServiceOperator, FatCore, SlimCore, Window, FinalResult
+from src.common.schedule_index import ScheduleIndex
+from src.common.day_profiles import get_max_spans, get_care_unit_durations
+from src.common.window_presolve import get_dominated_windows
 
 def get_slim_master_model(instance: MasterInstance, additional_info: list[str]) -> pyo.ConcreteModel:
 
@@ -12,11 +16,9 @@ def get_slim_master_model(instance: MasterInstance, additional_info: list[str])
     # Tutte le coppie (day, care_unit)
     model.care_units = pyo.Set(initialize=sorted((d, c) for d, day in instance.days.items() for c in day.care_units.keys())) # type: ignore
 
-    max_span: dict[DayName, TimeSlot] = {}
-    for day_name, day in instance.days.items():
-        min_time_slot = min([o.start for o in day.operators.values()])
-        max_time_slot = max([o.start + o.duration for o in day.operators.values()])
-        max_span[day_name] = max_time_slot - min_time_slot
+    # Valori calcolati una sola volta per ogni classe di giorni equivalenti
+    max_span: dict[DayName, TimeSlot] = get_max_spans(instance.days)
+    care_unit_durations: dict[tuple[DayName, CareUnitName], TimeSlot] = get_care_unit_durations(instance.days)
 
     # INDICI ###################################################################
 
@@ -39,11 +41,29 @@ def get_slim_master_model(instance: MasterInstance, additional_info: list[str])
                     do_index.add((patient_name, service_name, day_index))
                     pat_days_index.add((patient_name, day_index))
 
+    # Le finestre contenute in un'altra della stessa coppia (p, s) non
+    # richiedono né variabile né vincolo
+    dominated_windows = get_dominated_windows(window_index)
+    window_index -= dominated_windows
+
     model.window_index = pyo.Set(initialize=sorted(window_index)) # type: ignore
+    model.dominated_window_index = pyo.Set(initialize=sorted(dominated_windows)) # type: ignore
     model.do_index = pyo.Set(initialize=sorted(do_index)) # type: ignore
     model.pat_days_index = pyo.Set(initialize=sorted(pat_days_index)) # type: ignore
 
-    del window_index, do_index, pat_days_index
+    del window_index, dominated_windows, do_index, pat_days_index
+
+    # Raggruppamento degli indici 'do' (nell'ordine di 'do_index') in modo che
+    # ogni vincolo scorra solo le variabili che lo riguardano
+    days_by_patient_service: dict[tuple[PatientName, ServiceName], list[DayName]] = {}
+    requests_by_day_care_unit: dict[tuple[DayName, CareUnitName], list[tuple[PatientName, ServiceName]]] = {}
+    services_by_patient_day: dict[tuple[PatientName, DayName], list[ServiceName]] = {}
+
+    for p, s, d in model.do_index: # type: ignore
+        c = instance.services[s].care_unit_name
+        days_by_patient_service.setdefault((p, s), []).append(d)
+        requests_by_day_care_unit.setdefault((d, c), []).append((p, s))
+        services_by_patient_day.setdefault((p, d), []).append(s)
 
     # VARIABILI ################################################################
 
@@ -58,18 +78,18 @@ def get_slim_master_model(instance: MasterInstance, additional_info: list[str])
     # alla sua finestra
     @model.Constraint(model.window_index) # type: ignore
     def link_window_to_do_variables(model, p, s, start, end):
-        return pyo.quicksum(model.do[pp, ss, d] for pp, ss, d in model.do_index if p == pp and s == ss and d >= start and d <= end) == model.window[p, s, start, end]
+        return pyo.quicksum(model.do[p, s, d] for d in days_by_patient_service[p, s] if d >= start and d <= end) == model.window[p, s, start, end]
 
     # La durata totale dei servizi programmati per ogni unità di cura non può
     # superare la capacità di quest'ultima
     @model.Constraint(model.care_units) # type: ignore
     def respect_care_unit_capacity(model, d, c):
         
-        tuples_affected: list[tuple[PatientName, ServiceName]] = [(p, s) for p, s, dd in model.do_index if d == dd and c == instance.services[s].care_unit_name]
+        tuples_affected: list[tuple[PatientName, ServiceName]] = requests_by_day_care_unit.get((d, c), [])
         if len(tuples_affected) == 0:
             return pyo.Constraint.Skip
         
-        care_unit_duration = sum([o.duration for o in instance.days[d].care_units[c].values()])
+        care_unit_duration = care_unit_durations[d, c]
         if sum(instance.services[s].duration for _, s in tuples_affected) <= care_unit_duration:
             return pyo.Constraint.Skip
 
@@ -80,7 +100,7 @@ def get_slim_master_model(instance: MasterInstance, additional_info: list[str])
     @model.Constraint(model.pat_days_index) # type: ignore
     def patient_total_duration(model, p, d):
         
-        tuples_affected = [s for pp, s, dd in model.do_index if pp == p and dd == d]
+        tuples_affected = services_by_patient_day[p, d]
         if sum(instance.services[s].duration for s in tuples_affected) <= max_span[d]:
             return pyo.Constraint.Skip
         
@@ -91,7 +111,13 @@ def get_slim_master_model(instance: MasterInstance, additional_info: list[str])
     # FUNZIONE OBIETTIVO #######################################################
 
     # L'obiettivo è massimizzare la durata delle richieste svolte, pesate per la
-    # priorità dei pazienti
+    # priorità dei pazienti. Le finestre dominate contano tramite le variabili
+    # 'do' dei loro giorni
+
+    def get_satisfied_duration(model):
+        return (pyo.quicksum(model.window[p, s, start, end] * instance.services[s].duration * instance.patients[p].priority for p, s, start, end in model.window_index)
+                + pyo.quicksum(model.do[p, s, d] * instance.services[s].duration * instance.patients[p].priority
+                    for p, s, start, end in model.dominated_window_index for d in days_by_patient_service[p, s] if d >= start and d <= end))
     
     if 'minimize_hospital_accesses' in additional_info:
         
@@ -103,16 +129,24 @@ def get_slim_master_model(instance: MasterInstance, additional_info: list[str])
     
         @model.Objective(sense=pyo.maximize) # type: ignore
         def objective_function(model): # type: ignore
-            return (pyo.quicksum(model.window[p, s, start, end] * instance.services[s].duration * instance.patients[p].priority for p, s, start, end in model.window_index)
+            return (get_satisfied_duration(model)
                     - 1.0 / len(model.pat_days_index) * pyo.quicksum(model.pat_uses_day[p, d] for p, d in model.pat_days_index))
     else:
         @model.Objective(sense=pyo.maximize) # type: ignore
         def objective_function(model):
-            return pyo.quicksum(model.window[p, s, start, end] * instance.services[s].duration * instance.patients[p].priority for p, s, start, end in model.window_index)
+            return get_satisfied_duration(model)
 
     return model # type: ignore
 
-def add_core_constraints_to_slim_master_model(model: pyo.ConcreteModel, cores: list[SlimCore]):
+def add_core_constraints_to_slim_master_model(
+        model: pyo.ConcreteModel,
+        cores: list[SlimCore],
+        persistent_solver=None,
+        lazy: bool=False):
+    '''Aggiunge al master un vincolo per ogni core. Se viene fornito un
+    solutore persistente, i nuovi vincoli vengono passati direttamente a
+    quest'ultimo senza dover ricaricare l'intero modello. Con 'lazy' i vincoli
+    sono aggiunti come tagli lazy dall'interno della callback del solutore.'''
     
     for core in cores:
         
@@ -126,7 +160,13 @@ def add_core_constraints_to_slim_master_model(model: pyo.ConcreteModel, cores: l
             
             expr += model.do[p, s, d] # type: ignore
         
-        model.cores.add(expr=expr <= len(core.components)) # type: ignore
+        constraint = model.cores.add(expr=expr <= len(core.components)) # type: ignore
+
+        if persistent_solver is not None:
+            if lazy:
+                persistent_solver.cbLazy(constraint)
+            else:
+                persistent_solver.add_constraint(constraint)
 
 def get_result_from_slim_master_model(model: pyo.ConcreteModel) -> SlimMasterResult:
 
@@ -145,14 +185,42 @@ def get_result_from_slim_master_model(model: pyo.ConcreteModel) -> SlimMasterRes
             continue
         result.rejected.append(PatientServiceWindow(p, s, Window(start, end)))
 
+    # Le finestre dominate non hanno variabile e sono soddisfatte se (p, s) è
+    # programmata in uno dei loro giorni
+    schedule_index = ScheduleIndex(result.scheduled)
+    for p, s, start, end in model.dominated_window_index: # type: ignore
+        if schedule_index.is_window_satisfied(p, s, Window(start, end)):
+            continue
+        result.rejected.append(PatientServiceWindow(p, s, Window(start, end)))
+
     # Ordina le chiavi
     result.scheduled = dict(sorted([(d, r) for d, r in result.scheduled.items()], key=lambda vv: vv[0]))
     for results in result.scheduled.values():
         results.sort(key=lambda r: (r.patient_name, r.service_name))
-    result.rejected.sort(key=lambda r: (r.patient_name, r.service_name))
+    result.rejected.sort(key=lambda r: (r.patient_name, r.service_name, r.window.start, r.window.end))
 
     return result
 
+def set_slim_master_model_start(model: pyo.ConcreteModel, final_result: FinalResult):
+    '''Funzione che imposta come soluzione di partenza del master la proiezione
+    di un risultato finale sulle sue variabili. Di solito il risultato finale
+    rispetta i core, ma non è garantito (ad esempio con i core preemptive):
+    in quel caso Gurobi scarta semplicemente la partenza.'''
+
+    schedule_index = ScheduleIndex(final_result.scheduled)
+
+    for p, s, d in model.do_index: # type: ignore
+        model.do[p, s, d].set_value(1 if schedule_index.is_scheduled(p, s, d) else 0) # type: ignore
+
+    for p, s, start, end in model.window_index: # type: ignore
+        is_satisfied = schedule_index.is_window_satisfied(p, s, Window(start, end))
+        model.window[p, s, start, end].set_value(1 if is_satisfied else 0) # type: ignore
+
+    if hasattr(model, 'pat_uses_day'):
+        for p, d in model.pat_days_index: # type: ignore
+            is_day_used = any(request.patient_name == p for request in final_result.scheduled.get(d, []))
+            model.pat_uses_day[p, d].set_value(1 if is_day_used else 0) # type: ignore
+
 def get_fat_master_model(instance: MasterInstance, additional_info) -> pyo.ConcreteModel:
 
     model = pyo.ConcreteModel()
@@ -162,11 +230,7 @@ def get_fat_master_model(instance: MasterInstance, additional_info) -> pyo.Concr
     # Tutte le coppie (day, operator)
     model.operators = pyo.Set(initialize=sorted((d, o) for d, day in instance.days.items() for o in day.operators.keys())) # type: ignore
 
-    max_span: dict[DayName, TimeSlot] = {}
-    for day_name, day in instance.days.items():
-        min_time_slot = min([o.start for o in day.operators.values()])
-        max_time_slot = max([o.start + o.duration for o in day.operators.values()])
-        max_span[day_name] = max_time_slot - min_time_slot
+    max_span: dict[DayName, TimeSlot] = get_max_spans(instance.days)
 
     # INDICI ###################################################################
 
@@ -191,11 +255,28 @@ def get_fat_master_model(instance: MasterInstance, additional_info) -> pyo.Concr
                         do_index.add((patient_name, service_name, day_name, operator_name))
                         pat_days_index.add((patient_name, day_name))
 
+    # Le finestre contenute in un'altra della stessa coppia (p, s) non
+    # richiedono né variabile né vincolo
+    dominated_windows = get_dominated_windows(window_index)
+    window_index -= dominated_windows
+
     model.window_index = pyo.Set(initialize=sorted(window_index)) # type: ignore
+    model.dominated_window_index = pyo.Set(initialize=sorted(dominated_windows)) # type: ignore
     model.do_index = pyo.Set(initialize=sorted(do_index)) # type: ignore
     model.pat_days_index = pyo.Set(initialize=sorted(pat_days_index)) # type: ignore
 
-    del window_index, do_index, pat_days_index
+    del window_index, dominated_windows, do_index, pat_days_index
+
+    # Raggruppamento degli indici 'do' (nell'ordine di 'do_index') in modo che
+    # ogni vincolo scorra solo le variabili che lo riguardano
+    day_operators_by_patient_service: dict[tuple[PatientName, ServiceName], list[tuple[DayName, OperatorName]]] = {}
+    requests_by_day_operator: dict[tuple[DayName, OperatorName], list[tuple[PatientName, ServiceName]]] = {}
+    service_operators_by_patient_day: dict[tuple[PatientName, DayName], list[tuple[ServiceName, OperatorName]]] = {}
+
+    for p, s, d, o in model.do_index: # type: ignore
+        day_operators_by_patient_service.setdefault((p, s), []).append((d, o))
+        requests_by_day_operator.setdefault((d, o), []).append((p, s))
+        service_operators_by_patient_day.setdefault((p, d), []).append((s, o))
 
     # VARIABILI ################################################################
 
@@ -210,7 +291,7 @@ def get_fat_master_model(instance: MasterInstance, additional_info) -> pyo.Concr
     # alla sua finestra
     @model.Constraint(model.window_index) # type: ignore
     def link_window_to_do_variables(model, p, s, start, end):
-        return pyo.quicksum(model.do[pp, ss, d, o] for pp, ss, d, o in model.do_index if p == pp and s == ss and d >= start and d <= end) == model.window[p, s, start, end]
+        return pyo.quicksum(model.do[p, s, d, o] for d, o in day_operators_by_patient_service[p, s] if d >= start and d <= end) == model.window[p, s, start, end]
 
     # La durata totale dei servizi programmati per ogni operatore non può
     # superare la durata di quest'ultimo
@@ -219,7 +300,7 @@ def get_fat_master_model(instance: MasterInstance, additional_info) -> pyo.Concr
 
         operator_duration = instance.days[d].operators[o].duration
         
-        tuples_affected: list[tuple[PatientName, ServiceName]] = [(p, s) for p, s, dd, oo in model.do_index if d == dd and o == oo]
+        tuples_affected: list[tuple[PatientName, ServiceName]] = requests_by_day_operator.get((d, o), [])
         if len(tuples_affected) == 0:
             return pyo.Constraint.Skip
         
@@ -233,7 +314,7 @@ def get_fat_master_model(instance: MasterInstance, additional_info) -> pyo.Concr
     @model.Constraint(model.pat_days_index) # type: ignore
     def patient_total_duration(model, p, d):
         
-        tuples_affected = [(s, o) for pp, s, dd, o in model.do_index if pp == p and dd == d]
+        tuples_affected = service_operators_by_patient_day[p, d]
         if sum(instance.services[s].duration for s, _ in tuples_affected) <= max_span[d]:
             return pyo.Constraint.Skip
         
@@ -244,7 +325,13 @@ def get_fat_master_model(instance: MasterInstance, additional_info) -> pyo.Concr
     # FUNZIONE OBIETTIVO #######################################################
 
     # L'obiettivo è massimizzare la durata delle richieste svolte, pesate per la
-    # priorità dei pazienti
+    # priorità dei pazienti. Le finestre dominate contano tramite le variabili
+    # 'do' dei loro giorni
+
+    def get_satisfied_duration(model):
+        return (pyo.quicksum(model.window[p, s, start, end] * instance.services[s].duration * instance.patients[p].priority for p, s, start, end in model.window_index)
+                + pyo.quicksum(model.do[p, s, d, o] * instance.services[s].duration * instance.patients[p].priority
+                    for p, s, start, end in model.dominated_window_index for d, o in day_operators_by_patient_service[p, s] if d >= start and d <= end))
 
     if 'minimize_hospital_accesses' in additional_info:
         
@@ -254,21 +341,29 @@ def get_fat_master_model(instance: MasterInstance, additional_info) -> pyo.Concr
 
         @model.Constraint(model.psd_index) # type: ignore
         def link_do_to_pat_uses_day_variables(model, p, s, d):
-            return pyo.quicksum(model.do[p, s, d, o] for pp, ss, dd, o in model.do_index if p == pp and s == ss and d == dd) <= model.pat_uses_day[p, d]
+            return pyo.quicksum(model.do[p, s, d, o] for dd, o in day_operators_by_patient_service[p, s] if d == dd) <= model.pat_uses_day[p, d]
     
         @model.Objective(sense=pyo.maximize) # type: ignore
         def objective_function(model): # type: ignore
-            return (pyo.quicksum(model.window[p, s, start, end] * instance.services[s].duration * instance.patients[p].priority for p, s, start, end in model.window_index)
+            return (get_satisfied_duration(model)
                     - 1.0 / len(model.pat_days_index) * pyo.quicksum(model.pat_uses_day[p, d] for p, d in model.pat_days_index))
     else:
         @model.Objective(sense=pyo.maximize) # type: ignore
         def objective_function(model):
-            return pyo.quicksum(model.window[p, s, start, end] * instance.services[s].duration * instance.patients[p].priority for p, s, start, end in model.window_index)
+            return get_satisfied_duration(model)
 
 
     return model # type: ignore
 
-def add_core_constraints_to_fat_master_model(model: pyo.ConcreteModel, cores: list[FatCore]):
+def add_core_constraints_to_fat_master_model(
+        model: pyo.ConcreteModel,
+        cores: list[FatCore],
+        persistent_solver=None,
+        lazy: bool=False):
+    '''Aggiunge al master un vincolo per ogni core. Se viene fornito un
+    solutore persistente, i nuovi vincoli vengono passati direttamente a
+    quest'ultimo senza dover ricaricare l'intero modello. Con 'lazy' i vincoli
+    sono aggiunti come tagli lazy dall'interno della callback del solutore.'''
     
     for core in cores:
         
@@ -283,7 +378,13 @@ def add_core_constraints_to_fat_master_model(model: pyo.ConcreteModel, cores: li
             
             expr += model.do[p, s, d, o] # type: ignore
         
-        model.cores.add(expr=expr <= len(core.components)) # type: ignore
+        constraint = model.cores.add(expr=expr <= len(core.components)) # type: ignore
+
+        if persistent_solver is not None:
+            if lazy:
+                persistent_solver.cbLazy(constraint)
+            else:
+                persistent_solver.add_constraint(constraint)
 
 def get_result_from_fat_master_model(model: pyo.ConcreteModel) -> FatMasterResult:
 
@@ -302,10 +403,67 @@ def get_result_from_fat_master_model(model: pyo.ConcreteModel) -> FatMasterResul
             continue
         result.rejected.append(PatientServiceWindow(p, s, Window(start, end)))
 
+    # Le finestre dominate non hanno variabile e sono soddisfatte se (p, s) è
+    # programmata in uno dei loro giorni
+    schedule_index = ScheduleIndex(result.scheduled)
+    for p, s, start, end in model.dominated_window_index: # type: ignore
+        if schedule_index.is_window_satisfied(p, s, Window(start, end)):
+            continue
+        result.rejected.append(PatientServiceWindow(p, s, Window(start, end)))
+
     # Ordina le chiavi
     result.scheduled = dict(sorted([(d, r) for d, r in result.scheduled.items()], key=lambda vv: vv[0]))
     for results in result.scheduled.values():
         results.sort(key=lambda r: (r.patient_name, r.service_name, r.operator_name))
-    result.rejected.sort(key=lambda r: (r.patient_name, r.service_name))
+    result.rejected.sort(key=lambda r: (r.patient_name, r.service_name, r.window.start, r.window.end))
+
+    return result
+
+def set_fat_master_model_start(model: pyo.ConcreteModel, final_result: FinalResult):
+    '''Funzione che imposta come soluzione di partenza del master la proiezione
+    di un risultato finale sulle sue variabili, con gli operatori scelti dal
+    sottoproblema. Come per il master slim la partenza può violare alcuni core
+    (ad esempio con il riallineamento fat-fat), e in quel caso viene scartata
+    da Gurobi.'''
+
+    schedule_index = ScheduleIndex(final_result.scheduled)
+
+    for p, s, d, o in model.do_index: # type: ignore
+        is_scheduled = any(request.operator_name == o for request in schedule_index.get_requests(p, s, d))
+        model.do[p, s, d, o].set_value(1 if is_scheduled else 0) # type: ignore
+
+    for p, s, start, end in model.window_index: # type: ignore
+        is_satisfied = schedule_index.is_window_satisfied(p, s, Window(start, end))
+        model.window[p, s, start, end].set_value(1 if is_satisfied else 0) # type: ignore
+
+    if hasattr(model, 'pat_uses_day'):
+        for p, d in model.pat_days_index: # type: ignore
+            is_day_used = any(request.patient_name == p for request in final_result.scheduled.get(d, []))
+            model.pat_uses_day[p, d].set_value(1 if is_day_used else 0) # type: ignore
+
+def get_master_solution_pool_size(persistent_solver) -> int:
+    '''Numero di soluzioni presenti nel pool del solutore persistente dopo
+    l'ultima risoluzione, compresa quella ottima.'''
+
+    return persistent_solver.get_model_attr('SolCount')
+
+def load_master_pool_solution(
+        model: pyo.ConcreteModel,
+        persistent_solver,
+        solution_number: int):
+    '''Carica nelle variabili di decisione del master la soluzione del pool con
+    l'indice fornito (0 è la migliore), in modo che possa essere letta con le
+    funzioni 'get_result_from_*_master_model'.'''
+
+    variables = list(model.do.values()) + list(model.window.values()) # type: ignore
+
+    persistent_solver.set_gurobi_param('SolutionNumber', solution_number)
+    for variable in variables:
+        variable.set_value(persistent_solver.get_var_attr(variable, 'Xn'), skip_validation=True)
+
+def terminate_persistent_solver(persistent_solver):
+    '''Interrompe la risoluzione in corso del solutore persistente, anche
+    dall'interno di una sua callback. Pyomo non espone il metodo 'terminate'
+    del modello di Gurobi, per cui l'accesso al modello interno è isolato qui.'''
 
-    return result
\ No newline at end of file
+    persistent_solver._solver_model.terminate()
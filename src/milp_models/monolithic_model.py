@@ -1,5 +1,6 @@
 import pyomo.environ as pyo
 from src.common.custom_types import MasterInstance, PatientName, ServiceName, DayName, TimeSlot, CareUnitName, FinalResult
+from src.common.custom_types import OperatorName
 from src.common.custom_types import PatientServiceOperatorTimeSlot, PatientServiceWindow, PatientService, Window
 
 def get_monolithic_model(instance: MasterInstance, additional_info) -> pyo.ConcreteModel:
@@ -43,46 +44,41 @@ def get_monolithic_model(instance: MasterInstance, additional_info) -> pyo.Concr
 
     window_index = list(window_index)
 
-    patient_overlap_index = set()
-    for i in range(len(window_index) - 1):
-
-        p, s, ws, we = window_index[i]
+    # Finestre (nell'ordine di 'window_index') che contengono ogni giorno, per
+    # paziente e per unità di cura. Le coppie di finestre sovrapposte sono
+    # generate direttamente dai giorni in comune, senza confrontare tutte le
+    # coppie di finestre dell'istanza
+    windows_by_patient_day: dict[tuple[PatientName, DayName], list[tuple[PatientName, ServiceName, DayName, DayName]]] = {}
+    windows_by_care_unit_day: dict[tuple[CareUnitName, DayName], list[tuple[PatientName, ServiceName, DayName, DayName]]] = {}
+    for p, s, ws, we in window_index:
         care_unit_name = instance.services[s].care_unit_name
+        for d in range(ws, we + 1):
+            windows_by_patient_day.setdefault((p, d), []).append((p, s, ws, we))
+            windows_by_care_unit_day.setdefault((care_unit_name, d), []).append((p, s, ws, we))
 
-        for j in range(i + 1, len(window_index)):
+    patient_overlap_index = set()
+    for (p, d), windows in windows_by_patient_day.items():
+        for i in range(len(windows) - 1):
 
-            pp, ss, wws, wwe = window_index[j]
+            _, s, ws, we = windows[i]
 
-            if p != pp:
-                continue
-            
-            if (ws <= wws and we >= wws) or (wws <= ws and wwe >= ws):
-                wwws = max(ws, wws)
-                wwwe = min(we, wwe)
+            for j in range(i + 1, len(windows)):
 
-                for d in range(wwws, wwwe + 1):
-                    patient_overlap_index.add((p, s, ws, we, ss, wws, wwe, d))
+                _, ss, wws, wwe = windows[j]
+                patient_overlap_index.add((p, s, ws, we, ss, wws, wwe, d))
 
     operator_overlap_index = set()
-    for i in range(len(window_index) - 1):
-
-        p, s, ws, we = window_index[i]
-        care_unit_name = instance.services[s].care_unit_name
-
-        for j in range(i + 1, len(window_index)):
+    for (care_unit_name, d), windows in windows_by_care_unit_day.items():
+        for i in range(len(windows) - 1):
 
-            pp, ss, wws, wwe = window_index[j]
+            p, s, ws, we = windows[i]
 
-            if care_unit_name != instance.services[ss].care_unit_name:
-                continue
+            for j in range(i + 1, len(windows)):
 
-            if (ws <= wws and we >= wws) or (wws <= ws and wwe >= ws):
-                wwws = max(ws, wws)
-                wwwe = min(we, wwe)
+                pp, ss, wws, wwe = windows[j]
 
-                for d in range(wwws, wwwe + 1):
-                    for o in instance.days[d].care_units[care_unit_name].keys():
-                        operator_overlap_index.add((p, s, ws, we, pp, ss, wws, wwe, o, d))
+                for o in instance.days[d].care_units[care_unit_name].keys():
+                    operator_overlap_index.add((p, s, ws, we, pp, ss, wws, wwe, o, d))
 
     model.window_index = pyo.Set(initialize=sorted(window_index)) # type: ignore
     model.do_index = pyo.Set(initialize=sorted(do_index)) # type: ignore
@@ -91,6 +87,23 @@ def get_monolithic_model(instance: MasterInstance, additional_info) -> pyo.Concr
     model.operator_overlap_index = pyo.Set(initialize=sorted(operator_overlap_index)) # type: ignore
 
     del window_index, do_index, patient_overlap_index, operator_overlap_index
+    del windows_by_patient_day, windows_by_care_unit_day
+
+    # Raggruppamento degli indici 'do' (nell'ordine di 'do_index') in modo che
+    # ogni vincolo scorra solo le variabili che lo riguardano
+    day_operators_by_patient_service: dict[tuple[PatientName, ServiceName], list[tuple[DayName, OperatorName]]] = {}
+    requests_by_day_operator: dict[tuple[DayName, OperatorName], list[tuple[PatientName, ServiceName]]] = {}
+    service_operators_by_patient_day: dict[tuple[PatientName, DayName], list[tuple[ServiceName, OperatorName]]] = {}
+
+    for p, s, d, o in model.do_index: # type: ignore
+        day_operators_by_patient_service.setdefault((p, s), []).append((d, o))
+        requests_by_day_operator.setdefault((d, o), []).append((p, s))
+        service_operators_by_patient_day.setdefault((p, d), []).append((s, o))
+
+    # Coppie (d, o) di ogni finestra (p, s, start, end)
+    window_day_operators: dict[tuple[PatientName, ServiceName, DayName, DayName], list[tuple[DayName, OperatorName]]] = {}
+    for p, s, start, end in model.window_index: # type: ignore
+        window_day_operators[p, s, start, end] = [(d, o) for d, o in day_operators_by_patient_service[p, s] if d >= start and d <= end]
 
     # VARIABILI ################################################################
 
@@ -102,32 +115,40 @@ def get_monolithic_model(instance: MasterInstance, additional_info) -> pyo.Concr
     model.operator_overlap_1 = pyo.Var(model.operator_overlap_index, domain=pyo.Binary) # type: ignore
     model.operator_overlap_2 = pyo.Var(model.operator_overlap_index, domain=pyo.Binary) # type: ignore
 
+    # Somma delle variabili 'do' di ogni finestra, calcolata una sola volta e
+    # riutilizzata in tutti i vincoli che la coinvolgono
+    window_do_expressions = {}
+    def window_do(model, p, s, start, end):
+        if (p, s, start, end) not in window_do_expressions:
+            window_do_expressions[p, s, start, end] = pyo.quicksum(model.do[p, s, d, o] for d, o in window_day_operators[p, s, start, end])
+        return window_do_expressions[p, s, start, end]
+
     # VINCOLI ##################################################################
 
     # Se una finestra è soddisfatta, è soddisfatta in un unico giorno interno
     # alla sua finestra
     @model.Constraint(model.window_index) # type: ignore
     def respect_window(model, p, s, start, end):
-        return pyo.quicksum(model.do[pp, ss, d, o] for pp, ss, d, o in model.do_index if p == pp and s == ss and d >= start and d <= end) <= 1
+        return window_do(model, p, s, start, end) <= 1
 
     # I tempi di inizio e fine di ogni richiesta inserita devono rispettare il
     # turno dell'operatore che la soddisfa
     @model.Constraint(model.window_index) # type: ignore
     def link_time_to_do_variables(model, p, s, start, end):
         care_unit_name = instance.services[s].care_unit_name
-        return pyo.quicksum(model.do[pp, ss, d, o] * (instance.days[d].care_units[care_unit_name][o].start + 1) for pp, ss, d, o in model.do_index if p == pp and s == ss and d >= start and d <= end) <= model.time[p, s, start, end]
+        return pyo.quicksum(model.do[p, s, d, o] * (instance.days[d].care_units[care_unit_name][o].start + 1) for d, o in window_day_operators[p, s, start, end]) <= model.time[p, s, start, end]
     @model.Constraint(model.window_index) # type: ignore
     def link_do_to_time_variables(model, p, s, start, end):
         care_unit_name = instance.services[s].care_unit_name
-        return model.time[p, s, start, end] <= pyo.quicksum(model.do[pp, ss, d, o] * (instance.days[d].care_units[care_unit_name][o].start + instance.days[d].care_units[care_unit_name][o].duration - instance.services[s].duration + 1) for pp, ss, d, o in model.do_index if p == pp and s == ss and d >= start and d <= end)
+        return model.time[p, s, start, end] <= pyo.quicksum(model.do[p, s, d, o] * (instance.days[d].care_units[care_unit_name][o].start + instance.days[d].care_units[care_unit_name][o].duration - instance.services[s].duration + 1) for d, o in window_day_operators[p, s, start, end])
 
     # Disgiunzione dei servizi dello stesso paziente
     @model.Constraint(model.patient_overlap_index) # type: ignore
     def patient_not_overlap_1(model, p, s, ws, we, ss, wws, wwe, d):
-        return model.time[p, s, ws, we] + instance.services[s].duration * pyo.quicksum(model.do[ppp, sss, ddd, ooo] for ppp, sss, ddd, ooo in model.do_index if p == ppp and s == sss and ddd >= ws and ddd <= we) <= model.time[p, ss, wws, wwe] + (1 - model.patient_overlap[p, s, ws, we, ss, wws, wwe, d]) * max_time[d][instance.services[s].care_unit_name]
+        return model.time[p, s, ws, we] + instance.services[s].duration * window_do(model, p, s, ws, we) <= model.time[p, ss, wws, wwe] + (1 - model.patient_overlap[p, s, ws, we, ss, wws, wwe, d]) * max_time[d][instance.services[s].care_unit_name]
     @model.Constraint(model.patient_overlap_index) # type: ignore
     def patient_not_overlap_2(model, p, s, ws, we, ss, wws, wwe, d):
-        return model.time[p, ss, wws, wwe] + instance.services[ss].duration * pyo.quicksum(model.do[ppp, sss, ddd, ooo] for ppp, sss, ddd, ooo in model.do_index if p == ppp and ss == sss and ddd >= wws and ddd <= wwe) <= model.time[p, s, ws, we] + (model.patient_overlap[p, s, ws, we, ss, wws, wwe, d]) * max_time[d][instance.services[ss].care_unit_name]
+        return model.time[p, ss, wws, wwe] + instance.services[ss].duration * window_do(model, p, ss, wws, wwe) <= model.time[p, s, ws, we] + (model.patient_overlap[p, s, ws, we, ss, wws, wwe, d]) * max_time[d][instance.services[ss].care_unit_name]
 
     # Vincoli ausilari che regolano le variabili 'patient_overlap'
     # o-----------------------------------------o
@@ -140,10 +161,10 @@ def get_monolithic_model(instance: MasterInstance, additional_info) -> pyo.Concr
     # o-----------------------------------------o
     @model.Constraint(model.patient_overlap_index) # type: ignore
     def patient_overlap_auxiliary_constraint_1(model, p, s, ws, we, ss, wws, wwe, d):
-        return model.patient_overlap[p, s, ws, we, ss, wws, wwe, d] <= pyo.quicksum(model.do[ppp, sss, ddd, ooo] for ppp, sss, ddd, ooo in model.do_index if p == ppp and ss == sss and ddd >= wws and ddd <= wwe)
+        return model.patient_overlap[p, s, ws, we, ss, wws, wwe, d] <= window_do(model, p, ss, wws, wwe)
     @model.Constraint(model.patient_overlap_index) # type: ignore
     def patient_overlap_auxiliary_constraint_2(model, p, s, ws, we, ss, wws, wwe, d):
-        return pyo.quicksum(model.do[ppp, sss, ddd, ooo] for ppp, sss, ddd, ooo in model.do_index if p == ppp and ss == sss and ddd >= wws and ddd <= wwe) - pyo.quicksum(model.do[ppp, sss, ddd, ooo] for ppp, sss, ddd, ooo in model.do_index if p == ppp and s == sss and ddd >= ws and ddd <= we) <= model.patient_overlap[p, s, ws, we, ss, wws, wwe, d]
+        return window_do(model, p, ss, wws, wwe) - window_do(model, p, s, ws, we) <= model.patient_overlap[p, s, ws, we, ss, wws, wwe, d]
 
     # Disgiunzione dei servizi dello stesso operatore
     @model.Constraint(model.operator_overlap_index) # type: ignore
@@ -184,7 +205,7 @@ def get_monolithic_model(instance: MasterInstance, additional_info) -> pyo.Concr
 
             operator_duration = instance.days[d].operators[o].duration
             
-            tuples_affected: list[tuple[PatientName, ServiceName]] = [(p, s) for p, s, dd, oo in model.do_index if d == dd and o == oo]
+            tuples_affected: list[tuple[PatientName, ServiceName]] = requests_by_day_operator.get((d, o), [])
             if len(tuples_affected) == 0:
                 return pyo.Constraint.Skip
             
@@ -200,7 +221,7 @@ def get_monolithic_model(instance: MasterInstance, additional_info) -> pyo.Concr
         @model.Constraint(model.pat_days_index) # type: ignore
         def patient_total_duration(model, p, d):
             
-            tuples_affected = [(s, o) for pp, s, dd, o in model.do_index if pp == p and dd == d]
+            tuples_affected = service_operators_by_patient_day.get((p, d), [])
             if len(tuples_affected) == 0:
                 return pyo.Constraint.Skip
             if sum(instance.services[s].duration for s, _ in tuples_affected) <= max_span[d]:
@@ -221,7 +242,7 @@ def get_monolithic_model(instance: MasterInstance, additional_info) -> pyo.Concr
 
         @model.Constraint(model.psd_index) # type: ignore
         def link_do_to_pat_uses_day_variables(model, p, s, d):
-            return pyo.quicksum(model.do[p, s, d, o] for pp, ss, dd, o in model.do_index if p == pp and s == ss and d == dd) <= model.pat_uses_day[p, d]
+            return pyo.quicksum(model.do[p, s, d, o] for dd, o in day_operators_by_patient_service[p, s] if d == dd) <= model.pat_uses_day[p, d]
     
         @model.Objective(sense=pyo.maximize) # type: ignore
         def objective_function(model): # type: ignore
@@ -239,6 +260,11 @@ def get_result_from_monolithic_model(model) -> FinalResult:
 
     result = FinalResult()
 
+    # Finestre (start, end) di ogni coppia (p, s), nell'ordine di 'window_index'
+    windows_by_patient_service: dict[tuple[PatientName, ServiceName], list[tuple[DayName, DayName]]] = {}
+    for p, s, ws, we in model.window_index: # type: ignore
+        windows_by_patient_service.setdefault((p, s), []).append((ws, we))
+
     for p, s, d, o in model.do_index: # type: ignore
         if pyo.value(model.do[p, s, d, o]) < 0.5: # type: ignore
             continue
@@ -248,8 +274,8 @@ def get_result_from_monolithic_model(model) -> FinalResult:
 
         t = None
         
-        for pp, ss, ws, we in model.window_index:
-            if p == pp and s == ss and ws <= d and we >= d:
+        for ws, we in windows_by_patient_service[p, s]:
+            if ws <= d and we >= d:
                 t = int(pyo.value(model.time[p, s, ws, we])) - 1 # type: ignore
                 break
         
@@ -239,6 +239,26 @@ def get_result_from_fat_subproblem_model(model: pyo.ConcreteModel) -> SlimSubpro
 
     return result
 
+def set_fat_subproblem_model_start(model: pyo.ConcreteModel, result: FatSubproblemResult | SlimSubproblemResult):
+    '''Funzione che imposta come soluzione di partenza del modello le
+    richieste già inserite in un risultato parziale (ad esempio euristico).'''
+
+    scheduled = {(r.patient_name, r.service_name): r for r in result.scheduled}
+
+    for p, s in model.satisfy_index: # type: ignore
+        if (p, s) in scheduled:
+            model.satisfy[p, s].set_value(1) # type: ignore
+            model.time[p, s].set_value(scheduled[p, s].time_slot + 1) # type: ignore
+        else:
+            model.satisfy[p, s].set_value(0) # type: ignore
+            model.time[p, s].set_value(0) # type: ignore
+
+    for p, s, o in model.do_index: # type: ignore
+        if (p, s) in scheduled and scheduled[p, s].operator_name == o:
+            model.do[p, s, o].set_value(1) # type: ignore
+        else:
+            model.do[p, s, o].set_value(0) # type: ignore
+
 def get_slim_subproblem_model(instance: FatSubproblemInstance) -> pyo.ConcreteModel:
 
     model: pyo.ConcreteModel = pyo.ConcreteModel() # type: ignore
@@ -365,4 +385,18 @@ def get_result_from_slim_subproblem_model(model: pyo.ConcreteModel) -> FatSubpro
     result.scheduled.sort(key=lambda r: (r.patient_name, r.service_name, r.operator_name, r.time_slot))
     result.rejected.sort(key=lambda r: (r.patient_name, r.service_name))
 
-    return result
\ No newline at end of file
+    return result
+
+def set_slim_subproblem_model_start(model: pyo.ConcreteModel, result: FatSubproblemResult | SlimSubproblemResult):
+    '''Funzione che imposta come soluzione di partenza del modello le
+    richieste già inserite in un risultato parziale (ad esempio euristico).'''
+
+    scheduled = {(r.patient_name, r.service_name, r.operator_name): r for r in result.scheduled}
+
+    for p, s, o in model.do_index: # type: ignore
+        if (p, s, o) in scheduled:
+            model.do[p, s, o].set_value(1) # type: ignore
+            model.time[p, s, o].set_value(scheduled[p, s, o].time_slot + 1) # type: ignore
+        else:
+            model.do[p, s, o].set_value(0) # type: ignore
+            model.time[p, s, o].set_value(0) # type: ignore
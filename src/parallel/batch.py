@@ -0,0 +1,282 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from dataclasses import dataclass, field
+from pathlib import Path
+import multiprocessing
+import traceback
+import logging
+import json
+import copy
+import time
+
+from src.common.tools import is_combination_to_do
+
+
+LEDGER_FILE_NAME = 'batch_ledger.json'
+
+
+@dataclass
+class BatchJob:
+    config_name: str
+    group_name: str
+    instance_name: str
+    instance_path: Path
+    solving_path: Path
+    config: dict = field(default_factory=dict)
+    summary_lines: list[str] = field(default_factory=list)
+
+    @property
+    def key(self) -> str:
+        return f'{self.config_name}__{self.group_name}__{self.instance_name}'
+
+
+def read_ledger(output_path: Path) -> dict[str, dict]:
+    '''Funzione che legge il registro dei lavori di una precedente esecuzione,
+    se presente.'''
+
+    ledger_path = output_path.joinpath(LEDGER_FILE_NAME)
+    if not ledger_path.exists():
+        return {}
+
+    with open(ledger_path, 'r') as file:
+        return json.load(file)
+
+
+def write_ledger(output_path: Path, ledger: dict[str, dict]):
+    '''Funzione che salva il registro dei lavori. La scrittura passa da un file
+    temporaneo per non corrompere il registro in caso di interruzione.'''
+
+    ledger_path = output_path.joinpath(LEDGER_FILE_NAME)
+    temporary_path = output_path.joinpath(f'{LEDGER_FILE_NAME}.tmp')
+
+    with open(temporary_path, 'w') as file:
+        json.dump(ledger, file, indent=4)
+    temporary_path.replace(ledger_path)
+
+
+def get_batch_jobs(
+        config,
+        input_path: Path,
+        output_path: Path,
+        can_overwrite: bool,
+        ledger: dict[str, dict] | None=None) -> list[BatchJob]:
+    '''Funzione che espande la configurazione (gruppi e template di base) in un
+    elenco di lavori, uno per ogni terna (configurazione, gruppo, istanza) da
+    risolvere. Se viene fornito il registro di una precedente esecuzione, i
+    lavori già completati sono saltati e gli altri sono rieseguiti anche se la
+    loro cartella esiste già.'''
+
+    jobs: list[BatchJob] = []
+
+    base_config = config['base']
+
+    # Iterazione di ogni configurazione
+    for config_name, config_diff_from_base in config['groups'].items():
+
+        # Creazione della configurazione del gruppo corrente, sovrascrivendo
+        # alcuni parametri
+        group_config = copy.deepcopy(base_config)
+        for key, value in config_diff_from_base.items():
+            group_config[key] = value
+
+        # Controllo se la configurazione deve essere esclusa dalla risoluzione
+        if not is_combination_to_do(config_name, None, None, group_config):
+            continue
+
+        # Iterazione dei gruppi di istanze
+        for input_group_path in sorted(input_path.iterdir()):
+            if not input_group_path.is_dir():
+                continue
+
+            # Controllo se il gruppo deve essere escluso dalla risoluzione
+            group_name = input_group_path.name
+            if not is_combination_to_do(config_name, group_name, None, group_config):
+                continue
+
+            # Iterazione di ogni istanza del gruppo
+            for input_instance_path in sorted(input_group_path.iterdir()):
+                if input_instance_path.suffix != '.json':
+                    continue
+
+                # Controllo se l'istanza deve essere esclusa dalla risoluzione
+                instance_name = input_instance_path.stem
+                if not is_combination_to_do(config_name, group_name, instance_name, group_config):
+                    continue
+
+                job = BatchJob(
+                    config_name=config_name,
+                    group_name=group_name,
+                    instance_name=instance_name,
+                    instance_path=input_instance_path,
+                    solving_path=output_path.joinpath(f'{config_name}__{group_name}__{instance_name}'),
+                    config=group_config)
+
+                # Lavori già completati in una precedente esecuzione
+                if ledger is not None:
+                    if job.key in ledger and ledger[job.key]['status'] == 'done':
+                        continue
+
+                # Controllo sulla precedente presenza della cartella dei
+                # risultati correnti
+                elif not can_overwrite and job.solving_path.exists():
+                    print(f'Directory {job.solving_path} already exists.')
+                    continue
+
+                jobs.append(job)
+
+    # Conteggio dei lavori di ogni gruppo e di ogni configurazione, in un unico
+    # passaggio dato che i lavori sono già ordinati per configurazione e gruppo
+    group_job_numbers: dict[tuple[str, str], int] = {}
+    config_job_numbers: dict[str, int] = {}
+    job_positions: list[tuple[int, int]] = []
+    for job in jobs:
+        group_key = (job.config_name, job.group_name)
+        group_job_numbers[group_key] = group_job_numbers.get(group_key, 0) + 1
+        config_job_numbers[job.config_name] = config_job_numbers.get(job.config_name, 0) + 1
+        job_positions.append((group_job_numbers[group_key], config_job_numbers[job.config_name]))
+
+    # Righe di riepilogo stampate all'inizio di ogni iterazione
+    for job_index, (job, (group_position, config_position)) in enumerate(zip(jobs, job_positions)):
+        job.summary_lines = [
+            f'Solving instance \'{job.instance_name}\' of group \'{job.group_name}\' with config \'{job.config_name}\'',
+            f'{group_position}/{group_job_numbers[job.config_name, job.group_name]} instance of this group, {config_position}/{config_job_numbers[job.config_name]} instance of this config',
+            f'{job_index + 1}/{len(jobs)} instance solving in total'
+        ]
+
+    return jobs
+
+
+def get_preliminary_solving_info(jobs: list[BatchJob]) -> dict[tuple[str, str], int]:
+    '''Funzione che stampa a video le informazioni dei lavori che saranno
+    effettivamente eseguiti. Ritorna un dizionario contenente i numeri di
+    istanze da risolvere, indicizzate per nome della configurazione e nome del
+    gruppo.'''
+
+    infos: dict[tuple[str, str], int] = {}
+    for job in jobs:
+        infos[job.config_name, job.group_name] = infos.get((job.config_name, job.group_name), 0) + 1
+
+    print('\n************************** [PRELIMINARY INFORMATIONS] **************************')
+
+    config_names = list(dict.fromkeys(config_name for config_name, _ in infos.keys()))
+    for config_name in config_names:
+        group_numbers = [number for (other_config_name, _), number in infos.items() if other_config_name == config_name]
+        print(f'Configuration \'{config_name}\' will be solving {sum(group_numbers)} instances in {len(group_numbers)} groups')
+
+    # Stampa di un avvertimento se non viene risolto nulla
+    if len(jobs) == 0:
+        print(f'WARNING: no instance to solve')
+    else:
+        print(f'{len(config_names)} configurations will be solving {len(jobs)} instances overall; some may be the same, repeated in different groups')
+
+    print('*********************** [END OF PRELIMINARY INFORMATIONS] **********************\n')
+
+    return infos
+
+
+def run_batch_job(job: BatchJob, read_instance, solve_instance, redirect_output: bool) -> tuple[int, float]:
+    '''Funzione che risolve un singolo lavoro e ne ritorna il codice d'errore
+    ed il tempo impiegato. Se richiesto, l'output a terminale viene salvato
+    nella cartella dei risultati dell'istanza.'''
+
+    # Soppressione dell'output a terminale degli avvertimenti di Pyomo
+    logging.getLogger('pyomo.core').setLevel(logging.ERROR)
+
+    job.solving_path.mkdir(exist_ok=True)
+    start = time.perf_counter()
+
+    if not redirect_output:
+        instance = read_instance(job.instance_path, job.config)
+        error_code = solve_instance(instance, job.config, job.solving_path, job.summary_lines)
+        return error_code, time.perf_counter() - start
+
+    with open(job.solving_path.joinpath('solver_output.log'), 'w') as file:
+        with redirect_stdout(file):
+            try:
+                instance = read_instance(job.instance_path, job.config)
+                error_code = solve_instance(instance, job.config, job.solving_path, job.summary_lines)
+            except Exception:
+                traceback.print_exc(file=file)
+                raise
+
+    return error_code, time.perf_counter() - start
+
+
+def run_batch(
+        jobs: list[BatchJob],
+        read_instance,
+        solve_instance,
+        output_path: Path,
+        parallel_jobs: int,
+        thread_budget: int) -> tuple[int, int]:
+    '''Funzione che esegue tutti i lavori su un pool di al massimo
+    'parallel_jobs' processi. Il budget di thread viene suddiviso fra i lavori
+    contemporanei (0 lascia la scelta al solutore). Ogni lavoro terminato viene
+    segnato nel registro, così che un'esecuzione interrotta possa riprendere.
+    Ritorna il numero di lavori completati senza errori e quello dei lavori
+    falliti.'''
+
+    ledger = read_ledger(output_path)
+
+    parallel_jobs = max(1, min(parallel_jobs, len(jobs)))
+    threads_per_job = thread_budget // parallel_jobs if thread_budget > 0 else 0
+    if thread_budget > 0 and threads_per_job == 0:
+        threads_per_job = 1
+
+    for job in jobs:
+        job.config = copy.deepcopy(job.config)
+        job.config['thread_budget'] = threads_per_job
+
+    done_number = 0
+    failed_number = 0
+    start = time.perf_counter()
+
+    def register_job(job: BatchJob, error_code: int, elapsed: float):
+        nonlocal done_number, failed_number
+
+        if error_code == 0:
+            done_number += 1
+            ledger[job.key] = {'status': 'done', 'error_code': 0, 'time': elapsed}
+        else:
+            failed_number += 1
+            print(f'[BATCH] {job.key} ended with error code: {error_code}')
+            ledger[job.key] = {'status': 'failed', 'error_code': error_code, 'time': elapsed}
+        write_ledger(output_path, ledger)
+
+        running_number = min(parallel_jobs, len(jobs) - done_number - failed_number)
+        print(f'[BATCH] {done_number + failed_number}/{len(jobs)} jobs ended ({done_number} done, {failed_number} failed, {running_number} running), elapsed {int(time.perf_counter() - start)}s')
+
+    # Esecuzione sequenziale nel processo principale
+    if parallel_jobs == 1:
+        for job in jobs:
+            job_start = time.perf_counter()
+            try:
+                error_code, elapsed = run_batch_job(job, read_instance, solve_instance, False)
+            except Exception as e:
+                print(e)
+                error_code, elapsed = -1, time.perf_counter() - job_start
+            register_job(job, error_code, elapsed)
+        return done_number, failed_number
+
+    print(f'[BATCH] Running {len(jobs)} jobs on {parallel_jobs} processes ({threads_per_job if threads_per_job > 0 else "default"} solver threads each)')
+
+    # I processi sono creati con 'fork' dato che gli script principali terminano
+    # se importati come moduli (come avverrebbe con 'spawn')
+    context = multiprocessing.get_context('fork')
+
+    with ProcessPoolExecutor(max_workers=parallel_jobs, mp_context=context) as executor:
+
+        futures = {}
+        for job in jobs:
+            futures[executor.submit(run_batch_job, job, read_instance, solve_instance, True)] = job
+
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                error_code, elapsed = future.result()
+            except Exception as e:
+                print(f'[BATCH] {job.key} raised: {e}')
+                error_code, elapsed = -1, 0.0
+            register_job(job, error_code, elapsed)
+
+    return done_number, failed_number
@@ -0,0 +1,268 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import multiprocessing
+import logging
+import json
+import time
+
+import pyomo.environ as pyo
+
+from src.common.custom_types import DayName, FatSubproblemInstance, SlimSubproblemInstance
+from src.common.custom_types import FatSubproblemResult, SlimSubproblemResult, PatientService
+from src.common.custom_types import PatientServiceOperator
+from src.common.tools import get_slim_subproblem_instance_from_fat
+from src.common.decomposition import get_subproblem_instance_components, merge_subproblem_results
+from src.common.file_load_and_dump import encode_subproblem_result
+from src.checkers.check_subproblem_result import check_subproblem_result
+from src.milp_models.subproblem_model import get_fat_subproblem_model, get_slim_subproblem_model
+from src.milp_models.subproblem_model import get_result_from_fat_subproblem_model, get_result_from_slim_subproblem_model
+from src.milp_models.subproblem_model import set_fat_subproblem_model_start, set_slim_subproblem_model_start
+from src.heuristics.list_scheduling import get_greedy_subproblem_result
+from src.cache.subproblem_cache import load_cached_subproblem_result, store_subproblem_result
+
+
+# Esito della risoluzione di un giorno: risultato, tempo di creazione del
+# modello, tempo di risoluzione ed eventuali errori riscontrati nel controllo
+type DaySubproblemOutcome = tuple[FatSubproblemResult | SlimSubproblemResult, float, float, list[str]]
+
+
+def get_subproblem_solver(config, threads: int):
+    '''Funzione che ritorna il solutore del sottoproblema configurato. Se
+    'threads' è maggiore di zero limita il numero di thread usati da Gurobi.'''
+
+    subproblem_opt = pyo.SolverFactory('gurobi')
+    subproblem_opt.options['TimeLimit'] = config['subproblem']['time_limit']
+    subproblem_opt.options['SoftMemLimit'] = config['subproblem']['memory_limit']
+    if threads > 0:
+        subproblem_opt.options['Threads'] = threads
+
+    return subproblem_opt
+
+
+def get_subproblem_threads(config) -> int:
+    '''Funzione che ritorna il numero di thread di Gurobi per ogni
+    sottoproblema. Se non specificato, l'eventuale budget di thread
+    dell'istanza viene diviso fra i processi del pool.'''
+
+    threads = config['subproblem']['threads_per_worker']
+    if threads == 0 and config['thread_budget'] > 0:
+        threads = max(1, config['thread_budget'] // config['subproblem']['parallel_workers'])
+
+    return threads
+
+
+def solve_subproblem_model(
+        subproblem_instance: FatSubproblemInstance | SlimSubproblemInstance,
+        master_requests: list[PatientServiceOperator] | list[PatientService],
+        config,
+        log_path: Path,
+        threads: int=0) -> tuple[FatSubproblemResult | SlimSubproblemResult, float, float]:
+    '''Funzione che crea e risolve il modello MILP di un'istanza del
+    sottoproblema e ne ritorna il risultato, il tempo di creazione del modello
+    ed il tempo di risoluzione.'''
+
+    # Ricerca del risultato di un'istanza equivalente già risolta, anche in
+    # altre esecuzioni
+    cache_path = config['subproblem']['persistent_cache_path']
+    if cache_path is not None:
+
+        start = time.perf_counter()
+        cached_result = load_cached_subproblem_result(Path(cache_path), subproblem_instance, config)
+        end = time.perf_counter()
+
+        if cached_result is not None:
+            return cached_result, 0.0, end - start
+
+    # Tentativo con l'euristica costruttiva: se inserisce tutte le richieste la
+    # soluzione è ottima e il modello MILP non viene nemmeno creato
+    greedy_result = None
+    if config['subproblem']['greedy_presolve']:
+
+        start = time.perf_counter()
+        greedy_result = get_greedy_subproblem_result(subproblem_instance)
+        end = time.perf_counter()
+
+        if len(greedy_result.rejected) == 0:
+            if config['structure_type'] in ['slim-fat', 'fat-fat']:
+                return SlimSubproblemResult(scheduled=greedy_result.scheduled), 0.0, end - start
+            return FatSubproblemResult(scheduled=greedy_result.scheduled), 0.0, end - start
+
+    start = time.perf_counter()
+
+    # Se la struttura risolutiva è 'fat-fat' ed è selezionata l'opzione
+    # 'preemptive_forbidding'allora bisogna costruire l'istanza del
+    # sottoproblema dimenticandosi dei nomi degli operatori
+    if config['structure_type'] == 'fat-fat' and 'preemptive_forbidding' in config['subproblem']['additional_info']:
+
+        forgetful_subproblem_instance = get_slim_subproblem_instance_from_fat(subproblem_instance) # type: ignore
+        subproblem_model = get_fat_subproblem_model(forgetful_subproblem_instance, config['subproblem']['additional_info'], master_requests) # type: ignore
+
+    elif config['structure_type'] in ['slim-fat', 'fat-fat']:
+        subproblem_model = get_fat_subproblem_model(subproblem_instance, config['subproblem']['additional_info']) # type: ignore
+    else:
+        subproblem_model = get_slim_subproblem_model(subproblem_instance) # type: ignore
+
+    # La soluzione parziale dell'euristica è usata come partenza del solutore
+    if greedy_result is not None:
+        if config['structure_type'] in ['slim-fat', 'fat-fat']:
+            set_fat_subproblem_model_start(subproblem_model, greedy_result)
+        else:
+            set_slim_subproblem_model_start(subproblem_model, greedy_result)
+
+    end = time.perf_counter()
+    model_creation_time = end - start
+
+    subproblem_opt = get_subproblem_solver(config, threads)
+    start = time.perf_counter()
+    results = subproblem_opt.solve(subproblem_model, logfile=log_path, warmstart=greedy_result is not None)
+    end = time.perf_counter()
+    solving_time = end - start
+
+    # Una risoluzione può terminare prima del limite di tempo anche senza aver
+    # dimostrato l'ottimo (limite di memoria, interruzione, errori numerici)
+    is_optimal = results.solver.termination_condition == pyo.TerminationCondition.optimal
+
+    if config['structure_type'] in ['slim-fat', 'fat-fat']:
+        subproblem_result = get_result_from_fat_subproblem_model(subproblem_model)
+    else:
+        subproblem_result = get_result_from_slim_subproblem_model(subproblem_model)
+
+    # Sono salvati solo i risultati di cui il solutore ha dimostrato l'ottimalità
+    if cache_path is not None and is_optimal:
+        store_subproblem_result(Path(cache_path), subproblem_instance, subproblem_result, config)
+
+    return subproblem_result, model_creation_time, solving_time
+
+
+def can_decompose_subproblem(config) -> bool:
+    '''Funzione che indica se il sottoproblema può essere suddiviso nelle sue
+    componenti connesse. Con l'opzione 'preemptive_forbidding' la funzione
+    obiettivo dipende dall'intera richiesta del master e non è separabile.'''
+
+    if not config['subproblem']['decompose_components']:
+        return False
+
+    if config['structure_type'] == 'fat-fat' and 'preemptive_forbidding' in config['subproblem']['additional_info']:
+        return False
+
+    return True
+
+
+def solve_day_subproblem(
+        subproblem_instance: FatSubproblemInstance | SlimSubproblemInstance,
+        master_requests: list[PatientServiceOperator] | list[PatientService],
+        day_name: DayName,
+        config,
+        iteration_path: Path,
+        threads: int=0,
+        parallel_workers: int=1) -> DaySubproblemOutcome:
+    '''Funzione che crea e risolve il modello MILP del sottoproblema di un
+    giorno, salva il risultato nella cartella dell'iterazione e lo controlla.
+    Se abilitato, il giorno viene suddiviso in componenti indipendenti (pazienti
+    che non condividono operatori o unità di cura) risolte separatamente, con
+    un pool di 'parallel_workers' processi se maggiore di 1. Può essere eseguita
+    sia nel processo principale che in un processo separato, ma in quest'ultimo
+    caso le componenti devono essere risolte in sequenza.'''
+
+    if can_decompose_subproblem(config):
+        components = get_subproblem_instance_components(subproblem_instance)
+    else:
+        components = [subproblem_instance]
+
+    # Con una sola componente il log mantiene il nome letto dall'analizzatore
+    if len(components) <= 1:
+        subproblem_result, model_creation_time, solving_time = solve_subproblem_model(
+            subproblem_instance, master_requests, config,
+            iteration_path.joinpath(f'subproblem_day_{day_name}_log.log'), threads)
+
+    elif parallel_workers > 1:
+        worker_number = min(parallel_workers, len(components))
+
+        # I processi sono creati con 'fork' dato che gli script principali
+        # terminano se importati come moduli (come avverrebbe con 'spawn')
+        context = multiprocessing.get_context('fork')
+
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=worker_number, mp_context=context, initializer=initialize_worker) as executor:
+
+            futures = []
+            for component_index, component in enumerate(components):
+                futures.append(executor.submit(
+                    solve_subproblem_model, component, master_requests, config,
+                    iteration_path.joinpath(f'subproblem_day_{day_name}_component_{component_index}_log.log'), threads))
+
+            # Unione deterministica dei risultati in ordine di componente
+            component_outcomes = [future.result() for future in futures]
+        end = time.perf_counter()
+
+        subproblem_result = merge_subproblem_results([outcome[0] for outcome in component_outcomes])
+        model_creation_time = sum(outcome[1] for outcome in component_outcomes)
+
+        # Le componenti sono risolte contemporaneamente: conta solo il tempo
+        # reale trascorso
+        solving_time = end - start
+
+    else:
+        component_results = []
+        model_creation_time = 0.0
+        solving_time = 0.0
+
+        for component_index, component in enumerate(components):
+            component_result, component_creation_time, component_solving_time = solve_subproblem_model(
+                component, master_requests, config,
+                iteration_path.joinpath(f'subproblem_day_{day_name}_component_{component_index}_log.log'), threads)
+
+            component_results.append(component_result)
+            model_creation_time += component_creation_time
+            solving_time += component_solving_time
+
+        subproblem_result = merge_subproblem_results(component_results)
+
+    # Salvataggio dei risultati del giorno corrente
+    with open(iteration_path.joinpath(f'subproblem_day_{day_name}_result.json'), 'w') as file:
+        json.dump(encode_subproblem_result(subproblem_result), file, indent=4)
+
+    errors = check_subproblem_result(subproblem_instance, subproblem_result)
+
+    return subproblem_result, model_creation_time, solving_time, errors
+
+
+def initialize_worker():
+    '''Inizializzazione di ogni processo del pool.'''
+
+    # Soppressione dell'output a terminale degli avvertimenti di Pyomo
+    logging.getLogger('pyomo.core').setLevel(logging.ERROR)
+
+
+def solve_day_subproblems_in_parallel(
+        subproblem_instances: dict[DayName, FatSubproblemInstance] | dict[DayName, SlimSubproblemInstance],
+        master_requests: dict[DayName, list[PatientServiceOperator]] | dict[DayName, list[PatientService]],
+        config,
+        iteration_path: Path) -> dict[DayName, DaySubproblemOutcome]:
+    '''Funzione che risolve i sottoproblemi dei giorni forniti con un pool di
+    processi. Il numero di processi e di thread di Gurobi di ognuno sono
+    specificati dalla configurazione del sottoproblema. I risultati sono
+    restituiti ordinati per giorno, indipendentemente dall'ordine di
+    completamento.'''
+
+    worker_number = min(config['subproblem']['parallel_workers'], len(subproblem_instances))
+    threads = get_subproblem_threads(config)
+
+    # I processi sono creati con 'fork' dato che gli script principali terminano
+    # se importati come moduli (come avverrebbe con 'spawn')
+    context = multiprocessing.get_context('fork')
+
+    with ProcessPoolExecutor(max_workers=worker_number, mp_context=context, initializer=initialize_worker) as executor:
+
+        futures = {}
+        for day_name, subproblem_instance in subproblem_instances.items():
+            futures[day_name] = executor.submit(
+                solve_day_subproblem, subproblem_instance, master_requests[day_name],
+                day_name, config, iteration_path, threads)
+
+        # Unione deterministica dei risultati in ordine di giorno
+        outcomes: dict[DayName, DaySubproblemOutcome] = {}
+        for day_name in sorted(futures.keys()):
+            outcomes[day_name] = futures[day_name].result()
+
+    return outcomes
@@ -16,7 +16,7 @@ def plot_core_info(master_result_df: pd.DataFrame, results_path: Path, config):
 
         cores_data: dict[str, pd.DataFrame] = {}
 
-        for core_type in ['generalist', 'basic', 'reduced', 'pruned', 'expanded']:
+        for core_type in ['generalist', 'basic', 'reduced', 'pruned', 'minimal', 'expanded']:
             if f'{core_type}_core_number' not in master_iterations or f'{core_type}_average_core_size' not in master_iterations:
                 continue
             
@@ -63,6 +63,7 @@ def plot_core_info(master_result_df: pd.DataFrame, results_path: Path, config):
             'basic': 'blue',
             'reduced': 'green',
             'pruned': 'red',
+            'minimal': 'purple',
             'expanded': 'orange'
         }
 